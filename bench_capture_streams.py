@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark: full-sensor still capture vs. dual-stream (main + lores) capture.
+
+Without a camera, measures the per-frame work after capture on synthetic
+frames: RGB conversion of the inference input and the preview resize.
+With --camera (on the Pi), runs CameraModule in both modes and also
+reports capture time, using CameraModule.stats().
+
+Usage: python bench_capture_streams.py [--camera] [frames] [sensor WxH]
+"""
+
+import sys
+import os
+import statistics
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hardware.src import camera_module
+
+
+def _ms(func, frames):
+    timings = []
+    for _ in range(frames):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.mean(timings)
+
+
+def bench_synthetic(frames, sensor_size):
+    import numpy as np
+    import cv2
+
+    cam = camera_module.CameraModule()
+    rng = np.random.default_rng(0)
+    sensor_w, sensor_h = sensor_size
+    preview_w, preview_h = camera_module.PREVIEW_SIZE
+    inference_w, inference_h = camera_module.INFERENCE_SIZE
+    still = (rng.random((sensor_h, sensor_w, 3)) * 255).astype('uint8')
+    main = (rng.random((preview_h, preview_w, 3)) * 255).astype('uint8')
+    lores = (rng.random((inference_h * 3 // 2, inference_w)) * 255).astype('uint8')
+
+    def still_resize():
+        cv2.resize(still, (360, int(sensor_h * 360 / sensor_w)))
+
+    rows = [
+        ('convert', _ms(lambda: cam.inference_rgb(still), frames),
+         _ms(lambda: cam.inference_rgb(lores), frames)),
+        ('resize', _ms(still_resize, frames), 0.0),
+    ]
+    print(f"Per-frame work after capture, {frames} frames")
+    print(f"  still: {sensor_w}x{sensor_h} BGR ({sensor_w * sensor_h:,} px)")
+    print(f"  dual:  main {preview_w}x{preview_h} + lores {inference_w}x{inference_h} I420 "
+          f"({preview_w * preview_h + inference_w * inference_h:,} px)")
+    saved_total = 0.0
+    for stage, old, new in rows:
+        saved_total += old - new
+        print(f"  {stage:<8} still {old:8.2f} ms   dual {new:8.2f} ms   saved {old - new:8.2f} ms")
+    print(f"  total saved per frame: {saved_total:.2f} ms (capture time needs --camera)")
+
+
+def bench_camera(frames):
+    for mode in ('still', 'dual'):
+        cam = camera_module.CameraModule(mode=mode)
+        if not cam.start():
+            print("Picamera2 not available")
+            return
+        try:
+            for _ in range(frames):
+                cam.capture_preview_and_metrics()
+            print(f"  {mode}: {cam.stats()}")
+        finally:
+            cam.stop()
+            cam.picam2.close()
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != '--camera']
+    frames = int(args[0]) if args else 50
+    sensor_size = camera_module._size(args[1]) if len(args) > 1 else (4608, 2592)
+    if '--camera' in sys.argv:
+        bench_camera(frames)
+    else:
+        bench_synthetic(frames, sensor_size)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-frame MediaPipe analysis time on CPU, old path vs. new path.
+
+  old: a fresh Pose(static_image_mode=True) per frame (model graph rebuilt,
+       person detector on every frame)
+  new: CameraModule's persistent Pose(static_image_mode=False), which tracks
+       landmarks between frames and only re-runs the detector when it loses them
+
+Use real footage for meaningful numbers; with no person in view MediaPipe
+runs the detector on every frame in both modes.
+
+Usage: python bench_pose_analysis.py [video file or image directory] [frames]
+"""
+
+import sys
+import os
+import statistics
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hardware.src import camera_module
+
+
+def _load_frames(source, count):
+    import cv2
+    import numpy as np
+
+    frames = []
+    if source and os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            image = cv2.imread(os.path.join(source, name))
+            if image is not None:
+                frames.append(image)
+            if len(frames) >= count:
+                break
+    elif source:
+        capture = cv2.VideoCapture(source)
+        while len(frames) < count:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            frames.append(frame)
+        capture.release()
+    if not frames:
+        # Smooth synthetic frames at the Picamera2 preview size
+        rng = np.random.default_rng(0)
+        base = cv2.GaussianBlur((rng.random((480, 640, 3)) * 255).astype('uint8'), (31, 31), 0)
+        frames = [np.roll(base, i, axis=1) for i in range(count)]
+    while len(frames) < count:
+        frames.extend(frames[:count - len(frames)])
+    return frames[:count]
+
+
+def _old_analyze(frame):
+    # The pre-change analyze_posture: model built and torn down per frame
+    import cv2
+    mp_pose = camera_module.mp.solutions.pose
+    with mp_pose.Pose(static_image_mode=True) as pose:
+        res = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        if not res.pose_landmarks:
+            return dict(camera_module.NO_POSE)
+        return camera_module.CameraModule.metrics_from_landmarks(
+            res.pose_landmarks.landmark, frame.shape[1], frame.shape[0])
+
+
+def _time(analyze, frames):
+    timings = []
+    detected = 0
+    for frame in frames:
+        started = time.perf_counter()
+        metrics = analyze(frame)
+        timings.append((time.perf_counter() - started) * 1000)
+        detected += metrics.get('shoulder_alignment') is not None
+    return timings, detected
+
+
+def _report(name, timings, detected):
+    ordered = sorted(timings)
+    print(f"  {name:<34} mean {statistics.mean(timings):7.1f} ms   p50 {ordered[len(ordered) // 2]:7.1f} ms   "
+          f"p95 {ordered[int(len(ordered) * 0.95) - 1]:7.1f} ms   person in {detected}/{len(timings)}")
+
+
+def main():
+    source = sys.argv[1] if len(sys.argv) > 1 and not sys.argv[1].isdigit() else None
+    count = int(sys.argv[-1]) if len(sys.argv) > 1 and sys.argv[-1].isdigit() else 100
+
+    if not camera_module.MP_AVAILABLE:
+        print("mediapipe is not installed; nothing to benchmark")
+        return 0
+
+    frames = _load_frames(source, count)
+    print(f"Per-frame MediaPipe analysis, {len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]} "
+          f"({source or 'synthetic'})")
+
+    old_timings, old_detected = _time(_old_analyze, frames)
+    _report("old: Pose(static_image_mode=True)", old_timings, old_detected)
+
+    for complexity in (1, 0):
+        cam = camera_module.CameraModule(model_complexity=complexity)
+        try:
+            cam.analyze_posture(frames[0])  # graph construction is paid once per session
+            timings, detected = _time(cam.analyze_posture, frames)
+        except Exception as error:
+            # Only the full model ships with the wheel; lite/heavy are downloaded on first use
+            print(f"  new: persistent, complexity={complexity}   unavailable ({type(error).__name__})")
+            continue
+        finally:
+            cam.close_pose()
+        _report(f"new: persistent, complexity={complexity}", timings, detected)
+        if complexity == 1:
+            print(f"  speedup (same model): {statistics.mean(old_timings) / statistics.mean(timings):.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
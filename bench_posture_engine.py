@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark: posture rule evaluation per frame.
+
+  old:    the pre-engine metrics_from_landmarks (per-landmark tuples, nested pt_px)
+  single: posture_engine.evaluate on one (17, 3) array, as the live paths call it
+  batch:  posture_engine.evaluate_batch over (N, 17, 3), as replay/analytics call it
+
+The single-frame call pays NumPy's fixed per-call overhead (tens of
+microseconds), so it is slower than plain Python on one frame. That is noise
+next to a 20-50 ms MediaPipe pass. The vectorisation pays off in the batch
+column.
+
+Usage: python bench_posture_engine.py [frames]
+"""
+
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from hardware.src import camera_module
+from hardware.src import posture_engine
+
+
+def _old_metrics(lm, img_width, img_height):
+    # The pre-change metrics_from_landmarks, with MediaPipe's landmark indices inlined
+    left_sh, right_sh, nose = lm[11], lm[12], lm[0]
+    shoulder_alignment = abs(left_sh.y - right_sh.y)
+    neck_angle = nose.y - (left_sh.y + right_sh.y) / 2
+
+    def pt_px(lm_point):
+        return (int(lm_point.x * img_width), int(lm_point.y * img_height))
+
+    ear = pt_px(lm[7]) if lm[7].visibility > 0.5 else (pt_px(lm[8]) if lm[8].visibility > 0.5 else None)
+    shoulder = pt_px(left_sh) if left_sh.visibility > 0.5 else (pt_px(right_sh) if right_sh.visibility > 0.5 else None)
+    hip = pt_px(lm[23]) if lm[23].visibility > 0.5 else (pt_px(lm[24]) if lm[24].visibility > 0.5 else None)
+    is_bad, reason = False, ""
+    if ear and shoulder and abs(ear[0] - shoulder[0]) > 12:
+        is_bad, reason = True, "Head forward"
+    if shoulder and hip and not is_bad and abs(shoulder[0] - hip[0]) > 18:
+        is_bad, reason = True, "Slouching"
+    return {'shoulder_alignment': shoulder_alignment, 'neck_angle': neck_angle, 'is_bad': is_bad, 'reason': reason}
+
+
+def _us_per_frame(func, frames, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best / frames * 1e6
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rng = np.random.default_rng(0)
+    sessions = [[camera_module.Landmark(0.5 + rng.normal(0, 0.02), rng.random(), rng.choice([0.2, 0.9]))
+                 for _ in range(33)] for _ in range(frames)]
+    keypoints = np.stack([posture_engine.from_mediapipe(landmarks) for landmarks in sessions])
+
+    old = _us_per_frame(lambda: [_old_metrics(lm, 640, 480) for lm in sessions], frames)
+    single = _us_per_frame(lambda: [posture_engine.evaluate(kp, 640, 480) for kp in keypoints], frames)
+    batch = _us_per_frame(lambda: posture_engine.evaluate_batch(keypoints, 640, 480), frames)
+
+    print(f"Posture rule evaluation, {frames} frames (best of 5)")
+    print(f"  old: per-landmark Python      {old:8.2f} us/frame")
+    print(f"  single: evaluate((17, 3))     {single:8.2f} us/frame")
+    print(f"  batch: evaluate_batch((N,17,3)) {batch:6.2f} us/frame   {old / batch:.0f}x faster than old")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the Picamera2 analysis pipeline on recorded footage, no camera needed.
+
+Plays a video file or a directory of frames through CameraModule
+(capture -> motion gate -> ROI crop -> MediaPipe -> posture engine) and
+score_from_camera_metrics, as fast as possible or at the recording's own
+frame rate with --realtime. Reports throughput, CameraModule.stats() and
+the score distribution, so two runs on the same footage can be compared
+before and after a change.
+
+Usage: python bench_recorded_pipeline.py <video file or frame directory> [--realtime] [max frames]
+"""
+
+import sys
+import os
+import collections
+import statistics
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hardware.src import camera_module
+from hardware.src import frame_source
+from hardware.src.scoring import score_from_camera_metrics
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != '--realtime']
+    if not args:
+        print(__doc__.strip().splitlines()[-1])
+        return 1
+    limit = int(args[1]) if len(args) > 1 else None
+    source = frame_source.from_spec(args[0], 'dual', camera_module.PREVIEW_SIZE, camera_module.INFERENCE_SIZE,
+                                    realtime='--realtime' in sys.argv)
+    if not camera_module.MP_AVAILABLE:
+        print("mediapipe is not installed; timings cover capture and scoring only")
+
+    cam = camera_module.CameraModule(source=source)
+    if not cam.start():
+        print(f"Could not open {args[0]}")
+        return 1
+
+    scores = []
+    reasons = collections.Counter()
+    timings = []
+    try:
+        while limit is None or len(scores) < limit:
+            started = time.perf_counter()
+            _, posture = cam.capture_and_analyze()
+            if not posture:
+                break
+            scores.append(score_from_camera_metrics(posture))
+            timings.append((time.perf_counter() - started) * 1000)
+            reasons[posture.get('reason') or ('Bad posture' if posture.get('is_bad') else 'Good posture')] += 1
+    finally:
+        cam.stop()
+        cam.close_pose()
+
+    if not scores:
+        print("No frames analysed")
+        return 1
+    ordered = sorted(timings)
+    print(f"{len(scores)} frames from {args[0]} ({source.name}, {'real time' if source.realtime else 'as fast as possible'})")
+    print(f"  per frame: mean {statistics.mean(timings):7.2f} ms   p50 {ordered[len(ordered) // 2]:7.2f} ms   "
+          f"p95 {ordered[int(len(ordered) * 0.95) - 1]:7.2f} ms   ({1000 / statistics.mean(timings):.1f} fps)")
+    print(f"  score: mean {statistics.mean(scores):.1f}   min {min(scores)}   max {max(scores)}")
+    print(f"  reasons: {dict(reasons.most_common())}")
+    print(f"  stats: {cam.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
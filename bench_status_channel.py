@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Hailo status JSON file vs. Unix datagram status channel.
+
+Measures, for each transport:
+  - producer cost per sample (what the GStreamer callback pays)
+  - consumer cost per read (what the hardware loop pays)
+  - end-to-end latency from publish to the consumer seeing the sample
+  - how many samples a 1 Hz consumer actually observes
+
+Usage: python bench_status_channel.py [samples]
+"""
+
+import sys
+import os
+import json
+import base64
+import statistics
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hardware.src.status_channel import StatusPublisher, StatusReceiver
+
+
+def _jpeg_bytes():
+    # A 300px preview at quality 50, like publish_status used to embed
+    try:
+        import numpy as np
+        import cv2
+        frame = (np.random.default_rng(0).random((169, 300, 3)) * 255).astype('uint8')
+        frame = cv2.GaussianBlur(frame, (9, 9), 0)
+        return cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 50])[1].tobytes()
+    except Exception:
+        return os.urandom(12000)
+
+
+def _legacy_payload(jpeg, is_bad):
+    return {
+        'score': 55 if is_bad else 95,
+        'frameScore': 55 if is_bad else 95,
+        'sessionScore': 55 if is_bad else 95,
+        'cameraActive': True,
+        'cameraFrame': 'data:image/jpeg;base64,' + base64.b64encode(jpeg).decode('ascii'),
+        'cameraMetrics': {'is_bad': is_bad, 'reason': 'Head forward' if is_bad else ''},
+        'postureStatus': 'Bad' if is_bad else 'Good',
+        'postureReason': 'Head forward' if is_bad else '',
+        'updatedAt': time.time(),
+    }
+
+
+def _pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def bench_file(samples, jpeg, workdir):
+    from pathlib import Path
+    status_file = Path(workdir) / 'status.json'
+
+    produce = []
+    for i in range(samples):
+        started = time.perf_counter()
+        status_file.write_text(json.dumps(_legacy_payload(jpeg, i % 2 == 0)))
+        produce.append(time.perf_counter() - started)
+
+    consume = []
+    latency = []
+    for i in range(samples):
+        published = time.time()
+        status_file.write_text(json.dumps(_legacy_payload(jpeg, i % 2 == 0) | {'updatedAt': published}))
+        started = time.perf_counter()
+        with open(status_file, 'r', encoding='utf-8') as f:
+            status = json.load(f)
+        consume.append(time.perf_counter() - started)
+        latency.append(time.time() - status['updatedAt'])
+    return produce, consume, latency
+
+
+def bench_channel(samples, workdir):
+    path = os.path.join(workdir, 'status.sock')
+    receiver = StatusReceiver(path)
+    publisher = StatusPublisher(path)
+
+    produce = []
+    for i in range(samples):
+        started = time.perf_counter()
+        publisher.publish(i % 2 == 0, 'Head forward' if i % 2 == 0 else '')
+        produce.append(time.perf_counter() - started)
+        if i % 8 == 7:
+            time.sleep(0.0005)  # keep under the kernel datagram queue limit
+    time.sleep(0.1)
+    receiver.drain()
+
+    consume = []
+    latency = []
+    for i in range(samples):
+        publisher.publish(i % 2 == 0, '')
+        deadline = time.time() + 1
+        got = []
+        while not got and time.time() < deadline:
+            started = time.perf_counter()
+            got = receiver.drain()
+            elapsed = time.perf_counter() - started
+        consume.append(elapsed)
+        latency.append(time.time() - got[-1].timestamp)
+
+    publisher.close()
+    receiver.close()
+    return produce, consume, latency
+
+
+def observed_at_1hz(workdir, producer_fps=30, seconds=3):
+    """Samples a once-per-second consumer sees out of everything produced."""
+    path = os.path.join(workdir, 'observe.sock')
+    receiver = StatusReceiver(path)
+    publisher = StatusPublisher(path)
+    stop = threading.Event()
+
+    def produce():
+        while not stop.is_set():
+            publisher.publish(False, '')
+            time.sleep(1 / producer_fps)
+
+    thread = threading.Thread(target=produce)
+    thread.start()
+    seen = 0
+    for _ in range(seconds):
+        time.sleep(1)
+        seen += len(receiver.drain())
+    stop.set()
+    thread.join()
+    seen += len(receiver.drain())
+    produced = publisher.seq
+    publisher.close()
+    receiver.close()
+    # The file transport exposes exactly one snapshot per poll
+    return produced, seen, seconds
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    jpeg = _jpeg_bytes()
+    with tempfile.TemporaryDirectory() as workdir:
+        results = {
+            'json file': bench_file(samples, jpeg, workdir),
+            'datagram channel': bench_channel(samples, workdir),
+        }
+        produced, seen, polls = observed_at_1hz(workdir)
+
+    print(f"Samples: {samples}, embedded JPEG: {len(jpeg)} bytes")
+    print(f"{'transport':<18} {'produce us':>11} {'consume us':>11} {'lat p50 us':>11} {'lat p99 us':>11} {'samples/s':>10}")
+    for name, (produce, consume, latency) in results.items():
+        per_sample = statistics.mean(produce)
+        print(f"{name:<18} {per_sample * 1e6:>11.1f} {statistics.mean(consume) * 1e6:>11.1f} "
+              f"{_pct(latency, 0.5) * 1e6:>11.1f} {_pct(latency, 0.99) * 1e6:>11.1f} {1 / per_sample:>10.0f}")
+    print(f"1 Hz consumer at 30 fps: channel saw {seen}/{produced} samples; file poll sees {polls}/{produced}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+In-process stand-in for the parts of the firebase_admin Firestore client
+used by the hardware loop. Every call that would be a network round trip
+(add, set, batch commit) is counted in `round_trips`, and every document
+write in `writes`, so tests can compare Firestore write cost.
+"""
+
+import itertools
+import threading
+
+
+class FakeFirestore:
+    """Stores documents in a dict keyed by their full path."""
+
+    def __init__(self):
+        self.documents = {}
+        self.round_trips = 0
+        self.writes = 0
+        self.fail = False
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def _round_trip(self, writes):
+        with self._lock:
+            if self.fail:
+                raise ConnectionError('firestore unavailable')
+            self.round_trips += 1
+            self.writes += writes
+
+    def _store(self, path, data, merge=False):
+        with self._lock:
+            if merge and path in self.documents:
+                self.documents[path] = dict(self.documents[path], **data)
+            else:
+                self.documents[path] = dict(data)
+
+    def readings(self, session_id):
+        prefix = f"sessions/{session_id}/readings/"
+        return [doc for path, doc in self.documents.items() if path.startswith(prefix)]
+
+
+class FakeCollection:
+    def __init__(self, db, path):
+        self._db = db
+        self.path = path
+
+    def document(self, doc_id=None):
+        return FakeDocument(self._db, f"{self.path}/{doc_id or f'auto{next(self._db._ids)}'}")
+
+    def add(self, data):
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+
+class FakeDocument:
+    def __init__(self, db, path):
+        self._db = db
+        self.path = path
+
+    def collection(self, name):
+        return FakeCollection(self._db, f"{self.path}/{name}")
+
+    def set(self, data, merge=False):
+        self._db._round_trip(1)
+        self._db._store(self.path, data, merge=merge)
+
+    def get(self):
+        return self._db.documents.get(self.path)
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self._db = db
+        self._ops = []
+
+    def set(self, ref, data, merge=False):
+        self._ops.append((ref.path, data, merge))
+
+    def commit(self):
+        self._db._round_trip(len(self._ops))
+        for path, data, merge in self._ops:
+            self._db._store(path, data, merge=merge)
+        self._ops = []
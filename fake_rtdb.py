@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Firebase Realtime Database REST API.
+
+Serves enough of the protocol for the hardware tests to run offline:
+  - GET  /<path>.json                          -> current value
+  - GET  /<path>.json (Accept: text/event-stream) -> `put`/`patch` event stream
+  - PUT/PATCH/DELETE /<path>.json              -> update and notify streams
+
+Usage:
+    server = FakeRTDB()
+    server.start()
+    ... point code at server.url ...
+    server.stop()
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _split(path):
+    return [part for part in (path or '').split('/') if part]
+
+
+def _set(tree, parts, value):
+    """RTDB set of `value` at `parts` under `tree`; returns the new tree.
+
+    Written independently of control_plane.apply_event so the tests compare the
+    subscriber against separate behaviour: null deletes, and nodes left empty
+    disappear, as in the real database.
+    """
+    if not parts:
+        return value
+    node = dict(tree) if isinstance(tree, dict) else {}
+    child = _set(node.get(parts[0]), parts[1:], value)
+    if child is None or child == {}:
+        node.pop(parts[0], None)
+    else:
+        node[parts[0]] = child
+    return node or None
+
+
+class FakeRTDB:
+    """Threaded in-process RTDB stand-in with SSE support."""
+
+    def __init__(self, initial=None, keepalive_interval=30.0):
+        self.data = initial or {}
+        self.keepalive_interval = keepalive_interval
+        self.requests = []
+        self.fail_writes = False
+        self.write_delay = 0.0
+        self._lock = threading.Condition()
+        self._events = []
+        self._server = None
+        self._thread = None
+        self._closing = False
+
+    # ------------------------------------------
+    # Lifecycle
+    # ------------------------------------------
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._lock:
+            self._closing = True
+            self._lock.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def drop_streams(self):
+        """Simulate a network blip: close every open event stream."""
+        with self._lock:
+            self._events.append(('__drop__', None, None))
+            self._lock.notify_all()
+
+    # ------------------------------------------
+    # Data model
+    # ------------------------------------------
+    def get(self, path):
+        node = self.data
+        for part in _split(path):
+            if not isinstance(node, dict) or part not in node:
+                return None
+            node = node[part]
+        return node
+
+    def write(self, path, value, merge=False):
+        """PUT `value` at `path`, or with `merge` PATCH its keys (which may themselves be paths)."""
+        # JSON round trip: stored values never alias the caller's objects
+        value = json.loads(json.dumps(value))
+        with self._lock:
+            if merge:
+                for key, child in (value or {}).items():
+                    self.data = _set(self.data, _split(path) + _split(key), child)
+            else:
+                self.data = _set(self.data, _split(path), value)
+            if self.data is None:
+                self.data = {}
+            self._events.append(('patch' if merge else 'put', path, value))
+            self._lock.notify_all()
+
+    def _events_for(self, watch_path, start):
+        """Translate global writes into events relative to `watch_path`."""
+        watch = _split(watch_path)
+        out = []
+        for event, path, value in self._events[start:]:
+            if event == '__drop__':
+                out.append((event, None))
+                continue
+            parts = _split(path)
+            if parts[:len(watch)] == watch:
+                relative = '/' + '/'.join(parts[len(watch):])
+                out.append((event, {'path': relative, 'data': value}))
+            elif watch[:len(parts)] == parts:
+                # A write above the watched node replaces it wholesale
+                out.append(('put', {'path': '/', 'data': self.get(watch_path)}))
+        return out
+
+    # ------------------------------------------
+    # HTTP handler
+    # ------------------------------------------
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _path(self):
+                path = self.path.split('?', 1)[0]
+                return path[:-5] if path.endswith('.json') else path
+
+            def _body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                return json.loads(self.rfile.read(length) or b'null')
+
+            def _reply(self, status, value):
+                body = json.dumps(value).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _record(self, body=None):
+                fake.requests.append((self.command, self._path(), body))
+
+            def do_GET(self):
+                self._record()
+                if 'text/event-stream' in (self.headers.get('Accept') or ''):
+                    self._stream()
+                else:
+                    self._reply(200, fake.get(self._path()))
+
+            def _write_through(self, merge):
+                body = self._body()
+                self._record(body)
+                if fake.write_delay:
+                    time.sleep(fake.write_delay)
+                if fake.fail_writes:
+                    self._reply(503, {'error': 'unavailable'})
+                    return
+                fake.write(self._path(), body, merge=merge)
+                self._reply(200, body)
+
+            def do_PUT(self):
+                self._write_through(merge=False)
+
+            def do_PATCH(self):
+                self._write_through(merge=True)
+
+            def do_DELETE(self):
+                self._record()
+                fake.write(self._path(), None)
+                self._reply(200, None)
+
+            def _send_event(self, event, data):
+                chunk = f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8')
+                self.wfile.write(f"{len(chunk):x}\r\n".encode('ascii') + chunk + b"\r\n")
+                self.wfile.flush()
+
+            def _stream(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                watch_path = self._path()
+                with fake._lock:
+                    cursor = len(fake._events)
+                    initial = fake.get(watch_path)
+                try:
+                    self._send_event('put', {'path': '/', 'data': initial})
+                    while True:
+                        with fake._lock:
+                            fake._lock.wait_for(
+                                lambda: len(fake._events) > cursor or fake._closing,
+                                timeout=fake.keepalive_interval,
+                            )
+                            if fake._closing:
+                                return
+                            pending = fake._events_for(watch_path, cursor)
+                            cursor = len(fake._events)
+                        if not pending:
+                            self._send_event('keep-alive', None)
+                        for event, data in pending:
+                            if event == '__drop__':
+                                self.close_connection = True
+                                return
+                            self._send_event(event, data)
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
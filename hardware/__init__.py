@@ -0,0 +1 @@
+"""PostureHealthTracker device code; `hardware.src` holds the service and shared modules."""
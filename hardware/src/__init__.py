@@ -0,0 +1 @@
+"""Service, capture pipeline and the modules shared with the Hailo script (src/pose_estimation.py)."""
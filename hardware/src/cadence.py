@@ -0,0 +1,194 @@
+"""
+Adaptive analysis cadence.
+
+Posture only needs to be sampled quickly while it is changing: a sitter who
+has just slumped should be caught within a second, one who has sat still for
+a minute can be checked every few seconds. `CadenceController` tracks the
+interval until the next analysis between `min_interval` and `max_interval`:
+
+- a change in the posture verdict (or a large jump in the MediaPipe metrics)
+  drops it to `min_interval` and holds it there for `change_hold` seconds,
+  `bad_hold` when posture has just turned bad;
+- every unchanged result after the hold stretches it by `backoff`;
+- CPU load and SoC temperature push it towards `max_interval` on top of that,
+  so a hot or busy Pi sheds analysis work before the firmware throttles it.
+
+The same controller drives the Picamera2 loop (seconds between MediaPipe
+passes) and the Hailo pad probe (seconds between posture checks and preview
+frames); only the bounds differ.
+"""
+
+import glob
+import os
+import time
+
+from . import metrics
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+ENABLED = os.environ.get("POSTURE_ADAPTIVE_CADENCE", "1") != "0"
+# Picamera2 + MediaPipe: seconds between analyses (was a fixed 2.0)
+PICAMERA_MIN_INTERVAL = float(os.environ.get("POSTURE_CADENCE_MIN_INTERVAL", "0.5"))
+PICAMERA_MAX_INTERVAL = float(os.environ.get("POSTURE_CADENCE_MAX_INTERVAL", "6.0"))
+# Hailo pad probe: seconds between processed frames (was every 2nd frame at ~30fps)
+HAILO_MIN_INTERVAL = float(os.environ.get("POSTURE_HAILO_CADENCE_MIN_INTERVAL", "0.066"))
+HAILO_MAX_INTERVAL = float(os.environ.get("POSTURE_HAILO_CADENCE_MAX_INTERVAL", "1.0"))
+BACKOFF = 1.25
+CHANGE_HOLD = 2.0
+# Longer than the 2s bad-posture alert window, so the alert decision sees fast samples
+BAD_HOLD = 5.0
+# Change in shoulder_alignment / neck_angle (normalised units) that counts as movement
+METRIC_CHANGE = 0.03
+CHANGE_KEYS = ('shoulder_alignment', 'neck_angle')
+
+# 1-minute load average per core: no pressure below SOFT, full pressure at HARD
+LOAD_SOFT = 0.7
+LOAD_HARD = 1.2
+# SoC temperature in degrees C; the Pi firmware starts throttling at 80-85
+TEMP_SOFT = 65.0
+TEMP_HARD = 80.0
+THERMAL_ZONES = "/sys/class/thermal/thermal_zone*/temp"
+SYSTEM_SAMPLE_INTERVAL = 5.0
+
+
+def _ramp(value, soft, hard):
+    if value is None or value <= soft:
+        return 0.0
+    if value >= hard:
+        return 1.0
+    return (value - soft) / (hard - soft)
+
+
+def read_temperature(pattern=THERMAL_ZONES):
+    """Hottest thermal zone in degrees C, or None where sysfs has none."""
+    hottest = None
+    for path in glob.glob(pattern):
+        try:
+            with open(path) as f:
+                celsius = int(f.read().strip()) / 1000.0
+        except (OSError, ValueError):
+            continue
+        hottest = celsius if hottest is None else max(hottest, celsius)
+    return hottest
+
+
+def read_load():
+    """1-minute load average per CPU core, or None where it is unavailable."""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return None
+
+
+class SystemPressure:
+    """0.0 (idle, cool) to 1.0 (saturated or hot), re-read every `sample_interval` seconds."""
+
+    def __init__(self, sample_interval=SYSTEM_SAMPLE_INTERVAL, read_load=read_load, read_temperature=read_temperature):
+        self.sample_interval = sample_interval
+        self._read_load = read_load
+        self._read_temperature = read_temperature
+        self._sampled_at = None
+        self.load = None
+        self.temperature = None
+        self.value = 0.0
+
+    def __call__(self, now):
+        if self._sampled_at is None or now - self._sampled_at >= self.sample_interval:
+            self._sampled_at = now
+            self.load = self._read_load()
+            self.temperature = self._read_temperature()
+            self.value = max(_ramp(self.load, LOAD_SOFT, LOAD_HARD), _ramp(self.temperature, TEMP_SOFT, TEMP_HARD))
+        return self.value
+
+
+class CadenceController:
+    """Seconds until the next posture analysis, adapted to posture changes and system pressure."""
+
+    def __init__(self, min_interval=PICAMERA_MIN_INTERVAL, max_interval=PICAMERA_MAX_INTERVAL, backoff=BACKOFF,
+                 change_hold=CHANGE_HOLD, bad_hold=BAD_HOLD, pressure=None, name='picamera2'):
+        if not 0 < min_interval <= max_interval:
+            raise ValueError(f"need 0 < min_interval <= max_interval, got {min_interval}, {max_interval}")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.change_hold = change_hold
+        self.bad_hold = bad_hold
+        self.pressure = pressure if pressure is not None else SystemPressure()
+        self.name = name
+
+        self._base = min_interval
+        self._hold_until = None
+        self._last = None
+        self._last_at = None
+        self.analyses = 0
+        self.changes = 0
+
+    def reset(self):
+        """Start the next session at full rate."""
+        self._base = self.min_interval
+        self._hold_until = None
+        self._last = None
+        self._last_at = None
+
+    def interval(self, now=None):
+        """Current seconds between analyses, within [min_interval, max_interval]."""
+        now = time.monotonic() if now is None else now
+        base = self.min_interval if self._holding(now) else self._base
+        interval = base + self.pressure(now) * (self.max_interval - base)
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def due(self, now=None):
+        """True once `interval()` has passed since the last `observe()`."""
+        now = time.monotonic() if now is None else now
+        return self._last_at is None or now - self._last_at >= self.interval(now)
+
+    def observe(self, camera_metrics, now=None):
+        """Feed one analysis result; returns the interval until the next one."""
+        now = time.monotonic() if now is None else now
+        camera_metrics = camera_metrics or {}
+        self.analyses += 1
+        previous, self._last, self._last_at = self._last, camera_metrics, now
+
+        if previous is not None and self._changed(previous, camera_metrics):
+            self.changes += 1
+            turned_bad = camera_metrics.get('is_bad') and not previous.get('is_bad')
+            self._hold_until = now + (self.bad_hold if turned_bad else self.change_hold)
+            self._base = self.min_interval
+            metrics.inc('posture_cadence_changes_total', path=self.name, kind='bad' if turned_bad else 'change')
+        elif not self._holding(now):
+            self._base = min(self.max_interval, self._base * self.backoff)
+        return self.interval(now)
+
+    def _holding(self, now):
+        return self._hold_until is not None and now < self._hold_until
+
+    @staticmethod
+    def _changed(previous, current):
+        if bool(previous.get('is_bad')) != bool(current.get('is_bad')):
+            return True
+        if previous.get('reason', '') != current.get('reason', ''):
+            return True
+        for key in CHANGE_KEYS:
+            before, after = previous.get(key), current.get(key)
+            if (before is None) != (after is None):
+                return True
+            if before is not None and abs(after - before) >= METRIC_CHANGE:
+                return True
+        return False
+
+    def stats(self):
+        return {
+            'interval': round(self.interval(), 3),
+            'min_interval': self.min_interval,
+            'max_interval': self.max_interval,
+            'analyses': self.analyses,
+            'changes': self.changes,
+            'pressure': getattr(self.pressure, 'value', None),
+        }
+
+    def collector(self):
+        """Gauges for `metrics.add_collector`."""
+        return [
+            ('posture_cadence_interval_seconds', 'gauge', 'Current seconds between posture analyses', self.interval()),
+        ]
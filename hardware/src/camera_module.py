@@ -1,6 +1,15 @@
+import os
 import time
 import base64
+import logging
+import threading
 from . import config
+from . import frame_source
+from . import metrics
+from . import motion_gate
+from . import preview_demand
+
+logger = logging.getLogger(__name__)
 
 try:
     from picamera2 import Picamera2
@@ -16,137 +25,661 @@ try:
 except Exception:
     MP_AVAILABLE = False
 
+# MediaPipe Pose model: 0 = lite, 1 = full, 2 = heavy
+POSE_MODEL_COMPLEXITY = int(os.environ.get("POSTURE_POSE_MODEL_COMPLEXITY", "1"))
+POSE_MIN_DETECTION_CONFIDENCE = 0.5
+POSE_MIN_TRACKING_CONFIDENCE = 0.5
+
+NO_POSE = {'shoulder_alignment': None, 'neck_angle': None, 'is_bad': False, 'reason': ''}
+
+
+def _size(value):
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+# "dual": video configuration with a small `lores` stream for pose inference and a
+# preview-sized `main` stream. "still": the old full-sensor still capture.
+CAMERA_MODE = os.environ.get("POSTURE_CAMERA_MODE", "dual")
+# Preview width <= 400 means the JPEG is encoded without a resize
+PREVIEW_SIZE = _size(os.environ.get("POSTURE_PREVIEW_SIZE", "384x288"))
+# Must be smaller than PREVIEW_SIZE (Picamera2 requires lores <= main)
+INFERENCE_SIZE = _size(os.environ.get("POSTURE_INFERENCE_SIZE", "320x240"))
+# Recorded footage instead of the camera: a video file or a directory of frames
+FRAME_SOURCE = os.environ.get("POSTURE_FRAME_SOURCE", "")
+# "0" plays recorded footage as fast as it is consumed instead of at its frame rate
+FRAME_SOURCE_REALTIME = os.environ.get("POSTURE_FRAME_SOURCE_REALTIME", "1") != "0"
+# Weight of the newest frame in the per-stage timing averages
+STAGE_EWMA_ALPHA = 0.1
+# Threaded mode: seconds between analyses of the newest frame
+ANALYSIS_INTERVAL = 2.0
+# Threaded mode: preview frames per second written for MJPEG viewers (only while one is connected)
+PREVIEW_FPS = 10.0
+PREVIEW_JPEG_QUALITY = 72
+
+
+class FrameBuffer:
+    """Latest-frame double buffer for one writer thread and any number of readers.
+
+    The writer copies each frame into the slot readers are not using, then
+    publishes it by bumping a sequence counter; it never waits on a reader.
+    The counter is odd while a write is in progress (a seqlock): a reader
+    copies the published slot and retries only if the writer has since
+    started overwriting that same slot.
+    """
 
-class CameraModule:
     def __init__(self):
+        self._slots = [None, None]
+        self._seq = 0
+
+    @property
+    def seq(self):
+        """Number of frames published so far."""
+        return self._seq // 2
+
+    def publish(self, timestamp, *arrays):
+        import numpy as np
+        seq = self._seq + 1
+        self._seq = seq  # odd: writing frame seq // 2 + 1
+        index = (seq // 2 + 1) & 1
+        slot = self._slots[index]
+        if slot is None or len(slot[1]) != len(arrays) or any(
+                held.shape != array.shape or held.dtype != array.dtype for held, array in zip(slot[1], arrays)):
+            slot = [timestamp, [np.empty_like(array) for array in arrays]]
+            self._slots[index] = slot
+        for held, array in zip(slot[1], arrays):
+            np.copyto(held, array)
+        slot[0] = timestamp
+        self._seq = seq + 1  # even: published
+
+    def latest(self, retries=3):
+        """(frame number, timestamp, copies of the arrays), or None if nothing is published."""
+        for _ in range(retries):
+            start = self._seq
+            frame = start // 2
+            if frame == 0:
+                return None
+            slot = self._slots[frame & 1]
+            timestamp = slot[0]
+            arrays = [array.copy() for array in slot[1]]
+            # Safe unless the writer began frame + 2, which reuses this slot
+            if self._seq < 2 * frame + 3:
+                return frame, timestamp, arrays
+        return None
+
+
+# Landmark-guided crop for the next pose pass
+ROI_ENABLED = os.environ.get("POSTURE_ROI_CROP", "1") != "0"
+# Padding added on every side, as a fraction of the landmark box size
+ROI_PADDING = 0.35
+# Smallest crop side, as a fraction of the frame (keeps MediaPipe's input sensible)
+ROI_MIN_SIZE = 0.25
+# MediaPipe Pose indices of the landmarks the posture checks use
+ROI_LANDMARKS = (0, 7, 8, 11, 12, 23, 24)  # nose, ears, shoulders, hips
+ROI_VISIBILITY = 0.5
+
+
+class Landmark:
+    """Normalised full-frame landmark (same x/y/visibility attributes as MediaPipe's)."""
+    __slots__ = ('x', 'y', 'visibility')
+
+    def __init__(self, x, y, visibility):
+        self.x = x
+        self.y = y
+        self.visibility = visibility
+
+
+class RoiTracker:
+    """Tracks the padded box around the last detected upper-body landmarks.
+
+    Boxes are normalised (x0, y0, x1, y1). The crop only moves when the
+    subject's box leaves it or becomes much smaller than it, so small shifts
+    do not churn MediaPipe's own tracking. `lose()` drops the crop and the
+    next pass runs on the full frame.
+    """
+
+    def __init__(self, padding=ROI_PADDING, min_size=ROI_MIN_SIZE):
+        self.padding = padding
+        self.min_size = min_size
+        self.box = None
+        self.cropped = 0
+        self.full = 0
+        self.lost = 0
+
+    def crop(self, frame):
+        """(crop, box) for the next pass; box is None for the full frame."""
+        import numpy as np
+
+        if self.box is None:
+            self.full += 1
+            return frame, None
+        height, width = frame.shape[:2]
+        x0, y0, x1, y1 = self.box
+        left, top = int(x0 * width), int(y0 * height)
+        right, bottom = max(left + 1, int(round(x1 * width))), max(top + 1, int(round(y1 * height)))
+        self.cropped += 1
+        # Box edges snapped to whole pixels, so the landmark mapping is exact
+        crop = np.ascontiguousarray(frame[top:bottom, left:right])
+        return crop, (left / width, top / height, right / width, bottom / height)
+
+    def to_frame(self, landmarks, box):
+        """Map crop-normalised landmarks back to full-frame normalised ones."""
+        if box is None:
+            return [Landmark(lm.x, lm.y, lm.visibility) for lm in landmarks]
+        x0, y0, x1, y1 = box
+        return [Landmark(x0 + lm.x * (x1 - x0), y0 + lm.y * (y1 - y0), lm.visibility) for lm in landmarks]
+
+    def update(self, landmarks):
+        points = [landmarks[i] for i in ROI_LANDMARKS
+                  if i < len(landmarks) and landmarks[i].visibility > ROI_VISIBILITY]
+        if len(points) < 2:
+            self.lose()
+            return
+        xs = [p.x for p in points]
+        ys = [p.y for p in points]
+        tight = (min(xs), min(ys), max(xs), max(ys))
+        box = self._padded(*tight, self.padding)
+        # Keep the current crop while it still leaves half the padding around the subject
+        if (self.box is not None and self._contains(self.box, self._padded(*tight, self.padding / 2))
+                and self._area(box) >= 0.5 * self._area(self.box)):
+            return
+        self.box = box
+
+    def lose(self):
+        if self.box is not None:
+            self.lost += 1
+        self.box = None
+
+    def _padded(self, x0, y0, x1, y1, padding):
+        pad_x = max((x1 - x0) * padding, (self.min_size - (x1 - x0)) / 2, 0)
+        pad_y = max((y1 - y0) * padding, (self.min_size - (y1 - y0)) / 2, 0)
+        return (max(0.0, x0 - pad_x), max(0.0, y0 - pad_y), min(1.0, x1 + pad_x), min(1.0, y1 + pad_y))
+
+    @staticmethod
+    def _contains(outer, inner):
+        return outer[0] <= inner[0] and outer[1] <= inner[1] and outer[2] >= inner[2] and outer[3] >= inner[3]
+
+    @staticmethod
+    def _area(box):
+        return (box[2] - box[0]) * (box[3] - box[1])
+
+    def stats(self):
+        total = self.cropped + self.full
+        return {
+            'cropped': self.cropped,
+            'full': self.full,
+            'lost': self.lost,
+            'crop_rate': round(self.cropped / total, 3) if total else 0.0,
+            'box': [round(v, 3) for v in self.box] if self.box else None,
+        }
+
+
+class Preview:
+    """One frame's annotated preview, rendered only when a consumer asks for it.
+
+    The first `jpeg()` call resizes, draws the overlay and encodes; every later
+    consumer shares those bytes. base64 is only produced for `data_url()`.
+    """
+
+    def __init__(self, frame, overlay_lines=None, record_stage=None):
+        self._frame = frame
+        self.overlay_lines = list(overlay_lines) if overlay_lines else None
+        self._record_stage = record_stage
+        self._jpeg = None
+        self._data_url = None
+        self._lock = threading.Lock()
+
+    def jpeg(self):
+        """Encoded JPEG bytes, or None if the frame could not be encoded."""
+        with self._lock:
+            if self._jpeg is None and self._frame is not None:
+                self._jpeg = self._encode(self._frame)
+                # The raw frame is no longer needed once the JPEG exists
+                self._frame = None
+            return self._jpeg
+
+    def data_url(self):
+        jpeg = self.jpeg()
+        if jpeg is None:
+            return None
+        with self._lock:
+            if self._data_url is None:
+                with metrics.timer('base64'):
+                    self._data_url = "data:image/jpeg;base64," + base64.b64encode(jpeg).decode('ascii')
+            return self._data_url
+
+    def _encode(self, preview):
+        import cv2
+
+        started = time.perf_counter()
+        if len(preview.shape) == 3 and preview.shape[1] > 400:
+            height, width = preview.shape[:2]
+            target_width = 360
+            target_height = int(height * (target_width / width))
+            with metrics.timer('resize'):
+                preview = cv2.resize(preview, (target_width, target_height))
+        elif self.overlay_lines:
+            # Drawn on below; the caller's frame must stay untouched
+            preview = preview.copy()
+        self._stage('resize', started)
+
+        if self.overlay_lines:
+            y = 22
+            for line in self.overlay_lines:
+                cv2.putText(preview, line, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 255, 255), 2, cv2.LINE_AA)
+                y += 22
+
+        started = time.perf_counter()
+        with metrics.timer('encode'):
+            ok, buffer = cv2.imencode('.jpg', preview, [int(cv2.IMWRITE_JPEG_QUALITY), PREVIEW_JPEG_QUALITY])
+        self._stage('encode', started)
+        return buffer.tobytes() if ok else None
+
+    def _stage(self, stage, started):
+        if self._record_stage is not None:
+            self._record_stage(stage, started)
+
+
+class AnalysisResult:
+    __slots__ = ('seq', 'timestamp', 'preview', 'metrics')
+
+    def __init__(self, seq, timestamp, preview, metrics):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.preview = preview
+        self.metrics = metrics
+
+    @property
+    def preview_data_url(self):
+        """Encodes on first access; analysis-only readers never pay for it."""
+        return self.preview.data_url() if self.preview is not None else None
+
+
+class CameraModule:
+    def __init__(self, model_complexity=POSE_MODEL_COMPLEXITY, mode=CAMERA_MODE,
+                 preview_size=PREVIEW_SIZE, inference_size=INFERENCE_SIZE,
+                 threaded=False, analysis_interval=ANALYSIS_INTERVAL, gate=None, roi=ROI_ENABLED, cadence=None,
+                 demand=None, source=None):
         self.available = False
-        self.picam2 = None
+        self.model_complexity = model_complexity
+        # One streaming-mode estimator per camera session, so MediaPipe can track
+        # landmarks between frames instead of re-running the person detector
+        self.pose = None
+        self.mode = mode
+        self.preview_size = preview_size
+        self.inference_size = inference_size
+        # Where frames come from: the camera by default, or recorded footage
+        if source is None and FRAME_SOURCE:
+            source = frame_source.from_spec(FRAME_SOURCE, mode, preview_size, inference_size,
+                                            realtime=FRAME_SOURCE_REALTIME)
+        self.source = source
+        self.ended = False
+        # Frame size the pixel posture thresholds were tuned on (the full-sensor still)
+        self.reference_size = None
+        self.frames = 0
+        self.stage_ms = {}
+        # Skips the pose pass while the scene is unchanged (None disables the gate)
+        self.motion_gate = gate if gate is not None else (motion_gate.MotionGate() if motion_gate.ENABLED else None)
+        self._last_posture_metrics = None
+        # Runs the next pose pass on the region around the last detected landmarks
+        self.roi = RoiTracker() if roi else None
+
+        # Threaded mode: a producer thread owns the camera and keeps the newest
+        # frame and analysis result ready for non-blocking readers
+        self.threaded = threaded
+        self.analysis_interval = analysis_interval
+        # Adapts the analysis interval to posture changes and system load (None: fixed interval)
+        self.cadence = cadence
+        # Previews are only encoded and written for the MJPEG server while a viewer wants them
+        self.demand = demand if demand is not None else preview_demand.PreviewDemand()
+        self.previews_published = 0
+        self.overlay_lines = None
+        self.frame_buffer = FrameBuffer()
+        self._result = None
+        self._producer = None
+        self._producer_stop = threading.Event()
+
+    @property
+    def picam2(self):
+        """The Picamera2 behind a camera source, or None for recorded footage."""
+        return getattr(self.source, 'camera', None)
+
+    @picam2.setter
+    def picam2(self, camera):
+        # An already configured camera (or a stand-in for one) becomes the frame source
+        self.source = frame_source.Picamera2Source(self.mode, self.preview_size, self.inference_size, camera=camera)
+
+    @property
+    def recorded(self):
+        """True when frames come from a video file or frame directory rather than the camera."""
+        return self.source is not None and not isinstance(self.source, frame_source.Picamera2Source)
 
     def start(self):
-        if not HW or self.available:
-            return self.available
+        if self.available:
+            return True
+        if self.ended:
+            return False
+        if self.source is None:
+            if not HW:
+                return False
+            self.source = frame_source.Picamera2Source(self.mode, self.preview_size, self.inference_size)
+        if self.source.inference_size is None and self.mode != 'still':
+            # Recorded footage is scaled down for inference like the lores stream
+            self.source.inference_size = self.inference_size
         try:
-            self.picam2 = Picamera2()
-            camera_config = self.picam2.create_still_configuration()
-            self.picam2.configure(camera_config)
-            self.picam2.start()
-            self.available = True
+            self.available = self.source.start()
         except Exception:
             self.available = False
-            self.picam2 = None
+        if self.available:
+            self.preview_size = self.source.preview_size or self.preview_size
+            self.inference_size = self.source.inference_size or self.inference_size
+            self.reference_size = self.source.reference_size
+            if self.threaded:
+                self.start_producer()
         return self.available
 
+    def start_producer(self):
+        if self._producer and self._producer.is_alive():
+            return
+        self._producer_stop.clear()
+        self._result = None
+        self._producer = threading.Thread(target=self._produce, name='camera-producer', daemon=True)
+        self._producer.start()
+
+    def stop_producer(self):
+        if self._producer is None:
+            return
+        self._producer_stop.set()
+        self._producer.join(timeout=5)
+        self._producer = None
+
     def stop(self):
-        if not self.available or self.picam2 is None:
+        self.stop_producer()
+        self.close_pose()
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+        self._last_posture_metrics = None
+        if self.roi is not None:
+            self.roi.lose()
+        if self.cadence is not None:
+            self.cadence.reset()
+        self.ended = False
+        if not self.available or self.source is None:
+            return
+        self.source.stop()
+        self.available = False
+
+    def get_pose(self):
+        if self.pose is None:
+            self.pose = mp.solutions.pose.Pose(
+                static_image_mode=False,
+                model_complexity=self.model_complexity,
+                min_detection_confidence=POSE_MIN_DETECTION_CONFIDENCE,
+                min_tracking_confidence=POSE_MIN_TRACKING_CONFIDENCE,
+            )
+        return self.pose
+
+    def close_pose(self):
+        if self.pose is None:
             return
         try:
-            self.picam2.stop()
+            self.pose.close()
         except Exception:
             pass
-        self.available = False
+        self.pose = None
 
     def capture(self, path=config.CAMERA_CAPTURE_PATH):
         if not self.available and not self.start():
             return None
-        img = self.picam2.capture_array()
+        img, _ = self.source.read()
         import cv2
         cv2.imwrite(path, img)
         return path
 
+    def capture_frames(self):
+        """One (preview BGR frame, inference frame) pair from the frame source.
+
+        Recorded sources raise frame_source.EndOfStream after their last frame.
+        """
+        frames = self.source.read()
+        if self.recorded:
+            # Recorded footage takes its sizes from the frames themselves
+            self.reference_size = self.source.reference_size
+            self.preview_size = self.source.preview_size
+        return frames
+
+    def inference_rgb(self, frame):
+        import cv2
+        if frame.ndim == 2:
+            # Packed I420 from the lores stream, converted in full colour. (COLOR_YUV420p2RGB
+            # is OpenCV's alias for YV12, which has the chroma planes the other way round.)
+            return cv2.cvtColor(frame, cv2.COLOR_YUV2RGB_I420)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    @staticmethod
+    def inference_luma(frame):
+        """Grayscale view of an inference frame for the motion gate: the Y plane of I420, else the frame."""
+        if frame.ndim == 2:
+            return frame[:frame.shape[0] * 2 // 3]
+        return frame
+
+    def _record_stage(self, stage, started):
+        elapsed = (time.perf_counter() - started) * 1000
+        previous = self.stage_ms.get(stage)
+        self.stage_ms[stage] = elapsed if previous is None else previous + STAGE_EWMA_ALPHA * (elapsed - previous)
+
+    def stats(self):
+        """Per-frame pixels handled and average capture/convert/resize times (ms)."""
+        preview_w, preview_h = self.preview_size
+        inference_w, inference_h = self.inference_size if self.mode != 'still' else self.preview_size
+        return {
+            'source': self.source.name if self.source is not None else None,
+            'mode': self.mode,
+            'frames': self.frames,
+            'preview_size': list(self.preview_size),
+            'inference_size': [inference_w, inference_h],
+            'pixels_per_frame': preview_w * preview_h + (inference_w * inference_h if self.mode != 'still' else 0),
+            **{f'{stage}_ms': round(ms, 2) for stage, ms in self.stage_ms.items()},
+            'motion_gate': self.motion_gate.stats() if self.motion_gate is not None else None,
+            'roi': self.roi.stats() if self.roi is not None else None,
+            'cadence': self.cadence.stats() if self.cadence is not None else None,
+            'previews_published': self.previews_published,
+        }
+
+    def latest_frame(self):
+        """Newest (frame number, timestamp, [preview, inference]) from the producer, never blocking."""
+        return self.frame_buffer.latest()
+
+    def latest_result(self):
+        """Newest AnalysisResult from the producer, or None before the first one."""
+        return self._result
+
+    def next_interval(self, now=None):
+        """Seconds between analyses: the cadence controller's, or the fixed `analysis_interval`."""
+        if self.cadence is None:
+            return self.analysis_interval
+        return self.cadence.interval(now)
+
+    def observe_result(self, posture_metrics, now=None):
+        if self.cadence is not None:
+            self.cadence.observe(posture_metrics, now)
+
+    def publish_preview(self, preview):
+        """Write `preview` for the MJPEG server, sharing its encode with any other consumer."""
+        jpeg = preview.jpeg() if preview is not None else None
+        if jpeg is None or not preview_demand.write_frame(jpeg):
+            return False
+        self.previews_published += 1
+        metrics.inc('posture_previews_published_total', source='picamera2')
+        return True
+
+    def _produce(self):
+        last_analysis = None
+        last_preview = None
+        preview_interval = 1.0 / PREVIEW_FPS
+        while not self._producer_stop.is_set():
+            try:
+                started = time.perf_counter()
+                with metrics.timer('capture'):
+                    preview, inference = self.capture_frames()
+                self._record_stage('capture', started)
+                timestamp = time.time()
+                self.frame_buffer.publish(timestamp, preview, inference)
+
+                now = time.monotonic()
+                if last_analysis is None or now - last_analysis >= self.next_interval(now):
+                    last_analysis = now
+                    seq = self.frame_buffer.seq
+                    result_preview, posture_metrics = self.process_frames(preview, inference, self.overlay_lines,
+                                                                          publish=False)
+                    self._result = AnalysisResult(seq, timestamp, result_preview, posture_metrics)
+                    self.observe_result(posture_metrics, now)
+                else:
+                    result_preview = None
+
+                # Viewers get a smooth stream between analyses, annotated with the latest overlay
+                if (last_preview is None or now - last_preview >= preview_interval) and self.demand.active(now):
+                    last_preview = now
+                    self.publish_preview(result_preview or Preview(preview, self.overlay_lines, self._record_stage))
+            except frame_source.EndOfStream:
+                self._end_of_stream()
+                return
+            except Exception as error:
+                logger.error(f"Camera producer stopped: {error}")
+                self.available = False
+                self.source.stop()
+                return
+
+    def _end_of_stream(self):
+        # A finished recording stays finished until the session is stopped
+        logger.info(f"Frame source {self.source.name} finished after {self.source.frames_read} frames")
+        self.ended = True
+        self.available = False
+        self.source.stop()
+
     def capture_preview_and_metrics(self, overlay_lines=None):
+        """(preview data URL, posture metrics); encodes the preview, so use `capture_and_analyze` when only metrics are needed."""
+        preview, posture_metrics = self.capture_and_analyze(overlay_lines)
+        return (preview.data_url() if preview is not None else None), posture_metrics
+
+    def capture_and_analyze(self, overlay_lines=None):
+        """(lazy Preview, posture metrics) for the newest frame; nothing is encoded until a consumer asks."""
         if not self.available and not self.start():
             return None, {}
 
-        import cv2
+        if self.threaded:
+            # Non-blocking: the producer thread does the capture and analysis
+            self.overlay_lines = overlay_lines
+            result = self._result
+            if result is None:
+                return None, {}
+            return result.preview, result.metrics
 
-        frame = self.picam2.capture_array()
-        metrics = self.analyze_posture(frame)
+        started = time.perf_counter()
+        try:
+            with metrics.timer('capture'):
+                preview, inference = self.capture_frames()
+        except frame_source.EndOfStream:
+            self._end_of_stream()
+            return None, {}
+        self._record_stage('capture', started)
+        return self.process_frames(preview, inference, overlay_lines)
 
-        preview = frame
-        if preview is not None and len(preview.shape) == 3 and preview.shape[1] > 400:
-            height, width = preview.shape[:2]
-            target_width = 360
-            target_height = int(height * (target_width / width))
-            preview = cv2.resize(preview, (target_width, target_height))
+    def process_frames(self, preview, inference, overlay_lines=None, publish=True):
+        """Analyse one captured frame pair; returns (lazy Preview, posture metrics).
 
-        if preview is not None and overlay_lines:
-            y = 22
-            for line in overlay_lines:
-                cv2.putText(preview, line, (10, y), cv2.FONT_HERSHEY_SIMPLEX, 0.55, (255, 255, 255), 2, cv2.LINE_AA)
-                y += 22
+        With `publish`, the preview is encoded and written for the MJPEG server
+        if a viewer is connected.
+        """
+        with metrics.timer('motion_gate'):
+            if self.motion_gate is None:
+                analyze = True
+            elif self._last_posture_metrics is None:
+                # Nothing to reuse: the gate only tracks this frame, its hit/miss counters stay honest
+                self.motion_gate.set_reference(self.inference_luma(inference))
+                analyze = True
+            else:
+                analyze = self.motion_gate.should_analyze(self.inference_luma(inference))
+        if analyze:
+            started = time.perf_counter()
+            with metrics.timer('convert'):
+                rgb = self.inference_rgb(inference)
+            self._record_stage('convert', started)
 
-        ok, buffer = cv2.imencode('.jpg', preview, [int(cv2.IMWRITE_JPEG_QUALITY), 72])
-        if not ok:
-            return None, metrics or {}
+            with metrics.timer('analyze'):
+                posture_metrics = self.analyze_rgb(rgb, self.reference_size)
+            self._last_posture_metrics = posture_metrics
+        else:
+            # Scene unchanged since the last pose pass: its metrics still hold
+            posture_metrics = dict(self._last_posture_metrics)
+        self.frames += 1
 
-        preview_data_url = "data:image/jpeg;base64," + base64.b64encode(buffer).decode('ascii')
-        return preview_data_url, metrics or {}
+        preview = Preview(preview, overlay_lines, self._record_stage) if preview is not None else None
+        if publish and preview is not None and self.demand.active():
+            self.publish_preview(preview)
+        return preview, posture_metrics or {}
 
     def analyze_posture(self, path):
         # Returns posture metrics: either Hailo-style (is_bad/reason) or MediaPipe metrics
         if not MP_AVAILABLE:
-            return {'shoulder_alignment': None, 'neck_angle': None, 'is_bad': False, 'reason': ''}
+            return dict(NO_POSE)
         
         import cv2
-        import mediapipe as mp
         
-        mp_pose = mp.solutions.pose
         img = cv2.imread(path) if isinstance(path, str) else path
         if img is None:
-            return {'shoulder_alignment': None, 'neck_angle': None, 'is_bad': False, 'reason': ''}
-        
-        img_height, img_width = img.shape[:2]
+            return dict(NO_POSE)
         
-        with mp_pose.Pose(static_image_mode=True) as pose:
-            res = pose.process(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+        rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        if isinstance(path, str):
+            # An unrelated still image: tracking state from the live stream does not apply
+            with mp.solutions.pose.Pose(static_image_mode=True, model_complexity=self.model_complexity) as pose:
+                res = pose.process(rgb)
             if not res.pose_landmarks:
-                return {'shoulder_alignment': None, 'neck_angle': None, 'is_bad': False, 'reason': ''}
-            
-            lm = res.pose_landmarks.landmark
-            
-            # MediaPipe metrics (for scoring compatibility)
-            left_sh = lm[mp_pose.PoseLandmark.LEFT_SHOULDER.value]
-            right_sh = lm[mp_pose.PoseLandmark.RIGHT_SHOULDER.value]
-            nose = lm[mp_pose.PoseLandmark.NOSE.value]
-            shoulder_alignment = abs(left_sh.y - right_sh.y)
-            neck_angle = nose.y - (left_sh.y + right_sh.y) / 2
-            
-            # Hailo-style side-view posture checks
-            left_ear = lm[mp_pose.PoseLandmark.LEFT_EAR.value]
-            right_ear = lm[mp_pose.PoseLandmark.RIGHT_EAR.value]
-            left_hip = lm[mp_pose.PoseLandmark.LEFT_HIP.value]
-            right_hip = lm[mp_pose.PoseLandmark.RIGHT_HIP.value]
-            
-            # Convert normalized coords to pixel coords
-            def pt_px(lm_point):
-                return (int(lm_point.x * img_width), int(lm_point.y * img_height))
-            
-            ear = pt_px(left_ear) if left_ear.visibility > 0.5 else (pt_px(right_ear) if right_ear.visibility > 0.5 else None)
-            shoulder = pt_px(left_sh) if left_sh.visibility > 0.5 else (pt_px(right_sh) if right_sh.visibility > 0.5 else None)
-            hip = pt_px(left_hip) if left_hip.visibility > 0.5 else (pt_px(right_hip) if right_hip.visibility > 0.5 else None)
-            
-            is_bad = False
-            reason = ""
-            HEAD_FORWARD_THRESHOLD = 12  # pixels
-            SHOULDER_FORWARD_THRESHOLD = 18  # pixels
-            
-            # Check 1: Head forward (ear forward of shoulder)
-            if ear and shoulder:
-                head_forward = abs(ear[0] - shoulder[0])
-                if head_forward > HEAD_FORWARD_THRESHOLD:
-                    is_bad = True
-                    reason = "Head forward"
-            
-            # Check 2: Slouching (shoulder forward of hip)
-            if shoulder and hip and not is_bad:
-                shoulder_forward = abs(shoulder[0] - hip[0])
-                if shoulder_forward > SHOULDER_FORWARD_THRESHOLD:
-                    is_bad = True
-                    reason = "Slouching"
-            
-            return {
-                'shoulder_alignment': shoulder_alignment,
-                'neck_angle': neck_angle,
-                'is_bad': is_bad,
-                'reason': reason
-            }
+                return dict(NO_POSE)
+            return self.metrics_from_landmarks(res.pose_landmarks.landmark, img.shape[1], img.shape[0])
+        return self.analyze_rgb(rgb)
+
+    def analyze_rgb(self, rgb, reference_size=None):
+        """Posture metrics for an RGB frame from the live stream.
+
+        Landmarks are normalised, so they are mapped onto `reference_size`
+        (default: the frame's own size) before the pixel thresholds apply. The
+        dual-stream path passes the sensor size, keeping the thresholds' meaning
+        from the full-resolution still capture.
+        """
+        if not MP_AVAILABLE:
+            return dict(NO_POSE)
+        landmarks = self.detect_landmarks(rgb)
+        if landmarks is None:
+            return dict(NO_POSE)
+        width, height = reference_size or (rgb.shape[1], rgb.shape[0])
+        return self.metrics_from_landmarks(landmarks, width, height)
+
+    def detect_landmarks(self, rgb):
+        """Full-frame normalised landmarks, running on the tracked crop when there is one."""
+        if self.roi is None:
+            res = self.get_pose().process(rgb)
+            return res.pose_landmarks.landmark if res.pose_landmarks else None
+
+        crop, box = self.roi.crop(rgb)
+        res = self.get_pose().process(crop)
+        metrics.inc('posture_roi_total', mode='full' if box is None else 'crop')
+        if not res.pose_landmarks and box is not None:
+            # Subject left the crop: fall back to the full frame straight away
+            self.roi.lose()
+            crop, box = self.roi.crop(rgb)
+            res = self.get_pose().process(crop)
+            metrics.inc('posture_roi_total', mode='full')
+        if not res.pose_landmarks:
+            self.roi.lose()
+            return None
+        landmarks = self.roi.to_frame(res.pose_landmarks.landmark, box)
+        self.roi.update(landmarks)
+        return landmarks
+
+    @staticmethod
+    def metrics_from_landmarks(lm, img_width, img_height):
+        # Same side-view rules as the Hailo pipeline, on the 17 COCO keypoints
+        from . import posture_engine
+        return posture_engine.evaluate(posture_engine.from_mediapipe(lm), img_width, img_height)
@@ -0,0 +1,285 @@
+"""
+Control-plane subscriber for the Firebase RTDB `system_state` node.
+
+Holds one long-lived `text/event-stream` connection to the RTDB REST API
+instead of polling every second. `put`/`patch` events are applied to an
+in-memory copy of `system_state`, and anyone blocked in `wait_for_change()`
+is woken as soon as `camera_command` or `activeSessionId` changes.
+"""
+
+import copy
+import json
+import logging
+import random
+import socket
+import threading
+import time
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+WATCHED_KEYS = ('camera_command', 'activeSessionId')
+CONNECT_TIMEOUT = 10
+# RTDB sends a keep-alive event every ~30s; anything quieter is a dead socket
+READ_TIMEOUT = 75
+BACKOFF_INITIAL = 1.0
+BACKOFF_MAX = 30.0
+
+
+def apply_event(state, path, data, merge=False):
+    """Apply an RTDB `put` (merge=False) or `patch` (merge=True) to `state`.
+
+    Returns the new state; the input dict is never mutated in place.
+    """
+    parts = [part for part in (path or '/').split('/') if part]
+    state = copy.deepcopy(state) if isinstance(state, dict) else {}
+
+    if not parts:
+        if merge and isinstance(data, dict):
+            for key, value in data.items():
+                state = apply_event(state, key, value)
+            return state
+        return copy.deepcopy(data) if isinstance(data, dict) else {}
+
+    node = state
+    for part in parts[:-1]:
+        child = node.get(part)
+        if not isinstance(child, dict):
+            child = {}
+            node[part] = child
+        node = child
+
+    leaf = parts[-1]
+    if merge and isinstance(data, dict):
+        child = node.get(leaf)
+        node[leaf] = apply_event(child if isinstance(child, dict) else {}, '/', data, merge=True)
+    elif data is None:
+        node.pop(leaf, None)
+    else:
+        node[leaf] = copy.deepcopy(data)
+    return state
+
+
+def iter_sse_events(lines):
+    """Yield (event, data) pairs from an iterable of decoded SSE lines."""
+    event = None
+    data_lines = []
+    for line in lines:
+        if line is None:
+            continue
+        if line == '':
+            if event is not None or data_lines:
+                yield event or 'message', '\n'.join(data_lines)
+            event = None
+            data_lines = []
+            continue
+        if line.startswith(':'):
+            continue
+        field, _, value = line.partition(':')
+        if value.startswith(' '):
+            value = value[1:]
+        if field == 'event':
+            event = value
+        elif field == 'data':
+            data_lines.append(value)
+
+
+def _abort_response(response):
+    """Unblock a thread stuck reading `response` by shutting its socket down.
+
+    `response.close()` would wait for the reader to release the buffer lock,
+    so go straight to the socket. Falls back to the read timeout if the
+    socket cannot be reached.
+    """
+    if response is None:
+        return
+    raw = getattr(response, 'raw', None)
+    candidates = (
+        getattr(getattr(raw, '_connection', None), 'sock', None),
+        getattr(getattr(getattr(getattr(raw, '_fp', None), 'fp', None), 'raw', None), '_sock', None),
+    )
+    for sock in candidates:
+        if sock is None:
+            continue
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+            return
+        except OSError:
+            pass
+
+
+class ControlPlaneSubscriber:
+    """Background thread that mirrors `system_state` from an RTDB event stream."""
+
+    def __init__(self, base_url, node='system_state', watched_keys=WATCHED_KEYS,
+                 backoff_initial=BACKOFF_INITIAL, backoff_max=BACKOFF_MAX,
+                 read_timeout=READ_TIMEOUT):
+        self.url = f"{base_url.rstrip('/')}/{node}.json"
+        self.watched_keys = tuple(watched_keys)
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.read_timeout = read_timeout
+
+        self._state = {}
+        self._version = 0
+        self._connected = False
+        self._reconnects = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._response = None
+        self._session = requests.Session()
+        self._listeners = []
+
+    # ------------------------------------------
+    # Lifecycle
+    # ------------------------------------------
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='control-plane', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        _abort_response(self._response)
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        self._session.close()
+
+    # ------------------------------------------
+    # Consumer API
+    # ------------------------------------------
+    @property
+    def connected(self):
+        return self._connected
+
+    @property
+    def version(self):
+        """Counter bumped every time a watched key changes."""
+        return self._version
+
+    def add_listener(self, callback):
+        """Call `callback()` from the subscriber thread whenever a watched key changes."""
+        self._listeners.append(callback)
+
+    def snapshot(self):
+        with self._cond:
+            return copy.deepcopy(self._state)
+
+    def wait_for_change(self, timeout=None, since=None):
+        """Block until a watched key changes (or `timeout` elapses).
+
+        `since` is a value previously read from `version`; passing it avoids
+        missing a change that landed between the caller's last look and this
+        call. Returns True if a change was observed.
+        """
+        with self._cond:
+            start_version = self._version if since is None else since
+            if self._version != start_version:
+                return True
+            self._cond.wait_for(
+                lambda: self._version != start_version or self._stop.is_set(),
+                timeout=timeout,
+            )
+            return self._version != start_version
+
+    def stats(self):
+        return {
+            'connected': self._connected,
+            'reconnects': self._reconnects,
+            'version': self._version,
+        }
+
+    # ------------------------------------------
+    # Stream handling
+    # ------------------------------------------
+    def _set_state(self, new_state):
+        with self._cond:
+            old_state = self._state
+            self._state = new_state
+            changed = any(old_state.get(key) != new_state.get(key) for key in self.watched_keys)
+            if changed:
+                self._version += 1
+                self._cond.notify_all()
+        if changed:
+            logger.debug(
+                f"system_state changed: camera_command={new_state.get('camera_command')}, "
+                f"activeSessionId={new_state.get('activeSessionId')}"
+            )
+            for callback in self._listeners:
+                try:
+                    callback()
+                except Exception as error:
+                    logger.debug(f"system_state listener failed: {error}")
+
+    def _handle_event(self, event, raw_data):
+        if event in ('put', 'patch'):
+            try:
+                message = json.loads(raw_data)
+            except ValueError:
+                logger.warning(f"Ignoring malformed {event} event: {raw_data!r}")
+                return
+            with self._cond:
+                current = self._state
+            self._set_state(apply_event(current, message.get('path', '/'), message.get('data'),
+                                        merge=(event == 'patch')))
+        elif event == 'cancel':
+            logger.warning(f"system_state stream cancelled by server: {raw_data}")
+            raise ConnectionError('stream cancelled')
+        elif event == 'auth_revoked':
+            logger.warning("system_state stream auth revoked; reconnecting")
+            raise ConnectionError('auth revoked')
+        # keep-alive and unknown events only prove the socket is alive
+
+    def _listen_once(self):
+        response = self._session.get(
+            self.url,
+            headers={'Accept': 'text/event-stream'},
+            stream=True,
+            timeout=(CONNECT_TIMEOUT, self.read_timeout),
+        )
+        self._response = response
+        try:
+            response.raise_for_status()
+            self._connected = True
+            logger.info(f"Subscribed to {self.url}")
+            lines = response.iter_lines(decode_unicode=True)
+            for event, data in iter_sse_events(lines):
+                if self._stop.is_set():
+                    return
+                self._handle_event(event, data)
+        finally:
+            self._connected = False
+            self._response = None
+            response.close()
+
+    def _run(self):
+        backoff = self.backoff_initial
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self._listen_once()
+            except Exception as error:
+                if self._stop.is_set():
+                    break
+                logger.warning(f"system_state stream error: {error}")
+
+            if self._stop.is_set():
+                break
+
+            # A connection that stayed up for a while resets the backoff
+            if time.monotonic() - started > self.backoff_max:
+                backoff = self.backoff_initial
+            self._reconnects += 1
+            delay = backoff * (0.5 + random.random() / 2)
+            logger.info(f"Reconnecting to system_state stream in {delay:.1f}s")
+            self._stop.wait(delay)
+            backoff = min(backoff * 2, self.backoff_max)
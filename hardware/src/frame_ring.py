@@ -0,0 +1,240 @@
+"""
+Shared-memory ring of encoded preview frames.
+
+The capture pipeline (producer) and the MJPEG server (consumer) share one
+mmap'd file in /dev/shm, so frames are handed over without per-frame
+open/write/rename and open/read syscalls, and never torn:
+
+  header  magic, slot count, slot size, sequence of the latest frame
+  slot i  seqlock word, length, timestamp, then up to `slot_size` JPEG bytes
+
+Frame n goes to slot n % slots. The writer sets the slot's seqlock word to
+2n + 1 (odd: being written), copies the bytes, then sets it to 2n, and only
+then advances the header sequence. A reader copies the slot out once and
+accepts it only if the word read 2n both before and after the copy and the
+bytes are a whole JPEG (SOI ... EOI); otherwise the writer lapped it and the
+reader takes the next frame instead. The ring file is created under a temp
+name and renamed into place, so readers never map a half-built header. A
+frame larger than the slots makes the writer build a bigger ring the same
+way; readers notice the new inode and remap.
+
+There is one writer at a time: a new writer replaces the ring.
+
+`FrameReader` is the consumer side. It reads from the ring when one has been
+published, and otherwise from preview_demand's FRAME_FILE (written by
+atomic rename when the ring is disabled or /dev/shm is unusable).
+"""
+
+import mmap
+import os
+import struct
+import time
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+_SHM_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else '/tmp'
+# Empty or "off" disables the ring: frames go to the frame file
+RING_PATH = os.environ.get("POSTURE_FRAME_RING", os.path.join(_SHM_DIR, 'posturehealthtracker_frames.ring'))
+SLOTS = 4
+# Preview JPEGs are tens of KB; bigger frames grow the ring
+SLOT_SIZE = 256 * 1024
+# How often a reader checks whether the ring was replaced
+REOPEN_CHECK = 1.0
+
+_MAGIC = b'PHTRING1'
+_HEADER = struct.Struct('<8sIIQ')       # magic, slots, slot size, latest sequence
+_SLOT_HEADER = struct.Struct('<QId')    # seqlock word, length, timestamp
+_HEADER_SIZE = 64
+_SLOT_HEADER_SIZE = 32
+_SEQUENCE_OFFSET = 16
+
+
+def enabled():
+    return RING_PATH not in ('', 'off')
+
+
+def _slot_offset(index, slot_size):
+    return _HEADER_SIZE + index * (_SLOT_HEADER_SIZE + slot_size)
+
+
+def _is_jpeg(data):
+    return data[:2] == b'\xff\xd8' and data[-2:] == b'\xff\xd9'
+
+
+class FrameRingWriter:
+    """Producer side: `write(jpeg)` publishes one frame."""
+
+    def __init__(self, path=None, slots=SLOTS, slot_size=SLOT_SIZE):
+        self.path = path or RING_PATH
+        self.slots = slots
+        self.slot_size = slot_size
+        self.sequence = 0
+        self._map = None
+
+    def write(self, jpeg, timestamp=None):
+        """False if the ring cannot be created; the caller falls back to the frame file."""
+        try:
+            if self._map is None or len(jpeg) > self.slot_size:
+                self._create(max(self.slot_size, _next_power_of_two(len(jpeg))))
+        except OSError:
+            return False
+        self.sequence += 1
+        offset = _slot_offset(self.sequence % self.slots, self.slot_size)
+        word = self.sequence * 2
+        _SLOT_HEADER.pack_into(self._map, offset, word + 1, len(jpeg), time.time() if timestamp is None else timestamp)
+        self._map[offset + _SLOT_HEADER_SIZE:offset + _SLOT_HEADER_SIZE + len(jpeg)] = jpeg
+        struct.pack_into('<Q', self._map, offset, word)
+        struct.pack_into('<Q', self._map, _SEQUENCE_OFFSET, self.sequence)
+        return True
+
+    def _create(self, slot_size):
+        self.close()
+        size = _slot_offset(self.slots, slot_size)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            ring = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        _HEADER.pack_into(ring, 0, _MAGIC, self.slots, slot_size, 0)
+        os.replace(tmp_path, self.path)
+        self._map = ring
+        self.slot_size = slot_size
+        self.sequence = 0
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class FrameRingReader:
+    """Consumer side of one ring, remapped when the writer replaces it."""
+
+    def __init__(self, path=None):
+        self.path = path or RING_PATH
+        self._map = None
+        self._inode = None
+        self._checked_at = None
+        self.slots = 0
+        self.slot_size = 0
+        self.torn = 0
+
+    def sequence(self):
+        """(inode, sequence) of the latest frame, or None with no ring; cheap enough to poll."""
+        if not self._ensure_mapped():
+            return None
+        return self._inode, struct.unpack_from('<Q', self._map, _SEQUENCE_OFFSET)[0]
+
+    def read(self):
+        """((inode, sequence), timestamp, jpeg bytes) for the newest intact frame, or None."""
+        attempt = 0
+        while True:
+            signature = self.sequence()
+            if signature is None or signature[1] == 0 or attempt == self.slots:
+                return None
+            attempt += 1
+            sequence = signature[1]
+            offset = _slot_offset(sequence % self.slots, self.slot_size)
+            word, length, timestamp = _SLOT_HEADER.unpack_from(self._map, offset)
+            if word != sequence * 2 or length > self.slot_size:
+                self.torn += 1
+                continue
+            start = offset + _SLOT_HEADER_SIZE
+            # The only copy: one bytes object that every viewer then sends as is
+            frame = self._map[start:start + length]
+            if struct.unpack_from('<Q', self._map, offset)[0] != word or not _is_jpeg(frame):
+                self.torn += 1
+                continue
+            return signature, timestamp, frame
+
+    def _ensure_mapped(self):
+        now = time.monotonic()
+        if self._map is not None and now - self._checked_at < REOPEN_CHECK:
+            return True
+        self._checked_at = now
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            self.close()
+            return False
+        if self._map is not None and stat.st_ino == self._inode:
+            return True
+        self.close()
+        try:
+            with open(self.path, 'rb') as f:
+                ring = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+        magic, slots, slot_size, _ = _HEADER.unpack_from(ring, 0)
+        if magic != _MAGIC or len(ring) < _slot_offset(slots, slot_size):
+            ring.close()
+            return False
+        self._map, self._inode = ring, stat.st_ino
+        self.slots, self.slot_size = slots, slot_size
+        return True
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._map = None
+        self._inode = None
+
+
+class FrameReader:
+    """Latest published preview frame: from the ring when there is one, else from the frame file."""
+
+    def __init__(self, file_path, ring_path=None):
+        self.file_path = file_path
+        self.ring = FrameRingReader(ring_path) if ring_path or enabled() else None
+
+    def signature(self):
+        """Changes whenever a new frame is published; None before the first one."""
+        if self.ring is not None:
+            signature = self.ring.sequence()
+            if signature is not None:
+                return signature
+        try:
+            stat = os.stat(self.file_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def read(self):
+        """(signature, timestamp, jpeg bytes) or None."""
+        if self.ring is not None and self.ring.sequence() is not None:
+            return self.ring.read()
+        try:
+            with open(self.file_path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                frame = f.read()
+        except OSError:
+            return None
+        if not frame:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino), stat.st_mtime, frame
+
+    def close(self):
+        if self.ring is not None:
+            self.ring.close()
+
+
+def _next_power_of_two(value):
+    return 1 << max(0, value - 1).bit_length()
+
+
+_writer = None
+
+
+def publish(jpeg):
+    """Write one frame into the ring at RING_PATH; False if the ring is disabled or unusable."""
+    global _writer
+    if not enabled():
+        return False
+    if _writer is None or _writer.path != RING_PATH:
+        if _writer is not None:
+            _writer.close()
+        _writer = FrameRingWriter(RING_PATH)
+    return _writer.write(jpeg)
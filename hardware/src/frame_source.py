@@ -0,0 +1,320 @@
+"""
+Frame sources for CameraModule.
+
+A source yields (preview BGR frame, inference frame) pairs, the same shape
+of data the dual-stream Picamera2 configuration produces, so everything
+after capture (motion gate, ROI crop, MediaPipe, scoring) runs unchanged:
+
+- `Picamera2Source`: the live camera (dual main/lores streams or full-sensor still)
+- `VideoFileSource`: a recorded video via cv2.VideoCapture
+- `DirectorySource`: a directory of JPEG/PNG frames, in name order
+
+File-backed sources play back in real time (paced to the recording's frame
+rate) or, with `realtime=False`, as fast as the pipeline consumes them.
+At the end of the recording `read()` raises `EndOfStream`, unless `loop`.
+
+`from_spec()` builds a source from POSTURE_FRAME_SOURCE: empty or
+"picamera2" for the camera, otherwise a video file or frame directory path.
+"""
+
+import os
+import time
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+# Frame rate assumed for directories and for videos that do not report one
+DEFAULT_FPS = 30.0
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+class EndOfStream(Exception):
+    """A recorded source has no more frames."""
+
+
+class FrameSource:
+    """Interface shared by every backend.
+
+    `preview_size` and `inference_size` are (width, height); `reference_size`
+    is the frame size the pixel posture thresholds apply to (the sensor size
+    for the camera, the recording's own size for files).
+    """
+
+    name = 'source'
+
+    def __init__(self, preview_size=None, inference_size=None):
+        self.preview_size = preview_size
+        self.inference_size = inference_size
+        self.reference_size = None
+        self.frames_read = 0
+
+    def start(self):
+        """Open the source; False if it is unavailable."""
+        raise NotImplementedError
+
+    def read(self):
+        """Next (preview BGR frame, inference frame)."""
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+    def close(self):
+        self.stop()
+
+
+def packed_i420(buffer, width, height):
+    """A `(height * 3 / 2, width)` I420 frame from a Picamera2 YUV420 array, dropping row padding.
+
+    Picamera2 returns YUV420 as `(height * 3 / 2, stride)` bytes: the Y plane
+    with `stride`-byte rows, then the U and V planes with `stride / 2`-byte rows.
+    """
+    stride = buffer.shape[1]
+    if stride == width:
+        return buffer
+    import numpy as np
+    flat = buffer.reshape(-1)
+    chroma_size = (height // 2) * (stride // 2)
+    luma = buffer[:height, :width]
+    u = flat[height * stride:height * stride + chroma_size].reshape(height // 2, stride // 2)[:, :width // 2]
+    v = flat[height * stride + chroma_size:height * stride + 2 * chroma_size].reshape(
+        height // 2, stride // 2)[:, :width // 2]
+    return np.concatenate((luma.reshape(-1), u.reshape(-1), v.reshape(-1))).reshape(height * 3 // 2, width)
+
+
+class Picamera2Source(FrameSource):
+    """The live camera: preview-sized `main` plus the `lores` YUV420 frame, or one full-sensor still."""
+
+    name = 'picamera2'
+
+    def __init__(self, mode, preview_size, inference_size, camera=None):
+        super().__init__(preview_size, inference_size)
+        self.mode = mode
+        # An already configured camera (or a stand-in) is used as is
+        self.camera = camera
+
+    def start(self):
+        try:
+            if self.camera is None:
+                from picamera2 import Picamera2
+                self.camera = Picamera2()
+                if self.mode == 'still':
+                    camera_config = self.camera.create_still_configuration()
+                else:
+                    camera_config = self.camera.create_video_configuration(
+                        main={'size': self.preview_size, 'format': 'RGB888'},
+                        lores={'size': self.inference_size, 'format': 'YUV420'},
+                    )
+                    self.camera.align_configuration(camera_config)
+                self.camera.configure(camera_config)
+                self.preview_size = camera_config['main']['size']
+                if self.mode != 'still':
+                    self.inference_size = camera_config['lores']['size']
+            self.reference_size = tuple(self.camera.sensor_resolution)
+            self.camera.start()
+            return True
+        except Exception:
+            self.camera = None
+            return False
+
+    def read(self):
+        """In dual mode both frames come from one request; lores is returned as packed I420."""
+        self.frames_read += 1
+        if self.mode == 'still':
+            frame = self.camera.capture_array()
+            return frame, frame
+        (preview, lores), _ = self.camera.capture_arrays(['main', 'lores'])
+        width, height = self.inference_size
+        return preview, packed_i420(lores, width, height)
+
+    def stop(self):
+        if self.camera is None:
+            return
+        try:
+            self.camera.stop()
+        except Exception:
+            pass
+
+    def close(self):
+        self.stop()
+        if self.camera is not None:
+            try:
+                self.camera.close()
+            except Exception:
+                pass
+            self.camera = None
+
+
+class _RecordedSource(FrameSource):
+    """Shared playback for file-backed sources: pacing, looping and frame scaling."""
+
+    def __init__(self, path, realtime=True, loop=False, fps=None, inference_size=None):
+        super().__init__(inference_size=inference_size)
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.fps = fps
+        self._started_at = None
+        self._played = 0
+
+    def start(self):
+        if not self._open():
+            return False
+        self.fps = self.fps or DEFAULT_FPS
+        self._started_at = None
+        self._played = 0
+        return True
+
+    def read(self):
+        frame = self._next_frame()
+        if frame is None and self.loop and self.frames_read:
+            self._rewind()
+            frame = self._next_frame()
+        if frame is None:
+            raise EndOfStream(self.path)
+        self._pace()
+        self.frames_read += 1
+        return self._frames(frame)
+
+    def _pace(self):
+        # Real time: frame n is due n / fps seconds after the first one, like a camera
+        now = time.monotonic()
+        if self._started_at is None:
+            self._started_at = now
+        elif self.realtime:
+            delay = self._started_at + self._played / self.fps - now
+            if delay > 0:
+                time.sleep(delay)
+        self._played += 1
+
+    def _frames(self, frame):
+        import cv2
+
+        height, width = frame.shape[:2]
+        self.reference_size = (width, height)
+        self.preview_size = (width, height)
+        if self.inference_size is None or self.inference_size[0] >= width:
+            return frame, frame
+        # Inference width as configured, height following the recording's aspect ratio
+        target_width = self.inference_size[0]
+        target = (target_width, max(1, round(height * target_width / width)))
+        return frame, cv2.resize(frame, target, interpolation=cv2.INTER_AREA)
+
+    def frame_count(self):
+        """Frames in the recording (after start())."""
+        raise NotImplementedError
+
+    def seek(self, index):
+        """Continue playback from frame `index` (after start())."""
+        raise NotImplementedError
+
+    def _open(self):
+        raise NotImplementedError
+
+    def _next_frame(self):
+        raise NotImplementedError
+
+    def _rewind(self):
+        self.seek(0)
+
+
+class VideoFileSource(_RecordedSource):
+    """A recorded video, decoded with cv2.VideoCapture at its own frame rate."""
+
+    name = 'video'
+
+    def __init__(self, path, realtime=True, loop=False, fps=None, inference_size=None):
+        super().__init__(path, realtime, loop, fps, inference_size)
+        self._capture = None
+
+    def _open(self):
+        import cv2
+
+        self.stop()
+        capture = cv2.VideoCapture(self.path)
+        if not capture.isOpened():
+            return False
+        self._capture = capture
+        if not self.fps:
+            reported = capture.get(cv2.CAP_PROP_FPS)
+            self.fps = reported if reported and reported > 0 else None
+        return True
+
+    def _next_frame(self):
+        if self._capture is None:
+            raise EndOfStream(self.path)
+        ok, frame = self._capture.read()
+        return frame if ok else None
+
+    def frame_count(self):
+        import cv2
+        return int(self._capture.get(cv2.CAP_PROP_FRAME_COUNT)) if self._capture is not None else 0
+
+    def seek(self, index):
+        """Exact: a seek that lands elsewhere (inter-frame codecs such as H.264) is corrected by decoding forward."""
+        import cv2
+        self._capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+        position = int(self._capture.get(cv2.CAP_PROP_POS_FRAMES))
+        if position == index:
+            return
+        if position < 0 or position > index:
+            self._capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            position = int(self._capture.get(cv2.CAP_PROP_POS_FRAMES))
+            if position != 0:
+                # Cannot even rewind: reopen and decode from the first frame
+                self._capture.release()
+                self._capture = cv2.VideoCapture(self.path)
+                position = 0
+        for _ in range(index - position):
+            if not self._capture.grab():
+                break
+
+    def stop(self):
+        if self._capture is not None:
+            self._capture.release()
+            self._capture = None
+
+
+class DirectorySource(_RecordedSource):
+    """A directory of still frames, played in file-name order."""
+
+    name = 'directory'
+
+    def __init__(self, path, realtime=True, loop=False, fps=None, inference_size=None):
+        super().__init__(path, realtime, loop, fps, inference_size)
+        self._files = []
+        self._index = 0
+
+    def _open(self):
+        try:
+            names = sorted(os.listdir(self.path))
+        except OSError:
+            return False
+        self._files = [os.path.join(self.path, name) for name in names if name.lower().endswith(IMAGE_EXTENSIONS)]
+        self._index = 0
+        return bool(self._files)
+
+    def _next_frame(self):
+        import cv2
+
+        while self._index < len(self._files):
+            frame = cv2.imread(self._files[self._index])
+            self._index += 1
+            if frame is not None:
+                return frame
+        return None
+
+    def frame_count(self):
+        return len(self._files)
+
+    def seek(self, index):
+        self._index = index
+
+
+def from_spec(spec, mode, preview_size, inference_size, realtime=True, loop=False):
+    """Source for a POSTURE_FRAME_SOURCE value: "" / "picamera2", a frame directory, or a video file."""
+    if not spec or spec == 'picamera2':
+        return Picamera2Source(mode, preview_size, inference_size)
+    if os.path.isdir(spec):
+        return DirectorySource(spec, realtime=realtime, loop=loop, inference_size=inference_size)
+    return VideoFileSource(spec, realtime=realtime, loop=loop, inference_size=inference_size)
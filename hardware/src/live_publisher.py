@@ -0,0 +1,142 @@
+"""
+Change-aware publisher for the RTDB `live_data` node.
+
+Instead of PUTting the whole live payload every second, `LivePublisher`
+diffs each payload against what the server has (or is about to have) and
+sends a PATCH with only the changed fields. Numeric fields that move less
+than their deadband are treated as unchanged, and a heartbeat PATCH of
+`updatedAt` still goes out every `heartbeat_interval` seconds so the
+dashboard can tell the device is alive.
+"""
+
+import json
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+HEARTBEAT_INTERVAL = 10.0
+# Fields that change on every tick and must not count as a change by themselves
+VOLATILE_FIELDS = ('updatedAt',)
+# Minimum movement before a numeric field is re-sent (flattened RTDB paths).
+# `score` and `sessionScore` have none: the dashboard saves the last value it
+# saw as the session's result, so it must always match the device exactly.
+DEFAULT_DEADBANDS = {
+    'frameScore': 3,
+    'cameraMetrics/shoulder_alignment': 0.01,
+    'cameraMetrics/neck_angle': 0.01,
+}
+
+
+def flatten(payload, prefix=''):
+    """Flatten nested dicts into {'a/b': value} RTDB paths."""
+    flat = {}
+    for key, value in payload.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + '/'))
+        elif value is not None:
+            flat[path] = value
+    return flat
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class LivePublisher:
+    """Sends full, delta or heartbeat writes of a live payload via an UplinkWorker."""
+
+    def __init__(self, worker, path='live_data', heartbeat_interval=HEARTBEAT_INTERVAL,
+                 deadbands=None, volatile_fields=VOLATILE_FIELDS):
+        self.worker = worker
+        self.path = path
+        self.heartbeat_interval = heartbeat_interval
+        self.deadbands = dict(DEFAULT_DEADBANDS if deadbands is None else deadbands)
+        self.volatile_fields = tuple(volatile_fields)
+
+        self._lock = threading.Lock()
+        # Flattened view of the server state: acknowledged writes plus in-flight ones.
+        # None means the view is unknown and the next publish must be a full PUT.
+        self._view = None
+        self._last_push = None
+
+        self._counts = {'published': 0, 'full': 0, 'delta': 0, 'heartbeat': 0, 'skipped': 0, 'failed': 0}
+        self._bytes = 0
+
+    def reset(self):
+        """Forget the server view so the next publish is a full PUT."""
+        with self._lock:
+            self._view = None
+
+    def publish(self, payload, now=None):
+        """Publish `payload`; returns 'full', 'delta', 'heartbeat' or 'skipped'."""
+        now = time.time() if now is None else now
+        flat = {k: v for k, v in flatten(payload).items() if k not in self.volatile_fields}
+        volatile = {k: payload[k] for k in self.volatile_fields if k in payload}
+
+        with self._lock:
+            self._counts['published'] += 1
+            if self._view is None:
+                kind, method, body = 'full', 'PUT', payload
+                self._view = flat
+            else:
+                changes = self._diff(self._view, flat)
+                if changes:
+                    kind, method, body = 'delta', 'PATCH', dict(changes, **volatile)
+                    for key, value in changes.items():
+                        if value is None:
+                            self._view.pop(key, None)
+                        else:
+                            self._view[key] = value
+                elif self._last_push is None or now - self._last_push >= self.heartbeat_interval:
+                    kind, method, body = 'heartbeat', 'PATCH', dict(volatile)
+                else:
+                    self._counts['skipped'] += 1
+                    return 'skipped'
+
+            self._counts[kind] += 1
+            self._last_push = now
+            self._bytes += len(json.dumps(body, default=str))
+
+        self.worker.enqueue(self.path, body, method=method, callback=self._on_result)
+        return kind
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counts)
+            stats['bytes'] = self._bytes
+            return stats
+
+    # ------------------------------------------
+    # Internals
+    # ------------------------------------------
+    def _diff(self, old, new):
+        changes = {}
+        for key, value in new.items():
+            if key not in old:
+                changes[key] = value
+                continue
+            previous = old[key]
+            if _is_number(value) and _is_number(previous):
+                if abs(value - previous) >= self.deadbands.get(key, 0) and value != previous:
+                    changes[key] = value
+            elif value != previous:
+                changes[key] = value
+        for key in old:
+            if key not in new:
+                changes[key] = None
+        return changes
+
+    def _on_result(self, ok):
+        if ok:
+            return
+        with self._lock:
+            self._counts['failed'] += 1
+            # We no longer know what the server holds; resync with a full write
+            self._view = None
+        logger.debug(f"{self.path} write failed; next publish will be a full PUT")
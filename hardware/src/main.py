@@ -1,14 +1,14 @@
 import time
 import os
-import json
+import asyncio
 import shlex
 import subprocess
 import logging
 import traceback
 import signal
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from importlib import import_module
-import requests # <-- ADDED: To talk directly to the cloud
 
 # ==========================================
 # LOGGING SETUP
@@ -27,23 +27,67 @@ logger = logging.getLogger(__name__)
 if __package__ in (None, ""):
     import sys
     sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from src import cadence
     from src import camera_module
+    from src import control_plane
+    from src import uplink
+    from src import live_publisher
+    from src import metrics
+    from src import reading_writer
+    from src.scoring import score_from_camera_metrics
+    from src import session_stats
+    from src import spool
+    from src import status_channel
 else:
+    from . import cadence
     from . import camera_module
+    from . import control_plane
+    from . import uplink
+    from . import live_publisher
+    from . import metrics
+    from . import reading_writer
+    from .scoring import score_from_camera_metrics
+    from . import session_stats
+    from . import spool
+    from . import status_channel
 
 # ==========================================
 # FIREBASE CLOUD LINK
 # ==========================================
 # This connects your Pi directly to the website without Flask
 FIREBASE_URL = "https://posturehealthtracker-default-rtdb.europe-west1.firebasedatabase.app"
-HAILO_STATUS_FILE = "/tmp/posturehealthtracker_hailo.json"
 HAILO_LOG_FILE = "/tmp/posturehealthtracker_hailo.log"
+# Written by the pipeline (its pid) once it handles the pause/resume signals
+HAILO_READY_FILE = "/tmp/posturehealthtracker_hailo.ready"
 REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 HAILO_EXAMPLES_DIR = os.environ.get("HAILO_EXAMPLES_DIR", os.path.expanduser("~/hailo-rpi5-examples"))
+# live_data push rate; control-plane changes also wake the tasks immediately
+LOOP_INTERVAL = 1.0
+SUPERVISE_INTERVAL = 1.0
+INGEST_INTERVAL = 0.2
+# Fixed Picamera2 analysis interval when the adaptive cadence is disabled
+PREVIEW_INTERVAL = 2.0
+SAMPLE_QUEUE_SIZE = 1024
+# Keep the Hailo pipeline resident (paused) between sessions instead of respawning it.
+# A paused pipeline captures no frames and runs no inference, but the process keeps
+# the camera and the NPU open (and its memory resident) so the next session starts fast.
+HAILO_WARM_STANDBY = os.environ.get("HAILO_WARM_STANDBY", "1") != "0"
+# Also bring the pipeline up (paused) at boot, before any session was ever requested
+HAILO_PREWARM_AT_BOOT = os.environ.get("HAILO_PREWARM_AT_BOOT", "0") == "1"
+HAILO_WARMUP_RETRY_SECS = 60.0
+# Picamera2 capture and MediaPipe analysis on the camera's own producer thread
+CAMERA_THREADED = os.environ.get("POSTURE_CAMERA_THREADED", "1") != "0"
 
 firestore_client = None
+uplink_worker = None
+live_data_publisher = None
+readings_writer = None
+spool_store = None
+spool_replayer = None
+hailo_status_receiver = None
 hailo_process = None
 hailo_log_handle = None
+hailo_paused = False
 
 
 def cleanup_stale_hailo_processes():
@@ -66,15 +110,20 @@ def cleanup_stale_hailo_processes():
     time.sleep(0.5)
 
 
+def firestore_configured():
+    cred_path = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS')
+    return bool(cred_path and os.path.exists(cred_path))
+
+
 def get_firestore_client():
     global firestore_client
 
     if firestore_client is not None:
         return firestore_client
 
-    cred_path = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS')
-    if not cred_path or not os.path.exists(cred_path):
+    if not firestore_configured():
         return None
+    cred_path = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS')
 
     try:
         firebase_admin_module = import_module("firebase_admin")
@@ -91,32 +140,118 @@ def get_firestore_client():
     return firestore_client
 
 
+def get_uplink_worker():
+    global uplink_worker
+
+    if uplink_worker is None:
+        uplink_worker = uplink.UplinkWorker(FIREBASE_URL)
+        uplink_worker.start()
+    return uplink_worker
+
+
+def get_live_publisher():
+    global live_data_publisher
+
+    if live_data_publisher is None:
+        heartbeat = float(os.environ.get("LIVE_DATA_HEARTBEAT_SECS", live_publisher.HEARTBEAT_INTERVAL))
+        live_data_publisher = live_publisher.LivePublisher(get_uplink_worker(), "live_data", heartbeat_interval=heartbeat)
+    return live_data_publisher
+
+
 def push_live_data(payload):
+    # Only enqueues a full/delta/heartbeat write; the uplink thread does the HTTP round trip
+    with metrics.timer('push_live_data'):
+        kind = get_live_publisher().publish(payload)
+    metrics.inc('posture_live_data_pushes_total', kind=kind)
+    logger.debug(f"live_data {kind}: score={payload.get('score')}, sessionId={payload.get('activeSessionId')}")
+
+
+def open_hailo_status_channel():
+    global hailo_status_receiver
+
+    if hailo_status_receiver is None:
+        try:
+            hailo_status_receiver = status_channel.StatusReceiver()
+            logger.info(f"Listening for Hailo posture samples on {hailo_status_receiver.path}")
+        except Exception as error:
+            logger.error(f"Could not open Hailo status channel: {error}")
+    return hailo_status_receiver
+
+
+def read_hailo_samples():
+    # Every posture sample published since the last call, oldest first
+    if hailo_status_receiver is None:
+        return []
+    return hailo_status_receiver.drain()
+
+
+def hailo_ready():
+    # Until the pipeline writes its pid here it cannot take signals: it is still starting (cold)
+    if not hailo_running():
+        return False
     try:
-        response = requests.put(f"{FIREBASE_URL}/live_data.json", json=payload, timeout=30)
-        logger.debug(f"Pushed live_data: score={payload.get('score')}, sessionId={payload.get('activeSessionId')}, status={response.status_code}")
-    except Exception as e:
-        logger.warning(f"Failed to push live_data: {e}")
+        with open(HAILO_READY_FILE, encoding="utf-8") as f:
+            return int(f.read().strip() or 0) == hailo_process.pid
+    except (OSError, ValueError):
+        return False
 
 
-def read_hailo_status():
-    if not os.path.exists(HAILO_STATUS_FILE):
-        return None
+def clear_hailo_ready():
+    try:
+        os.unlink(HAILO_READY_FILE)
+    except FileNotFoundError:
+        pass
+    except OSError as error:
+        logger.debug(f"Could not remove {HAILO_READY_FILE}: {error}")
+
 
+def signal_hailo_process(signum):
+    # The pipeline handles SIGUSR1 (pause) / SIGUSR2 (resume) itself; `exec` makes it the Popen pid
+    if not hailo_ready():
+        return False
     try:
-        with open(HAILO_STATUS_FILE, "r", encoding="utf-8") as status_file:
-            return json.load(status_file)
-    except Exception:
-        return None
+        os.kill(hailo_process.pid, signum)
+        return True
+    except ProcessLookupError:
+        return False
 
 
-def start_hailo_process():
-    global hailo_process, hailo_log_handle
+def pause_hailo_process():
+    global hailo_paused
 
-    if hailo_process and hailo_process.poll() is None:
+    if signal_hailo_process(signal.SIGUSR1):
+        hailo_paused = True
+        logger.info(f"Hailo pipeline {hailo_process.pid} paused (warm standby)")
         return True
+    return False
+
+
+def resume_hailo_process():
+    global hailo_paused
+
+    if signal_hailo_process(signal.SIGUSR2):
+        hailo_paused = False
+        logger.info(f"Hailo pipeline {hailo_process.pid} resumed from warm standby")
+        return True
+    return False
+
+
+def hailo_running():
+    return bool(hailo_process and hailo_process.poll() is None)
+
+
+def start_hailo_process(paused=False):
+    global hailo_process, hailo_log_handle, hailo_paused
+
+    if hailo_running():
+        if not (hailo_paused and not paused) or resume_hailo_process():
+            return True
+        # Started paused but not ready for signals yet: it cannot be resumed, so start cold
+        logger.info("Hailo pipeline in standby is still starting; restarting it for the session")
+        stop_hailo_process()
 
     cleanup_stale_hailo_processes()
+    clear_hailo_ready()
 
     setup_env = os.path.join(HAILO_EXAMPLES_DIR, "setup_env.sh")
     hailo_example = os.path.join(HAILO_EXAMPLES_DIR, "basic_pipelines", "pose_estimation.py")
@@ -129,7 +264,7 @@ def start_hailo_process():
         logger.error(f"Hailo example not found at {hailo_example}")
         return False
 
-    command = f"cd {shlex.quote(HAILO_EXAMPLES_DIR)} && source setup_env.sh && python basic_pipelines/pose_estimation.py --input rpi --use-frame"
+    command = f"cd {shlex.quote(HAILO_EXAMPLES_DIR)} && source setup_env.sh && exec python basic_pipelines/pose_estimation.py --input rpi --use-frame"
     logger.info(f"Starting Hailo pipeline with command: {command}")
 
     try:
@@ -141,8 +276,11 @@ def start_hailo_process():
             stdout=hailo_log_handle,
             stderr=hailo_log_handle,
             start_new_session=True,
+            env=dict(os.environ, POSTUREHEALTHTRACKER_ROOT=REPO_ROOT, POSTURE_STATUS_SOCKET=status_channel.SOCKET_PATH,
+                     POSTURE_HAILO_START_PAUSED="1" if paused else "0", POSTURE_HAILO_READY_FILE=HAILO_READY_FILE),
         )
-        logger.info(f"Hailo process started with PID {hailo_process.pid}")
+        hailo_paused = paused
+        logger.info(f"Hailo process started with PID {hailo_process.pid}{' in warm standby' if paused else ''}")
         return True
     except Exception as error:
         logger.error(f"Failed to start Hailo process: {error}\n{traceback.format_exc()}")
@@ -157,7 +295,7 @@ def start_hailo_process():
 
 
 def stop_hailo_process():
-    global hailo_process, hailo_log_handle
+    global hailo_process, hailo_log_handle, hailo_paused
 
     if not hailo_process:
         cleanup_stale_hailo_processes()
@@ -187,7 +325,9 @@ def stop_hailo_process():
         logger.error(f"Error stopping Hailo process: {e}")
     finally:
         hailo_process = None
+        hailo_paused = False
         cleanup_stale_hailo_processes()
+        clear_hailo_ready()
         if hailo_log_handle:
             try:
                 hailo_log_handle.close()
@@ -196,202 +336,486 @@ def stop_hailo_process():
             hailo_log_handle = None
 
 
+def get_reading_writer():
+    global readings_writer
+
+    if readings_writer is None:
+        readings_writer = reading_writer.ReadingWriter(get_firestore_client)
+    return readings_writer
+
+
+def get_spool_replayer():
+    global spool_store, spool_replayer
+
+    if spool_replayer is not None:
+        return spool_replayer
+
+    try:
+        spool_store = spool.Spool()
+    except Exception as error:
+        logger.error(f"Could not open reading spool, falling back to in-memory batching: {error}")
+        return None
+
+    writer = get_reading_writer()
+    spool_replayer = spool.SpoolReplayer(
+        spool_store,
+        {'reading': writer.commit_spooled, 'session_summary': writer.commit_summaries},
+        batch_size=writer.batch_size,
+        max_delay=writer.flush_interval,
+    )
+    spool_replayer.start()
+    logger.info(f"Reading spool at {spool_store.path}")
+    return spool_replayer
+
+
 def save_reading(session_id, payload):
-    client = get_firestore_client()
-    if not client or not session_id:
+    if not session_id or not firestore_configured():
         return
 
-    session_ref = client.collection('sessions').document(session_id)
-    session_ref.collection('readings').add(payload)
-    session_ref.set({
-        'lastReadingAt': payload.get('timestamp'),
-        'lastLiveScore': payload.get('score'),
-        'status': 'active'
-    }, merge=True)
-
-
-def score_from_camera_metrics(camera_metrics):
-    if not camera_metrics:
-        return 100
-
-    # If using Hailo/side-view posture detection (is_bad flag present)
-    if 'is_bad' in camera_metrics:
-        if camera_metrics['is_bad']:
-            # Bad posture detected → lower score based on reason
-            reason = camera_metrics.get('reason', 'Bad posture')
-            if 'slouch' in reason.lower():
-                return 60  # Slouching is moderate issue
-            elif 'head' in reason.lower():
-                return 55  # Head forward is more serious
-            else:
-                return 50  # Generic bad posture
-        else:
-            return 95  # Good posture detected
-    
-    # Fallback: MediaPipe-style metrics (shoulder_alignment + neck_angle)
-    score = 100.0
-    shoulder_alignment = camera_metrics.get('shoulder_alignment')
-    neck_angle = camera_metrics.get('neck_angle')
-
-    if shoulder_alignment is not None:
-        score -= min(abs(shoulder_alignment) * 250.0, 25.0)
-    if neck_angle is not None:
-        score -= min(abs(neck_angle) * 250.0, 40.0)
+    with metrics.timer('save_reading'):
+        # Durably spooled first; the replayer commits batches to Firestore when it can
+        replayer = get_spool_replayer()
+        if replayer is None:
+            get_reading_writer().add(session_id, payload)
+            return
+        try:
+            spool_store.append('reading', {'sessionId': session_id, 'reading': payload})
+        except Exception as error:
+            logger.warning(f"Failed to spool reading, writing directly: {error}")
+            get_reading_writer().add(session_id, payload)
 
-    return int(max(0, min(100, round(score))))
 
-def main_loop():
-    cam = camera_module.CameraModule()
-
-    active_session_id = None
-    camera_started_for_session = False
-    using_hailo_pipeline = False
-    session_frame_count = 0
-    session_score_total = 0.0
-    last_preview_update = 0.0
-    last_preview_data_url = None
-    last_camera_metrics = {}
-    last_frame_score = 100
-    last_hailo_update_at = None
-    
-    logger.info("=" * 70)
-    logger.info("Hardware Booted. Connecting to Firebase...")
-    logger.info(f"Firebase URL: {FIREBASE_URL}")
-    logger.info(f"Log file: {LOG_FILE}")
-    logger.info("=" * 70)
+def save_session_summary(session_id, summary):
+    if not session_id or not firestore_configured():
+        return
 
+    record = {'sessionId': session_id, 'summary': summary}
+    replayer = get_spool_replayer()
     try:
-        while True:
-            # 2. CHECK THE CLOUD (Did the user click "Start" on the website?)
+        if replayer is not None:
+            spool_store.append('session_summary', record)
+            replayer.kick()
+        else:
+            get_reading_writer().commit_summaries([spool.SpoolRecord(None, 'session_summary', None, record, time.time())])
+    except Exception as error:
+        logger.warning(f"Failed to save session summary for {session_id}: {error}")
+
+
+def flush_readings():
+    if spool_replayer is not None:
+        spool_replayer.kick()
+    if readings_writer is not None:
+        readings_writer.flush()
+
+
+def stop_spool():
+    if spool_replayer is not None:
+        spool_replayer.stop()
+        logger.info(f"Spool stats at shutdown: {spool_store.stats()} {spool_replayer.stats()}")
+        spool_store.close()
+
+
+def pipeline_counters():
+    # Counters owned by the uplink, spool and status channel, read when metrics are exported
+    counters = []
+    if uplink_worker is not None:
+        stats = uplink_worker.stats()
+        counters += [
+            ('posture_uplink_sent_total', 'counter', 'RTDB writes sent', stats['sent']),
+            ('posture_uplink_failed_total', 'counter', 'RTDB writes that failed (push failures)', stats['failed']),
+            ('posture_uplink_dropped_total', 'counter', 'RTDB writes evicted from a full queue', stats['dropped']),
+            ('posture_uplink_queue_depth', 'gauge', 'RTDB writes waiting to be sent', stats['queue_depth']),
+        ]
+    if hailo_status_receiver is not None:
+        stats = hailo_status_receiver.stats()
+        counters += [
+            ('posture_hailo_samples_received_total', 'counter', 'Posture samples received from the Hailo pipeline', stats['received']),
+            ('posture_hailo_samples_lost_total', 'counter', 'Posture samples lost in the status channel', stats['lost'] + stats['overflow']),
+        ]
+    if spool_store is not None:
+        stats = spool_store.stats()
+        counters += [
+            ('posture_spool_pending', 'gauge', 'Records waiting in the on-device spool', stats['pending']),
+            ('posture_spool_evicted_total', 'counter', 'Spooled records evicted over capacity', stats['evicted']),
+        ]
+    if spool_replayer is not None:
+        counters.append(('posture_spool_replay_failures_total', 'counter', 'Failed spool replay batches',
+                         spool_replayer.stats()['failures']))
+    return counters
+
+
+class SessionState:
+    """Session data shared by the service tasks.
+
+    Only touched from the event loop thread, so it needs no locking.
+    `generation` changes on every reset so results that were in flight
+    across a session boundary can be recognised and dropped.
+    """
+
+    def __init__(self):
+        self.camera_command = None
+        self.generation = 0
+        self.reset(None)
+
+    def reset(self, session_id):
+        self.active_session_id = session_id
+        self.generation += 1
+        self.started_at = time.monotonic()
+        self.warm_start = False
+        self.first_frame_latency = None
+        self.camera_started = False
+        self.using_hailo = False
+        self.frame_count = 0
+        self.stats = session_stats.SessionStats()
+        self.last_camera_metrics = {}
+        self.last_frame_score = 100
+
+    @property
+    def running(self):
+        return self.camera_command == "ON"
+
+    def record(self, camera_metrics, timestamp=None):
+        self.last_camera_metrics = camera_metrics
+        self.last_frame_score = score_from_camera_metrics(camera_metrics)
+        self.frame_count += 1
+        # Time-weighted, so Hailo and Picamera2 sessions score alike whatever the analysis cadence
+        self.stats.add(self.last_frame_score, bool(camera_metrics.get('is_bad')), camera_metrics.get('reason', ''),
+                       time.time() if timestamp is None else timestamp)
+        if self.first_frame_latency is None:
+            self.first_frame_latency = time.monotonic() - self.started_at
+        return self.last_frame_score
+
+    def session_score(self):
+        return int(round(self.stats.mean(default=self.last_frame_score)))
+
+    def overlay_lines(self):
+        return [
+            "Posture Tracking Live",
+            f"Frame Score: {self.last_frame_score}%",
+            f"Session Score: {self.session_score()}%"
+        ]
+
+    def reading(self):
+        return {
+            "timestamp": datetime.utcnow(),
+            "frameScore": self.last_frame_score,
+            "sessionScore": round(self.stats.mean(), 2),
+            "cameraMetrics": self.last_camera_metrics,
+            "postureStatus": "Good" if not self.last_camera_metrics.get('is_bad') else "Bad",
+            "postureReason": self.last_camera_metrics.get('reason', '')
+        }
+
+    def live_payload(self, camera_active):
+        session_score = self.session_score()
+        return {
+            "score": session_score,
+            "frameScore": self.last_frame_score,
+            "sessionScore": session_score,
+            "activeSessionId": self.active_session_id,
+            "cameraActive": camera_active,
+            "cameraMetrics": self.last_camera_metrics,
+            # Extract posture status if available (Hailo detection)
+            "postureStatus": "Good" if not self.last_camera_metrics.get('is_bad') else "Bad",
+            "postureReason": self.last_camera_metrics.get('reason', ''),
+            # NOTE: cameraFrame removed — dashboard now uses local MJPEG stream (http://localhost:8000/stream)
+            # This eliminates base64 overhead and provides smooth, lag-free video
+            "updatedAt": int(time.time())
+        }
+
+
+class HardwareService:
+    """asyncio orchestration of the hardware loop.
+
+    Each stage runs as its own task at its own rate:
+      - watch_control: applies system_state changes as soon as they stream in
+      - supervise:     starts/stops the Hailo pipeline or Picamera2 and handles fallback
+      - ingest:        drains Hailo samples, or captures and analyses Picamera2 frames
+      - score:         turns samples into frame/session scores and spools readings
+      - publish:       pushes live_data through the non-blocking uplink
+    Blocking camera and process calls run on a single-thread device executor,
+    so a slow capture or network call never stalls the other stages.
+    """
+
+    def __init__(self):
+        self.cadence = cadence.CadenceController() if cadence.ENABLED else None
+        self.cam = camera_module.CameraModule(threaded=CAMERA_THREADED, analysis_interval=PREVIEW_INTERVAL,
+                                              cadence=self.cadence)
+        self.control = control_plane.ControlPlaneSubscriber(FIREBASE_URL)
+        self.state = SessionState()
+        # Camera and pipeline calls are not thread-safe; keep them on one thread
+        self.device_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="device")
+        self.loop = None
+        self.samples = None
+        self.control_changed = None
+        self.supervisor_wake = None
+        self.publish_now = None
+        self.stopping = None
+        self._last_capture = float("-inf")
+        self._last_result_seq = None
+        self._next_warmup = 0.0
+        # Warm standby only follows a real session unless boot pre-warming is opted into
+        self._session_ended = False
+        self.metrics_exporter = metrics.Exporter("hardware")
+        self.first_frame_latencies = {'warm': [], 'cold': []}
+
+    def run_blocking(self, func, *args):
+        return self.loop.run_in_executor(self.device_executor, func, *args)
+
+    def run_io(self, func, *args):
+        return self.loop.run_in_executor(None, func, *args)
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self.samples = asyncio.Queue(maxsize=SAMPLE_QUEUE_SIZE)
+        self.control_changed = asyncio.Event()
+        self.supervisor_wake = asyncio.Event()
+        self.publish_now = asyncio.Event()
+        self.stopping = asyncio.Event()
+
+        logger.info("=" * 70)
+        logger.info("Hardware Booted. Connecting to Firebase...")
+        logger.info(f"Firebase URL: {FIREBASE_URL}")
+        logger.info(f"Log file: {LOG_FILE}")
+        logger.info("=" * 70)
+
+        for sig in (signal.SIGINT, signal.SIGTERM):
             try:
-                state_resp = requests.get(f"{FIREBASE_URL}/system_state.json", timeout=30)
-                state = state_resp.json() or {}
-                requested_session_id = state.get('activeSessionId')
-                camera_command = state.get('camera_command')
-                
-                logger.debug(f"Polled system_state: camera_command={camera_command}, activeSessionId={requested_session_id}")
-                
-                # If Website says "ON", we do the monitoring
-                if camera_command == "ON":
-                    if requested_session_id and requested_session_id != active_session_id:
-                        logger.info(f"New session detected: {requested_session_id}")
-                        active_session_id = requested_session_id
-                        camera_started_for_session = False
-                        using_hailo_pipeline = False
-                        session_frame_count = 0
-                        session_score_total = 0.0
-                        last_preview_update = 0.0
-                        last_preview_data_url = None
-                        last_camera_metrics = {}
-                        last_frame_score = 100
-                        last_hailo_update_at = None
-
-                    if not camera_started_for_session:
-                        logger.info("Starting camera pipeline...")
-                        using_hailo_pipeline = start_hailo_process()
-                        if not using_hailo_pipeline:
-                            logger.info("Hailo pipeline unavailable; starting Picamera2...")
-                            camera_started_for_session = cam.start()
-                            logger.info(f"Picamera2 started: {camera_started_for_session}")
-                        else:
-                            camera_started_for_session = True
-                            logger.info("Hailo pipeline started; waiting for live camera frames...")
-
-                    if using_hailo_pipeline:
-                        if hailo_process and hailo_process.poll() is not None:
-                            logger.warning(f"Hailo pipeline exited with code {hailo_process.returncode}; falling back to Picamera2")
-                            stop_hailo_process()
-                            using_hailo_pipeline = False
-                            camera_started_for_session = cam.start()
-                            continue
-
-                        hailo_status = read_hailo_status() or {}
-                        hailo_updated_at = hailo_status.get("updatedAt")
-                        if hailo_status and hailo_updated_at != last_hailo_update_at:
-                            last_hailo_update_at = hailo_updated_at
-                            last_preview_data_url = hailo_status.get("cameraFrame", last_preview_data_url)
-                            last_camera_metrics = hailo_status.get("cameraMetrics", last_camera_metrics) or {}
-                            last_frame_score = score_from_camera_metrics(last_camera_metrics)
-                            session_frame_count += 1
-                            session_score_total += last_frame_score
-                        camera_active = True
-                    else:
-                        now = time.time()
-                        if cam.available and (now - last_preview_update) >= 2.0:
-                            overlay_lines = [
-                                "Posture Tracking Live",
-                                f"Frame Score: {last_frame_score}%",
-                                f"Session Score: {int(round(session_score_total / session_frame_count)) if session_frame_count else 100}%"
-                            ]
-                            preview_data_url, camera_metrics = cam.capture_preview_and_metrics(overlay_lines=overlay_lines)
-                            last_preview_update = now
-                            if camera_metrics:
-                                last_camera_metrics = camera_metrics
-                                last_frame_score = score_from_camera_metrics(camera_metrics)
-                                session_frame_count += 1
-                                session_score_total += last_frame_score
-                                last_preview_data_url = preview_data_url
-
-                                save_reading(active_session_id, {
-                                    "timestamp": datetime.utcnow(),
-                                    "frameScore": last_frame_score,
-                                    "sessionScore": round(session_score_total / session_frame_count, 2),
-                                    "cameraMetrics": last_camera_metrics,
-                                    "postureStatus": "Good" if not last_camera_metrics.get('is_bad') else "Bad",
-                                    "postureReason": last_camera_metrics.get('reason', '')
-                                })
-
-                        camera_active = bool(cam.available and camera_started_for_session)
-
-                    session_score = int(round(session_score_total / session_frame_count)) if session_frame_count else last_frame_score
-
-                    # Extract posture status if available (Hailo detection)
-                    posture_status = "Good" if not last_camera_metrics.get('is_bad') else "Bad"
-                    posture_reason = last_camera_metrics.get('reason', '')
-
-                    live_payload = {
-                        "score": session_score,
-                        "frameScore": last_frame_score,
-                        "sessionScore": session_score,
-                        "activeSessionId": active_session_id,
-                        "cameraActive": camera_active,
-                        "cameraMetrics": last_camera_metrics,
-                        "postureStatus": posture_status,
-                        "postureReason": posture_reason,
-                        # NOTE: cameraFrame removed — dashboard now uses local MJPEG stream (http://localhost:8000/stream)
-                        # This eliminates base64 overhead and provides smooth, lag-free video
-                        "updatedAt": int(time.time())
-                    }
-                    push_live_data(live_payload)
+                self.loop.add_signal_handler(sig, self.stopping.set)
+            except (NotImplementedError, RuntimeError):
+                pass
 
-                else:
-                    # Website says "OFF", so we just standby quietly
-                    if camera_started_for_session:
-                        cam.stop()
-                        stop_hailo_process()
-                        camera_started_for_session = False
-                        using_hailo_pipeline = False
-                        active_session_id = None
-                        session_frame_count = 0
-                        session_score_total = 0.0
-                        last_preview_update = 0.0
-                        last_preview_data_url = None
-                        last_camera_metrics = {}
-                        last_frame_score = 100
-                        last_hailo_update_at = None
-                    
+        # Streams system_state changes instead of polling it every iteration
+        self.control.add_listener(lambda: self.loop.call_soon_threadsafe(self.control_changed.set))
+        self.control.start()
+        open_hailo_status_channel()
+        metrics.describe('posture_frames_total', 'Samples scored, by capture path')
+        metrics.describe('posture_samples_dropped_total', 'Samples dropped before scoring')
+        metrics.describe('posture_live_data_pushes_total', 'live_data publishes, by write kind')
+        metrics.describe('posture_cadence_changes_total', 'Posture changes that reset the analysis cadence')
+        metrics.add_collector(pipeline_counters)
+        if self.cadence is not None:
+            metrics.add_collector(self.cadence.collector)
+        self.metrics_exporter.start()
+
+        tasks = [
+            asyncio.create_task(self._forever("watch_control", self.watch_control)),
+            asyncio.create_task(self._forever("supervise", self.supervise)),
+            asyncio.create_task(self._forever("ingest", self.ingest)),
+            asyncio.create_task(self._forever("score", self.score)),
+            asyncio.create_task(self._forever("publish", self.publish)),
+        ]
+        try:
+            await self.stopping.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.shutdown()
+
+    async def _forever(self, name, step):
+        # One failing iteration is logged and retried; it never takes the service down
+        while True:
+            try:
+                await step()
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.error(f"Network/Firebase Error: {e}\n{traceback.format_exc()}")
+                logger.error(f"{name} task error: {e}\n{traceback.format_exc()}")
+                await asyncio.sleep(LOOP_INTERVAL)
 
-            time.sleep(1)
-            
-    except KeyboardInterrupt:
+    @staticmethod
+    async def _wait(event, timeout):
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        event.clear()
+
+    # ------------------------------------------
+    # Tasks
+    # ------------------------------------------
+    async def watch_control(self):
+        # 2. CHECK THE CLOUD (Did the user click "Start" on the website?)
+        self.control_changed.clear()
+        state = self.control.snapshot()
+        requested_session_id = state.get('activeSessionId')
+        camera_command = state.get('camera_command')
+
+        if camera_command != self.state.camera_command:
+            logger.debug(f"system_state: camera_command={camera_command}, activeSessionId={requested_session_id}, connected={self.control.connected}")
+        self.state.camera_command = camera_command
+
+        # If Website says "ON", we do the monitoring
+        if camera_command == "ON" and requested_session_id and requested_session_id != self.state.active_session_id:
+            logger.info(f"New session detected: {requested_session_id}")
+            await self.end_session()
+            self.state.reset(requested_session_id)
+            # Discard samples left over from before this session
+            read_hailo_samples()
+
+        self.supervisor_wake.set()
+        self.publish_now.set()
+        await self._wait(self.control_changed, LOOP_INTERVAL)
+
+    async def supervise(self):
+        state = self.state
+        if state.running:
+            if not state.camera_started:
+                generation = state.generation
+                warm = hailo_ready()
+                logger.info(f"Starting camera pipeline ({'resuming warm standby' if warm else 'cold start'})...")
+                # Recorded footage (POSTURE_FRAME_SOURCE) always goes through the Picamera2 path
+                using_hailo = not self.cam.recorded and await self.run_blocking(start_hailo_process)
+                if not using_hailo:
+                    logger.info("Hailo pipeline unavailable; starting Picamera2...")
+                    started = await self.run_blocking(self.cam.start)
+                    logger.info(f"Picamera2 started: {started}")
+                else:
+                    started = True
+                    logger.info("Hailo pipeline started; waiting for live camera frames...")
+                if generation == state.generation:
+                    state.using_hailo = using_hailo
+                    state.warm_start = warm and using_hailo
+                    state.camera_started = started
+            elif state.using_hailo and hailo_process and hailo_process.poll() is not None:
+                logger.warning(f"Hailo pipeline exited with code {hailo_process.returncode}; falling back to Picamera2")
+                await self.run_blocking(stop_hailo_process)
+                state.using_hailo = False
+                state.camera_started = await self.run_blocking(self.cam.start)
+        elif state.camera_started:
+            # Website says "OFF", so we just standby quietly
+            if self.cam.frames:
+                logger.info(f"Picamera2 capture stats: {self.cam.stats()}")
+            await self.run_blocking(self.cam.stop)
+            if not (HAILO_WARM_STANDBY and state.using_hailo and await self.run_blocking(pause_hailo_process)):
+                await self.run_blocking(stop_hailo_process)
+            await self.end_session()
+            state.reset(None)
+            self._session_ended = True
+        elif (HAILO_WARM_STANDBY and (self._session_ended or HAILO_PREWARM_AT_BOOT)
+              and not self.cam.recorded and not hailo_running() and self.loop.time() >= self._next_warmup):
+            # Bring the pipeline up ahead of the next session: shell, venv, HEF and camera are paid now
+            self._next_warmup = self.loop.time() + HAILO_WARMUP_RETRY_SECS
+            await self.run_blocking(start_hailo_process, True)
+
+        await self._wait(self.supervisor_wake, SUPERVISE_INTERVAL)
+
+    async def ingest(self):
+        state = self.state
+        if state.running and state.camera_started:
+            if state.using_hailo:
+                for sample in read_hailo_samples():
+                    self._queue_sample(state.generation, sample.camera_metrics(), "hailo", sample.timestamp)
+            elif self.cam.available and self.cam.threaded:
+                # The producer thread captures and analyses; just pick up its newest result
+                self.cam.overlay_lines = state.overlay_lines()
+                result = self.cam.latest_result()
+                if result is not None and result.seq != self._last_result_seq and result.metrics:
+                    self._last_result_seq = result.seq
+                    self._queue_sample(state.generation, result.metrics, "picamera2", result.timestamp)
+            elif self.cam.available and self.loop.time() - self._last_capture >= self.cam.next_interval():
+                self._last_capture = self.loop.time()
+                generation = state.generation
+                captured_at = time.time()
+                # Analysis only: the preview is encoded just when an MJPEG viewer wants it
+                _, camera_metrics = await self.run_blocking(self.cam.capture_and_analyze, state.overlay_lines())
+                if camera_metrics:
+                    self.cam.observe_result(camera_metrics)
+                    self._queue_sample(generation, camera_metrics, "picamera2", captured_at)
+        await asyncio.sleep(INGEST_INTERVAL)
+
+    def _queue_sample(self, generation, camera_metrics, source, timestamp):
+        if self.samples.full():
+            self.samples.get_nowait()
+            metrics.inc('posture_samples_dropped_total', reason='queue_full')
+            logger.warning("Scoring queue full; dropping oldest sample")
+        self.samples.put_nowait((generation, camera_metrics, source, timestamp))
+
+    async def score(self):
+        generation, camera_metrics, source, timestamp = await self.samples.get()
+        if generation != self.state.generation:
+            metrics.inc('posture_samples_dropped_total', reason='stale_session')
+            return
+        with metrics.timer('score'):
+            self.state.record(camera_metrics, timestamp)
+        metrics.inc('posture_frames_total', source=source)
+        if self.state.frame_count == 1:
+            self._log_first_frame()
+        if source == "picamera2":
+            await self.run_io(save_reading, self.state.active_session_id, self.state.reading())
+
+    async def end_session(self):
+        # Final statistics go into the session document alongside the flushed readings
+        state = self.state
+        if state.active_session_id and state.frame_count:
+            summary = state.stats.to_dict()
+            logger.info(f"Session {state.active_session_id} summary: {summary}")
+            await self.run_io(save_session_summary, state.active_session_id, summary)
+        await self.run_io(flush_readings)
+
+    def _log_first_frame(self):
+        state = self.state
+        kind = 'warm' if state.warm_start else 'cold'
+        self.first_frame_latencies[kind].append(state.first_frame_latency)
+        logger.info(f"Time to first scored frame for session {state.active_session_id}: "
+                    f"{state.first_frame_latency * 1000:.0f} ms ({kind} start)")
+
+    def first_frame_stats(self):
+        stats = {}
+        for kind, latencies in self.first_frame_latencies.items():
+            if latencies:
+                ordered = sorted(latencies)
+                stats[kind] = {
+                    'sessions': len(ordered),
+                    'median_ms': round(ordered[len(ordered) // 2] * 1000, 1),
+                    'max_ms': round(ordered[-1] * 1000, 1),
+                }
+        return stats
+
+    async def publish(self):
+        await self._wait(self.publish_now, LOOP_INTERVAL)
+        state = self.state
+        if not state.running:
+            return
+        camera_active = True if state.using_hailo else bool(self.cam.available and state.camera_started)
+        push_live_data(state.live_payload(camera_active))
+        if readings_writer is not None:
+            await self.run_io(readings_writer.maybe_flush)
+
+    # ------------------------------------------
+    # Shutdown
+    # ------------------------------------------
+    def shutdown(self):
         logger.info('Shutting down gracefully...')
-        if camera_started_for_session:
-            cam.stop()
+        self.control.stop()
+        if self.state.active_session_id and self.state.frame_count:
+            save_session_summary(self.state.active_session_id, self.state.stats.to_dict())
+        flush_readings()
+        stop_spool()
+        if hailo_status_receiver is not None:
+            logger.info(f"Hailo status channel stats at shutdown: {hailo_status_receiver.stats()}")
+            hailo_status_receiver.close()
+        if uplink_worker is not None:
+            uplink_worker.stop()
+            logger.info(f"Uplink stats at shutdown: {uplink_worker.stats()}")
+        if live_data_publisher is not None:
+            logger.info(f"live_data publisher stats at shutdown: {live_data_publisher.stats()}")
+        logger.info(f"Time to first scored frame at shutdown: {self.first_frame_stats()}")
+        self.metrics_exporter.stop()
+        self.device_executor.shutdown(wait=True)
+        if self.state.camera_started:
+            self.cam.stop()
         stop_hailo_process()
         logger.info('Shutdown complete.')
 
 
+def main_loop():
+    service = HardwareService()
+    try:
+        asyncio.run(service.run())
+    except KeyboardInterrupt:
+        pass
+
+
 if __name__ == '__main__':
-    main_loop()
\ No newline at end of file
+    main_loop()
@@ -0,0 +1,278 @@
+"""
+Per-stage latency histograms and counters for the capture pipeline.
+
+Each process (hardware service, Hailo pipeline, MJPEG server) records into
+its own in-process registry: `timer(stage)` feeds a fixed-bucket histogram,
+`inc(name)` bumps a counter. An exporter thread snapshots the registry to
+`METRICS_DIR/<process>.json` every few seconds, and the MJPEG server's
+`/metrics` endpoint renders every fresh snapshot in Prometheus text format
+with a `process` label.
+
+With POSTURE_METRICS=0 `timer()` returns a shared no-op context manager and
+`inc()` returns immediately, so instrumented code pays one global lookup.
+"""
+
+import contextlib
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+ENABLED = os.environ.get("POSTURE_METRICS", "1") != "0"
+METRICS_DIR = os.environ.get("POSTURE_METRICS_DIR", "/tmp/posturehealthtracker_metrics")
+EXPORT_INTERVAL = 5.0
+# Snapshots older than this belong to a process that has exited
+STALE_AFTER = 60.0
+# Seconds; spans a sub-millisecond socket send to a multi-second cloud write
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_METRIC = 'posture_stage_seconds'
+STAGE_HELP = 'Latency of each capture pipeline stage'
+
+_NULL_TIMER = contextlib.nullcontext()
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # One slot per upper bound plus +Inf
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {'buckets': list(self.buckets), 'counts': list(self.counts),
+                    'sum': self.sum, 'count': self.count}
+
+
+class _Timer:
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class Registry:
+    """Metrics for one process, keyed by (name, sorted label items)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._help = {STAGE_METRIC: STAGE_HELP}
+        self._collectors = []
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def histogram(self, name, labels=None, buckets=LATENCY_BUCKETS):
+        key = (name, tuple(sorted((labels or {}).items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(buckets))
+        return histogram
+
+    def inc(self, name, amount=1, labels=None):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def add_collector(self, collector):
+        """`collector()` returns [(name, type, help, value), ...] read at snapshot time."""
+        self._collectors.append(collector)
+
+    def snapshot(self):
+        with self._lock:
+            histograms = list(self._histograms.items())
+            counters = list(self._counters.items())
+        metrics = []
+        for (name, labels), histogram in histograms:
+            metrics.append(dict(name=name, type='histogram', labels=dict(labels), **histogram.snapshot()))
+        for (name, labels), value in counters:
+            metrics.append({'name': name, 'type': 'counter', 'labels': dict(labels), 'value': value})
+        for collector in self._collectors:
+            try:
+                for name, kind, help_text, value in collector():
+                    self._help.setdefault(name, help_text)
+                    metrics.append({'name': name, 'type': kind, 'labels': {}, 'value': value})
+            except Exception as error:
+                logger.debug(f"Metrics collector failed: {error}")
+        return {'metrics': metrics, 'help': dict(self._help)}
+
+
+REGISTRY = Registry()
+_stage_histograms = {}
+
+
+def timer(stage):
+    """`with timer('capture'): ...` records into posture_stage_seconds{stage=...}."""
+    if not ENABLED:
+        return _NULL_TIMER
+    histogram = _stage_histograms.get(stage)
+    if histogram is None:
+        histogram = _stage_histograms[stage] = REGISTRY.histogram(STAGE_METRIC, {'stage': stage})
+    return _Timer(histogram)
+
+
+def inc(name, amount=1, **labels):
+    if not ENABLED:
+        return
+    REGISTRY.inc(name, amount, labels)
+
+
+def describe(name, help_text):
+    REGISTRY.describe(name, help_text)
+
+
+def add_collector(collector):
+    REGISTRY.add_collector(collector)
+
+
+# ==========================================
+# CROSS-PROCESS EXPORT
+# ==========================================
+def snapshot_path(process, directory=None):
+    return os.path.join(directory or METRICS_DIR, f"{process}.json")
+
+
+def write_snapshot(process, registry=REGISTRY, directory=None):
+    directory = directory or METRICS_DIR
+    os.makedirs(directory, exist_ok=True)
+    snapshot = dict(registry.snapshot(), process=process, pid=os.getpid(), updated=time.time())
+    path = snapshot_path(process, directory)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, separators=(',', ':'))
+    # Rename is atomic, so readers never see a half-written snapshot
+    os.replace(tmp_path, path)
+
+
+class Exporter:
+    """Background thread writing this process's snapshot every `interval` seconds."""
+
+    def __init__(self, process, interval=EXPORT_INTERVAL, registry=REGISTRY, directory=None):
+        self.process = process
+        self.interval = interval
+        self.registry = registry
+        self.directory = directory
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if not ENABLED or (self._thread and self._thread.is_alive()):
+            return self
+        self._thread = threading.Thread(target=self._run, name='metrics-exporter', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+        self._write()
+
+    def _write(self):
+        if not ENABLED:
+            return
+        try:
+            write_snapshot(self.process, self.registry, self.directory)
+        except Exception as error:
+            logger.debug(f"Metrics snapshot failed: {error}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._write()
+
+
+def read_snapshots(directory=None, now=None):
+    directory = directory or METRICS_DIR
+    now = time.time() if now is None else now
+    snapshots = []
+    try:
+        names = sorted(os.listdir(directory))
+    except FileNotFoundError:
+        return snapshots
+    for name in names:
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name), encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if now - snapshot.get('updated', 0) <= STALE_AFTER:
+            snapshots.append(snapshot)
+    return snapshots
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(snapshots):
+    """Prometheus text exposition (format 0.0.4) for a list of snapshots."""
+    grouped = {}
+    help_texts = {}
+    for snapshot in snapshots:
+        help_texts.update(snapshot.get('help', {}))
+        for metric in snapshot.get('metrics', []):
+            labels = dict(process=snapshot.get('process', 'unknown'), **metric.get('labels', {}))
+            grouped.setdefault(metric['name'], []).append((labels, metric))
+
+    lines = []
+    for name in sorted(grouped):
+        series = grouped[name]
+        kind = series[0][1]['type']
+        if name in help_texts:
+            lines.append(f"# HELP {name} {help_texts[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, metric in series:
+            if kind == 'histogram':
+                cumulative = 0
+                for bound, count in zip(list(metric['buckets']) + [float('inf')], metric['counts']):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(dict(labels, le=_format_value(bound)))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(metric['sum'])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {metric['count']}")
+            else:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(metric['value'])}")
+    return '\n'.join(lines) + '\n'
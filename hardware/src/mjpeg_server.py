@@ -1,25 +1,82 @@
 #!/usr/bin/env python3
 """
 Lightweight MJPEG HTTP server for real-time camera stream.
-Serves binary JPEG frames from disk for high-speed, low-latency streaming.
+Serves the JPEG frames the pipelines publish to the shared-memory frame ring
+(or the frame file) for high-speed, low-latency streaming.
+
+Every connection gets its own thread, so any number of viewers, health
+probes and page loads are served at once. Connections are capped at
+MAX_CONNECTIONS and /stream viewers at MAX_STREAM_CLIENTS; over either cap
+the client gets a 503 straight away instead of queueing behind a stream.
+A connection that sends nothing (or accepts nothing) for IDLE_TIMEOUT
+seconds is closed.
+
+Viewers are sent a frame only when the pipeline publishes a new one, plus a
+keep-alive resend every KEEPALIVE_INTERVAL while the picture is unchanged.
+A viewer on a slow link never holds anyone else up: each viewer has its own
+thread and a small kernel send buffer, all viewers send the same shared
+frame bytes, and a viewer whose send blocked skips straight to the newest
+frame when it is writable again. Skipped frames, delivered fps and send
+latency per viewer are on /status.
 
 Runs on http://localhost:8000/stream
+A single fresh frame at http://localhost:8000/snapshot.jpg
+Prometheus metrics for every pipeline process at http://localhost:8000/metrics
+Per-viewer delivery stats at http://localhost:8000/status
 """
 
+import collections
+import json
 import time
 import os
 from pathlib import Path
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import threading
 import logging
+import select
+import socket
+
+if __package__ in (None, ""):
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from src import frame_ring
+    from src import metrics
+    from src import preview_demand
+else:
+    from . import frame_ring
+    from . import metrics
+    from . import preview_demand
 
 # ==========================================
 # CONFIGURATION
 # ==========================================
-FRAME_FILE = Path('/tmp/posturehealthtracker_frame.jpg')
+FRAME_FILE = Path(preview_demand.FRAME_FILE)
 LISTEN_HOST = '0.0.0.0'
 LISTEN_PORT = 8000
 LOG_FILE = '/tmp/posturehealthtracker_mjpeg.log'
+# How long a snapshot waits for the pipeline to encode a frame after asking for one
+SNAPSHOT_TIMEOUT = 3.0
+# Frame interval of the old fixed-rate stream (~30fps), the baseline for duplicates avoided
+FRAME_INTERVAL = 0.033
+# With no new frame, the current one is resent this often so proxies and browsers keep the stream open
+KEEPALIVE_INTERVAL = float(os.environ.get("POSTURE_MJPEG_KEEPALIVE", "5"))
+# How often an idle stream checks whether its viewer has disconnected
+DISCONNECT_CHECK = 1.0
+# Window for the unique and per-viewer delivered frames/second
+FPS_WINDOW = 5.0
+# Kernel send buffer per viewer: about two preview frames, so a slow link
+# queues little and always moves on to the newest frame
+STREAM_SEND_BUFFER = int(os.environ.get("POSTURE_MJPEG_SEND_BUFFER", str(128 * 1024)))
+# Smoothing for each viewer's average send time
+SEND_EWMA_ALPHA = 0.2
+# How often the broadcaster checks the frame file for a new frame
+POLL_INTERVAL = 0.01
+# Concurrent /stream viewers; further viewers get a 503
+MAX_STREAM_CLIENTS = int(os.environ.get("POSTURE_MJPEG_MAX_CLIENTS", "8"))
+# All connections (viewers plus health checks, snapshots, metrics and page loads)
+MAX_CONNECTIONS = int(os.environ.get("POSTURE_MJPEG_MAX_CONNECTIONS", str(MAX_STREAM_CLIENTS + 8)))
+# Seconds a connection may stall on a request or on a frame write before it is closed
+IDLE_TIMEOUT = float(os.environ.get("POSTURE_MJPEG_IDLE_TIMEOUT", "30"))
 
 logging.basicConfig(
     level=logging.INFO,
@@ -31,18 +88,187 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# ==========================================
+# FRAME BROADCASTER
+# ==========================================
+class FrameBroadcaster:
+    """One reader for the published preview frames, shared by every /stream viewer.
+
+    While anyone is subscribed, a single thread checks for a new frame every
+    POLL_INTERVAL: a read of the shared-memory ring's sequence number, or a
+    stat of FRAME_FILE when the pipelines write the file instead (see
+    frame_ring). A frame is read only when it is new, and published once as
+    an immutable bytes object with a new generation number; viewers wait on a
+    condition and all write that same object, so reads stay at one per new
+    frame however many viewers there are. The generation also tells a viewer
+    whether it already has the frame, so only new frames go out (plus a
+    keep-alive every KEEPALIVE_INTERVAL). The reader also keeps the preview
+    demand mark fresh, once for all viewers.
+    """
+
+    def __init__(self, path=None, poll_interval=POLL_INTERVAL):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._condition = threading.Condition()
+        self._frame = None
+        self._generation = 0
+        self._signature = None
+        self._subscribers = 0
+        self._thread = None
+        self._closed = False
+        self._published = collections.deque()
+        self.reads = 0
+
+    def subscribe(self):
+        with self._condition:
+            self._subscribers += 1
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name='mjpeg-frames', daemon=True)
+                self._thread.start()
+
+    def unsubscribe(self):
+        with self._condition:
+            self._subscribers -= 1
+
+    def wait(self, generation, timeout):
+        """(generation, frame) once a frame newer than `generation` is published, or the current one after `timeout`."""
+        with self._condition:
+            if self._generation == generation and not self._closed:
+                self._condition.wait(timeout)
+            return self._generation, self._frame
+
+    def publish(self, frame):
+        with self._condition:
+            self._frame = frame
+            self._generation += 1
+            now = time.monotonic()
+            self._published.append(now)
+            while self._published[0] < now - FPS_WINDOW:
+                self._published.popleft()
+            self._condition.notify_all()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def unique_fps(self, now=None):
+        """New frames per second over the last FPS_WINDOW seconds."""
+        now = time.monotonic() if now is None else now
+        with self._condition:
+            while self._published and self._published[0] < now - FPS_WINDOW:
+                self._published.popleft()
+            return len(self._published) / FPS_WINDOW
+
+    def stats(self):
+        unique_fps = self.unique_fps()
+        with self._condition:
+            return {'generation': self._generation, 'subscribers': self._subscribers, 'reads': self.reads,
+                    'unique_fps': unique_fps}
+
+    def _running(self):
+        with self._condition:
+            if self._subscribers > 0 and not self._closed:
+                return True
+            self._thread = None
+            return False
+
+    def _run(self):
+        reader = frame_ring.FrameReader(self.path or FRAME_FILE)
+        last_demand = 0.0
+        try:
+            while self._running():
+                # Keep the pipelines encoding preview frames while anyone is watching
+                if time.monotonic() - last_demand >= preview_demand.DEMAND_REFRESH:
+                    preview_demand.request_preview()
+                    last_demand = time.monotonic()
+                try:
+                    self._poll(reader)
+                except Exception as e:
+                    logger.debug(f"Frame read error: {e}")
+                time.sleep(self.poll_interval)
+        finally:
+            reader.close()
+
+    def _poll(self, reader):
+        signature = reader.signature()
+        if signature is None or signature == self._signature:
+            return
+        latest = reader.read()
+        self.reads += 1
+        metrics.inc('posture_stream_frame_reads_total')
+        if latest is not None:
+            self._signature, _, frame = latest
+            self.publish(frame)
+
+
+class ViewerStats:
+    """Delivery counters for one /stream viewer, shown on /status."""
+
+    def __init__(self, client_address):
+        self.address = f"{client_address[0]}:{client_address[1]}" if client_address else '?'
+        self.connected_at = time.monotonic()
+        self.frames_sent = 0
+        self.keepalives_sent = 0
+        self.frames_dropped = 0
+        self.bytes_sent = 0
+        self.send_ms = None
+        self.max_send_ms = 0.0
+        self._sent_at = collections.deque()
+
+    def record(self, kind, size, elapsed, dropped, now):
+        """One frame written: `elapsed` seconds in send, `dropped` newer frames skipped before it."""
+        if kind == 'keepalive':
+            self.keepalives_sent += 1
+        else:
+            self.frames_sent += 1
+            self._sent_at.append(now)
+            while self._sent_at[0] < now - FPS_WINDOW:
+                self._sent_at.popleft()
+        self.frames_dropped += dropped
+        self.bytes_sent += size
+        elapsed_ms = elapsed * 1000
+        self.send_ms = elapsed_ms if self.send_ms is None else self.send_ms + SEND_EWMA_ALPHA * (elapsed_ms - self.send_ms)
+        self.max_send_ms = max(self.max_send_ms, elapsed_ms)
+
+    def snapshot(self, now=None):
+        now = time.monotonic() if now is None else now
+        window = min(FPS_WINDOW, max(now - self.connected_at, 1e-3))
+        recent = sum(1 for sent_at in list(self._sent_at) if sent_at >= now - window)
+        return {
+            'address': self.address,
+            'connected_seconds': round(now - self.connected_at, 1),
+            'delivered_fps': round(recent / window, 2),
+            'frames_sent': self.frames_sent,
+            'keepalives_sent': self.keepalives_sent,
+            'frames_dropped': self.frames_dropped,
+            'bytes_sent': self.bytes_sent,
+            'send_ms': round(self.send_ms, 2) if self.send_ms is not None else None,
+            'max_send_ms': round(self.max_send_ms, 2),
+        }
+
+
 # ==========================================
 # MJPEG STREAM HANDLER
 # ==========================================
 class MJPEGHandler(BaseHTTPRequestHandler):
     """HTTP request handler for MJPEG streaming."""
 
+    # Applied to the socket: idle requests and stalled viewers time out instead of holding a thread
+    timeout = IDLE_TIMEOUT
+
     def do_GET(self):
         """Handle GET requests for /stream endpoint."""
         if self.path == '/stream':
             self.stream_mjpeg()
+        elif self.path == '/snapshot.jpg':
+            self.send_snapshot()
         elif self.path == '/health':
             self.send_health()
+        elif self.path == '/metrics':
+            self.send_metrics()
+        elif self.path == '/status':
+            self.send_status()
         elif self.path == '/':
             self.send_index()
         else:
@@ -50,61 +276,138 @@ class MJPEGHandler(BaseHTTPRequestHandler):
 
     def stream_mjpeg(self):
         """Stream MJPEG data (Motion JPEG over HTTP)."""
+        viewer = ViewerStats(self.client_address)
+        # Plain HTTPServer (tests, tooling) has no viewer cap
+        bounded = isinstance(self.server, MJPEGServer)
+        if bounded and not self.server.open_stream(viewer):
+            metrics.inc('posture_mjpeg_clients_rejected_total', reason='streams')
+            self.send_error(503, 'Too many viewers')
+            return
+        try:
+            self._stream_frames(viewer)
+        finally:
+            if bounded:
+                self.server.close_stream(viewer)
+
+    def _stream_frames(self, viewer):
+        if isinstance(self.server, MJPEGServer):
+            stopping, frames = self.server.stopping, self.server.frames
+        else:
+            stopping, frames = threading.Event(), FrameBroadcaster()
         self.send_response(200)
         self.send_header('Content-Type', 'multipart/x-mixed-replace; boundary=frame')
         self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
         self.send_header('Pragma', 'no-cache')
         self.send_header('Expires', '0')
         self.end_headers()
-
-        frame_interval = 0.033  # ~30fps target
-        last_frame_size = 0
-
+        # A small send buffer keeps a slow link from queueing seconds of stale frames in the kernel
         try:
-            while True:
-                try:
-                    # Read the latest JPEG frame from disk
-                    if FRAME_FILE.exists():
-                        with open(FRAME_FILE, 'rb') as f:
-                            frame_data = f.read()
-
-                        # Only send if frame has changed or is new
-                        if len(frame_data) > 0:
-                            # Write MJPEG boundary and headers
-                            boundary = b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: ' + \
-                                      str(len(frame_data)).encode() + b'\r\n\r\n'
-                            self.wfile.write(boundary)
-                            self.wfile.write(frame_data)
-                            self.wfile.write(b'\r\n')
-                            last_frame_size = len(frame_data)
-                        else:
-                            # Empty frame, wait and retry
-                            time.sleep(0.01)
-                    else:
-                        # Frame file doesn't exist yet, wait
-                        time.sleep(0.01)
-
-                    # Pace the stream to ~30fps
-                    time.sleep(frame_interval)
+            self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, STREAM_SEND_BUFFER)
+        except OSError:
+            pass
 
-                except Exception as e:
-                    logger.debug(f"Stream read error: {e}")
-                    time.sleep(0.05)
+        generation = 0
+        last_sent = time.monotonic()
+        frames.subscribe()
+        try:
+            while not stopping.is_set():
+                # Woken by each new frame; the current one is only resent as a keep-alive.
+                # The generation is a one-frame mailbox: frames published while a send was
+                # blocked are skipped and this viewer goes straight to the newest.
+                new_generation, frame_data = frames.wait(generation, min(KEEPALIVE_INTERVAL, DISCONNECT_CHECK))
+                if new_generation == generation and self._peer_closed():
+                    break
+                if not frame_data:
+                    continue
+                now = time.monotonic()
+                dropped = 0
+                if new_generation != generation:
+                    kind = 'new'
+                    if generation:
+                        dropped = new_generation - generation - 1
+                    # Resends the old fixed ~30fps loop would have made since the last frame
+                    skipped = int((now - last_sent) / FRAME_INTERVAL) - 1
+                    if skipped > 0:
+                        metrics.inc('posture_stream_duplicates_avoided_total', skipped)
+                elif now - last_sent >= KEEPALIVE_INTERVAL:
+                    kind = 'keepalive'
+                else:
                     continue
+                generation = new_generation
+                # MJPEG part header, the shared frame bytes and the trailer in one scatter-gather send
+                boundary = b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: ' + \
+                          str(len(frame_data)).encode() + b'\r\n\r\n'
+                with metrics.timer('stream_send'):
+                    self._send_all((boundary, frame_data, b'\r\n'))
+                last_sent = time.monotonic()
+                viewer.record(kind, len(frame_data), last_sent - now, dropped, last_sent)
+                metrics.inc('posture_stream_frames_sent_total', kind=kind)
+                if dropped:
+                    metrics.inc('posture_stream_frames_dropped_total', dropped)
 
-        except BrokenPipeError:
+        except (ConnectionError, TimeoutError):
+            # The viewer went away or stopped reading for IDLE_TIMEOUT
             logger.debug("Client disconnected from stream")
         except Exception as e:
             logger.warning(f"Stream error: {e}")
         finally:
-            try:
-                self.wfile.close()
-            except:
-                pass
+            frames.unsubscribe()
+            # finish() closes the socket once the handler returns
+            self.close_connection = True
+
+    def _send_all(self, buffers):
+        """sendmsg() the buffers without joining them (no per-viewer copy of the frame)."""
+        views = [memoryview(buffer) for buffer in buffers]
+        while views:
+            sent = self.connection.sendmsg(views)
+            while views and sent >= len(views[0]):
+                sent -= len(views[0])
+                views.pop(0)
+            if views and sent:
+                views[0] = views[0][sent:]
+
+    def _peer_closed(self):
+        """True once the viewer has hung up; between frames nothing else would notice."""
+        try:
+            readable, _, _ = select.select([self.connection], [], [], 0)
+            return bool(readable) and not self.connection.recv(1, socket.MSG_PEEK)
+        except OSError:
+            return True
+
+    def send_snapshot(self):
+        """One JPEG newer than the request; the pipelines only encode on demand, so ask first."""
+        requested = time.time()
+        preview_demand.request_preview()
+        deadline = time.monotonic() + SNAPSHOT_TIMEOUT
+        reader = frame_ring.FrameReader(FRAME_FILE)
+        frame_data = None
+        try:
+            while time.monotonic() < deadline:
+                latest = reader.read()
+                if latest is not None and latest[1] >= requested:
+                    frame_data = latest[2]
+                    break
+                time.sleep(0.05)
+        finally:
+            reader.close()
+
+        if not frame_data:
+            self.send_error(503, 'No camera frame available')
+            return
+        metrics.inc('posture_snapshots_served_total')
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
+        self.send_header('Content-Length', str(len(frame_data)))
+        self.end_headers()
+        self.wfile.write(frame_data)
 
     def send_health(self):
-        """Health check endpoint returns 200 if frame file exists."""
-        if FRAME_FILE.exists():
+        """Health check endpoint returns 200 once a frame has been published."""
+        reader = frame_ring.FrameReader(FRAME_FILE)
+        published = reader.signature() is not None
+        reader.close()
+        if published:
             self.send_response(200)
             self.send_header('Content-Type', 'application/json')
             self.end_headers()
@@ -115,6 +418,31 @@ class MJPEGHandler(BaseHTTPRequestHandler):
             self.end_headers()
             self.wfile.write(b'{"status":"no_frames"}')
 
+    def send_status(self):
+        """JSON: connection counts, unique frame rate and per-viewer delivery stats."""
+        if isinstance(self.server, MJPEGServer):
+            status = self.server.status()
+        else:
+            status = {'viewers': []}
+        body = json.dumps(status).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_metrics(self):
+        """Prometheus text exposition of every pipeline process's latest snapshot."""
+        if metrics.ENABLED:
+            metrics.write_snapshot('mjpeg')
+        body = metrics.render_prometheus(metrics.read_snapshots()).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
     def send_index(self):
         """Serve a simple HTML test page."""
         html = """
@@ -157,22 +485,129 @@ class MJPEGHandler(BaseHTTPRequestHandler):
 
 
 # ==========================================
-# SERVER STARTUP
+# SERVER
 # ==========================================
+class MJPEGServer(ThreadingHTTPServer):
+    """A thread per connection, bounded: connections over `max_connections` get a 503 and are closed."""
+
+    daemon_threads = True
+
+    def __init__(self, server_address, handler_class=MJPEGHandler,
+                 max_connections=MAX_CONNECTIONS, max_stream_clients=MAX_STREAM_CLIENTS):
+        super().__init__(server_address, handler_class)
+        self.max_connections = max_connections
+        self.max_stream_clients = max_stream_clients
+        self._lock = threading.Lock()
+        self.connections = 0
+        self.viewers = set()
+        # Set on shutdown so open streams finish instead of holding their threads
+        self.stopping = threading.Event()
+        self.frames = FrameBroadcaster()
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            accepted = self.connections < self.max_connections
+            if accepted:
+                self.connections += 1
+        if not accepted:
+            metrics.inc('posture_mjpeg_clients_rejected_total', reason='connections')
+            self._reject(request)
+            return
+        try:
+            super().process_request(request, client_address)
+        except Exception:
+            self._release()
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._release()
+
+    def _release(self):
+        with self._lock:
+            self.connections -= 1
+
+    def _reject(self, request):
+        # Answered on the accept thread: a few bytes to a fresh socket, bounded by a short timeout
+        body = b'Too many connections'
+        try:
+            request.settimeout(1.0)
+            request.sendall(b'HTTP/1.0 503 Service Unavailable\r\nContent-Type: text/plain\r\n'
+                            b'Retry-After: 5\r\nConnection: close\r\nContent-Length: '
+                            + str(len(body)).encode() + b'\r\n\r\n' + body)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    @property
+    def stream_clients(self):
+        """Viewers currently on /stream."""
+        return len(self.viewers)
+
+    def open_stream(self, viewer):
+        """Claim a /stream slot for `viewer`; False when `max_stream_clients` are already watching."""
+        with self._lock:
+            if len(self.viewers) >= self.max_stream_clients:
+                return False
+            self.viewers.add(viewer)
+            return True
+
+    def close_stream(self, viewer):
+        with self._lock:
+            self.viewers.discard(viewer)
+
+    def status(self):
+        with self._lock:
+            viewers = list(self.viewers)
+        now = time.monotonic()
+        return {
+            'connections': self.connections,
+            'stream_clients': len(viewers),
+            'max_stream_clients': self.max_stream_clients,
+            'unique_fps': round(self.frames.unique_fps(now), 2),
+            'viewers': [viewer.snapshot(now) for viewer in sorted(viewers, key=lambda v: v.connected_at)],
+        }
+
+    def collector(self):
+        return [
+            ('posture_mjpeg_connections', 'gauge', 'Open MJPEG server connections', self.connections),
+            ('posture_mjpeg_stream_clients', 'gauge', 'Viewers on /stream', self.stream_clients),
+            ('posture_mjpeg_frames_published', 'counter', 'New frames published to /stream viewers',
+             self.frames.stats()['generation']),
+            ('posture_mjpeg_unique_fps', 'gauge', f'New frames per second over the last {FPS_WINDOW:g} s',
+             round(self.frames.unique_fps(), 2)),
+        ]
+
+    def shutdown(self):
+        self.stopping.set()
+        self.frames.close()
+        super().shutdown()
+
+
 def start_mjpeg_server():
     """Start the MJPEG HTTP server."""
-    server = HTTPServer((LISTEN_HOST, LISTEN_PORT), MJPEGHandler)
-    logger.info(f"MJPEG server started on {LISTEN_HOST}:{LISTEN_PORT}")
+    server = MJPEGServer((LISTEN_HOST, LISTEN_PORT))
+    metrics.add_collector(server.collector)
+    logger.info(f"MJPEG server started on {LISTEN_HOST}:{LISTEN_PORT} "
+                f"(up to {MAX_STREAM_CLIENTS} viewers, {MAX_CONNECTIONS} connections)")
     logger.info(f"Stream available at http://localhost:{LISTEN_PORT}/stream")
+    logger.info(f"Snapshot at http://localhost:{LISTEN_PORT}/snapshot.jpg")
     logger.info(f"Health check at http://localhost:{LISTEN_PORT}/health")
+    logger.info(f"Metrics at http://localhost:{LISTEN_PORT}/metrics")
+    logger.info(f"Viewer status at http://localhost:{LISTEN_PORT}/status")
     logger.info(f"Test page at http://localhost:{LISTEN_PORT}/")
     
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         logger.info("Shutdown signal received")
-        server.shutdown()
+        server.stopping.set()
+        server.frames.close()
         logger.info("Server stopped")
+    finally:
+        server.server_close()
 
 
 if __name__ == '__main__':
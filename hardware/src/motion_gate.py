@@ -0,0 +1,108 @@
+"""
+Motion gate in front of pose estimation.
+
+Someone working at a desk barely moves for long stretches, so most frames
+would produce the same posture metrics as the last analysed one.
+`MotionGate` shrinks each frame to a tiny grayscale thumbnail and compares
+it with the thumbnail of the last frame that was actually analysed. While
+the mean absolute difference stays under `threshold` the previous metrics
+are reused; `max_staleness` forces a fresh analysis regardless.
+
+Comparing against the last *analysed* frame (not the previous frame) keeps
+slow drift from creeping past the gate one small step at a time.
+"""
+
+import os
+import time
+
+from . import metrics
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+ENABLED = os.environ.get("POSTURE_MOTION_GATE", "1") != "0"
+# Mean absolute difference (0-255 grey levels) that counts as a scene change
+THRESHOLD = float(os.environ.get("POSTURE_MOTION_THRESHOLD", "3.0"))
+# Always re-analyse after this many seconds, even in a still scene
+MAX_STALENESS = float(os.environ.get("POSTURE_MOTION_MAX_STALENESS", "10.0"))
+THUMBNAIL_SIZE = (32, 24)
+
+
+def thumbnail(frame, size=THUMBNAIL_SIZE):
+    """Grayscale `size` thumbnail; INTER_AREA averages away sensor noise."""
+    import cv2
+    import numpy as np
+
+    small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return small.astype(np.int16)
+
+
+class MotionGate:
+    """Decides per frame whether pose estimation needs to run again."""
+
+    def __init__(self, threshold=THRESHOLD, max_staleness=MAX_STALENESS, size=THUMBNAIL_SIZE):
+        self.threshold = threshold
+        self.max_staleness = max_staleness
+        self.size = size
+
+        self._reference = None
+        self._reference_at = None
+        self.last_difference = None
+
+        self.hits = 0
+        self.misses = 0
+        self.forced = 0
+
+    def reset(self):
+        """Forget the reference frame, e.g. when a camera session ends."""
+        self._reference = None
+        self._reference_at = None
+
+    def should_analyze(self, frame, now=None):
+        """True if `frame` needs a fresh pose pass; False to reuse the last metrics.
+
+        A True answer makes `frame` the new reference, so only call this when
+        the caller will actually analyse it.
+        """
+        now = time.monotonic() if now is None else now
+        current = thumbnail(frame, self.size)
+
+        if self._reference is None or self._reference.shape != current.shape:
+            return self._miss(current, now, 'first')
+        if now - self._reference_at >= self.max_staleness:
+            self.forced += 1
+            return self._miss(current, now, 'stale')
+
+        self.last_difference = float(abs(current - self._reference).mean())
+        if self.last_difference >= self.threshold:
+            return self._miss(current, now, 'motion')
+
+        self.hits += 1
+        metrics.inc('posture_motion_gate_total', result='hit')
+        return False
+
+    def set_reference(self, frame, now=None):
+        """Make `frame` the reference without counting a hit or miss.
+
+        For frames the caller analyses regardless of the gate (e.g. nothing to reuse yet).
+        """
+        self._reference = thumbnail(frame, self.size)
+        self._reference_at = time.monotonic() if now is None else now
+
+    def _miss(self, current, now, reason):
+        self._reference = current
+        self._reference_at = now
+        self.misses += 1
+        metrics.inc('posture_motion_gate_total', result='miss', reason=reason)
+        return True
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'forced': self.forced,
+            'hit_rate': round(self.hits / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,114 @@
+"""
+Side-view posture rules on COCO keypoint arrays.
+
+Both capture paths feed this one engine: MediaPipe's 33 landmarks are
+reduced to the 17 COCO keypoints with `from_mediapipe`, the Hailo pipeline
+already produces COCO order. Keypoints are a `(17, 3)` array of
+(x, y, confidence) with x/y normalised to the frame; `evaluate_batch` takes
+`(N, 17, 3)` for session replay and analytics, and `evaluate` is the
+single-frame wrapper returning the camera metrics dict.
+
+The rules (pixels at the reference frame size):
+- head forward: ear more than HEAD_FORWARD_THRESHOLD px from the shoulder
+- slouching:    shoulder more than SHOULDER_FORWARD_THRESHOLD px from the hip
+Each side uses the left keypoint when its confidence is above
+`min_confidence`, otherwise the right one, otherwise the check is skipped.
+"""
+
+import numpy as np
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+HEAD_FORWARD_THRESHOLD = 12  # pixels — how far ear is in front of shoulder
+SHOULDER_FORWARD_THRESHOLD = 18  # pixels — how far shoulder is in front of hip
+MIN_CONFIDENCE = 0.5
+
+COCO_KEYPOINTS = (
+    'nose',
+    'left_eye', 'right_eye',
+    'left_ear', 'right_ear',
+    'left_shoulder', 'right_shoulder',
+    'left_elbow', 'right_elbow',
+    'left_wrist', 'right_wrist',
+    'left_hip', 'right_hip',
+    'left_knee', 'right_knee',
+    'left_ankle', 'right_ankle',
+)
+NUM_KEYPOINTS = len(COCO_KEYPOINTS)
+NOSE, LEFT_EAR, RIGHT_EAR, LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP = 0, 3, 4, 5, 6, 11, 12
+# Left/right keypoint pairs for ear, shoulder and hip; the rules only use their x
+LEFT_SIDE = [LEFT_EAR, LEFT_SHOULDER, LEFT_HIP]
+RIGHT_SIDE = [RIGHT_EAR, RIGHT_SHOULDER, RIGHT_HIP]
+# MediaPipe Pose landmark index for each COCO keypoint
+MEDIAPIPE_TO_COCO = np.array([0, 2, 5, 7, 8, 11, 12, 13, 14, 15, 16, 23, 24, 25, 26, 27, 28])
+
+REASON_NONE, REASON_HEAD_FORWARD, REASON_SLOUCHING = 0, 1, 2
+REASONS = ('', 'Head forward', 'Slouching')
+
+
+def from_mediapipe(landmarks):
+    """(17, 3) COCO keypoints from MediaPipe landmarks (anything with x/y/visibility)."""
+    keypoints = np.empty((NUM_KEYPOINTS, 3), dtype=np.float64)
+    for row, index in enumerate(MEDIAPIPE_TO_COCO):
+        landmark = landmarks[index]
+        keypoints[row] = (landmark.x, landmark.y, landmark.visibility)
+    return keypoints
+
+
+def evaluate_batch(keypoints, width, height, min_confidence=MIN_CONFIDENCE, slouch_overrides=False,
+                   head_threshold=HEAD_FORWARD_THRESHOLD, shoulder_threshold=SHOULDER_FORWARD_THRESHOLD):
+    """Posture metrics for `(N, 17, 3)` keypoints, as a dict of length-N arrays.
+
+    `head_forward` / `shoulder_forward` are horizontal offsets in whole pixels
+    (NaN when a side is missing); `reason` holds REASON_* codes. When both
+    rules fire the reason is head forward, or slouching with `slouch_overrides`
+    (the Hailo pipeline's historical precedence). Both rules are horizontal,
+    so `height` only matters for callers that add vertical checks.
+    """
+    keypoints = np.asarray(keypoints, dtype=np.float64)
+    if keypoints.ndim != 3 or keypoints.shape[1:] != (NUM_KEYPOINTS, 3):
+        raise ValueError(f"expected (N, {NUM_KEYPOINTS}, 3) keypoints, got {keypoints.shape}")
+
+    # Ear, shoulder, hip x in whole pixels (truncated like the original int()), from the
+    # first confident side; NaN where neither side is confident
+    left_ok = keypoints[:, LEFT_SIDE, 2] > min_confidence
+    right_ok = keypoints[:, RIGHT_SIDE, 2] > min_confidence
+    x = np.trunc(np.where(left_ok, keypoints[:, LEFT_SIDE, 0], keypoints[:, RIGHT_SIDE, 0]) * width)
+    x[~(left_ok | right_ok)] = np.nan
+
+    head_forward = np.abs(x[:, 0] - x[:, 1])
+    shoulder_forward = np.abs(x[:, 1] - x[:, 2])
+    with np.errstate(invalid='ignore'):
+        head_bad = head_forward > head_threshold
+        slouch_bad = shoulder_forward > shoulder_threshold
+
+    reason = np.zeros(len(keypoints), dtype=np.int8)
+    if slouch_overrides:
+        reason[head_bad] = REASON_HEAD_FORWARD
+        reason[slouch_bad] = REASON_SLOUCHING
+    else:
+        reason[slouch_bad] = REASON_SLOUCHING
+        reason[head_bad] = REASON_HEAD_FORWARD
+
+    left_y = keypoints[:, LEFT_SHOULDER, 1]
+    right_y = keypoints[:, RIGHT_SHOULDER, 1]
+    return {
+        'shoulder_alignment': np.abs(left_y - right_y),
+        'neck_angle': keypoints[:, NOSE, 1] - (left_y + right_y) / 2,
+        'head_forward': head_forward,
+        'shoulder_forward': shoulder_forward,
+        'is_bad': head_bad | slouch_bad,
+        'reason': reason,
+    }
+
+
+def evaluate(keypoints, width, height, **kwargs):
+    """Camera metrics dict for one `(17, 3)` keypoint array."""
+    batch = evaluate_batch(np.asarray(keypoints, dtype=np.float64)[None], width, height, **kwargs)
+    return {
+        'shoulder_alignment': float(batch['shoulder_alignment'][0]),
+        'neck_angle': float(batch['neck_angle'][0]),
+        'is_bad': bool(batch['is_bad'][0]),
+        'reason': REASONS[batch['reason'][0]],
+    }
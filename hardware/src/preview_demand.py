@@ -0,0 +1,78 @@
+"""
+Consumer-driven preview frames.
+
+Encoding a preview JPEG costs more than capturing the frame, and nothing
+reads it unless someone is watching: live_data no longer carries
+`cameraFrame`, so the only consumers are MJPEG viewers and snapshot
+requests. The MJPEG server marks demand by touching `DEMAND_FILE` (every
+`DEMAND_REFRESH` seconds while a viewer is connected, once per snapshot);
+the capture pipelines check `PreviewDemand.active()` and only encode and
+publish frames (see `write_frame`) while the mark is younger than `DEMAND_TTL`.
+"""
+
+import os
+import time
+
+from . import frame_ring
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+FRAME_FILE = '/tmp/posturehealthtracker_frame.jpg'
+DEMAND_FILE = '/tmp/posturehealthtracker_preview_demand'
+# A viewer refreshes the mark this often; producers drop demand after DEMAND_TTL
+DEMAND_REFRESH = 1.0
+DEMAND_TTL = 3.0
+# Producers re-stat the mark at most this often
+CHECK_INTERVAL = 0.25
+
+
+def request_preview(path=None):
+    """Mark that a consumer wants preview frames for the next DEMAND_TTL seconds."""
+    path = path or DEMAND_FILE
+    try:
+        with open(path, 'a'):
+            pass
+        os.utime(path)
+    except OSError:
+        pass
+
+
+class PreviewDemand:
+    """Producer-side view of the demand mark, cached so per-frame checks stay cheap."""
+
+    def __init__(self, path=None, ttl=DEMAND_TTL, check_interval=CHECK_INTERVAL):
+        self.path = path or DEMAND_FILE
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self._checked_at = None
+        self._active = False
+
+    def active(self, now=None):
+        now = time.monotonic() if now is None else now
+        if self._checked_at is None or now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            try:
+                self._active = time.time() - os.stat(self.path).st_mtime < self.ttl
+            except OSError:
+                self._active = False
+        return self._active
+
+
+def write_frame(jpeg, path=None):
+    """Publish one encoded JPEG for the MJPEG server; readers never see a partial frame.
+
+    Frames go to the shared-memory frame ring unless it is disabled (or a
+    `path` is given); the frame file, replaced by atomic rename, is the fallback.
+    """
+    if path is None and frame_ring.publish(jpeg):
+        return True
+    path = path or FRAME_FILE
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(jpeg)
+        os.replace(tmp_path, path)
+        return True
+    except OSError:
+        return False
@@ -0,0 +1,179 @@
+"""
+Batched Firestore writer for per-frame session readings.
+
+`save_reading` used to make two Firestore round trips per scored frame
+(`readings.add()` plus a merge of the session document). `ReadingWriter`
+buffers readings and commits them in one `WriteBatch` every `batch_size`
+readings or `flush_interval` seconds, merging each session document once
+per flush. When the on-disk spool is in use, `commit_spooled` is its sink
+and the spool replayer does the batching instead of the in-memory buffer.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+BATCH_SIZE = 20
+FLUSH_INTERVAL = 30.0
+# Firestore rejects batches with more than 500 writes
+MAX_BATCH_OPS = 500
+# Readings kept in memory while Firestore is unreachable
+MAX_BUFFERED = 2000
+
+
+def session_summary(payload):
+    """Fields merged into the session document for its latest reading."""
+    return {
+        'lastReadingAt': payload.get('timestamp'),
+        'lastLiveScore': payload.get('score'),
+        'status': 'active'
+    }
+
+
+class ReadingWriter:
+    """Buffers readings and commits them to `sessions/{id}/readings` in batches."""
+
+    def __init__(self, client_getter, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 max_buffered=MAX_BUFFERED):
+        self.client_getter = client_getter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+
+        self._lock = threading.Lock()
+        self._buffer = []
+        self._oldest_at = None
+
+        self._readings_written = 0
+        self._commits = 0
+        self._failed_commits = 0
+        self._dropped = 0
+
+    def add(self, session_id, payload, doc_id=None, now=None):
+        """Buffer a reading; flushes if the batch is full or old enough."""
+        if not session_id:
+            return
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._buffer.append((session_id, payload, doc_id))
+            if self._oldest_at is None:
+                self._oldest_at = now
+            if len(self._buffer) > self.max_buffered:
+                overflow = len(self._buffer) - self.max_buffered
+                del self._buffer[:overflow]
+                self._dropped += overflow
+            due = len(self._buffer) >= self.batch_size
+        if due:
+            self.flush()
+        else:
+            self.maybe_flush(now)
+
+    def maybe_flush(self, now=None):
+        """Flush if the oldest buffered reading has waited `flush_interval`."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            due = self._oldest_at is not None and now - self._oldest_at >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Commit everything buffered. Returns the number of readings written."""
+        with self._lock:
+            entries = self._buffer
+            self._buffer = []
+            self._oldest_at = None
+        if not entries:
+            return 0
+
+        try:
+            written = self.commit(entries)
+        except Exception as error:
+            logger.warning(f"Failed to write {len(entries)} readings to Firestore: {error}")
+            with self._lock:
+                self._failed_commits += 1
+                self._buffer = entries + self._buffer
+                self._oldest_at = time.monotonic()
+                if len(self._buffer) > self.max_buffered:
+                    overflow = len(self._buffer) - self.max_buffered
+                    del self._buffer[:overflow]
+                    self._dropped += overflow
+            return 0
+        return written
+
+    def commit(self, entries):
+        """Write `(session_id, payload, doc_id)` entries with as few batches as possible.
+
+        A `doc_id` of None lets Firestore pick the reading's document id.
+        Raises if Firestore is unavailable or any batch fails to commit.
+        """
+        client = self.client_getter()
+        if client is None:
+            raise ConnectionError("Firestore client unavailable")
+
+        ops = []
+        latest = {}
+        for session_id, payload, doc_id in entries:
+            session_ref = client.collection('sessions').document(session_id)
+            readings = session_ref.collection('readings')
+            ref = readings.document(doc_id) if doc_id else readings.document()
+            ops.append((ref, payload, False))
+            latest[session_id] = (session_ref, payload)
+        # One session-document merge per flush, carrying the newest reading
+        for session_ref, payload in latest.values():
+            ops.append((session_ref, session_summary(payload), True))
+
+        for start in range(0, len(ops), MAX_BATCH_OPS):
+            batch = client.batch()
+            for ref, data, merge in ops[start:start + MAX_BATCH_OPS]:
+                if merge:
+                    batch.set(ref, data, merge=True)
+                else:
+                    batch.set(ref, data)
+            batch.commit()
+            with self._lock:
+                self._commits += 1
+
+        with self._lock:
+            self._readings_written += len(entries)
+        logger.debug(f"Committed {len(entries)} readings for {len(latest)} session(s)")
+        return len(entries)
+
+    def commit_spooled(self, records):
+        """Spool sink: each record holds {'sessionId', 'reading'} and its key is the document id.
+
+        Raises while Firestore is unavailable so the records stay spooled.
+        """
+        self.commit([(record.payload['sessionId'], record.payload['reading'], record.key)
+                     for record in records])
+
+    def commit_summaries(self, records):
+        """Spool sink for {'sessionId', 'summary'} records: merges `hardwareStats` into each session."""
+        client = self.client_getter()
+        if client is None:
+            raise ConnectionError("Firestore client unavailable")
+        batch = client.batch()
+        for record in records:
+            session_ref = client.collection('sessions').document(record.payload['sessionId'])
+            batch.set(session_ref, {'hardwareStats': record.payload['summary']}, merge=True)
+        batch.commit()
+        with self._lock:
+            self._commits += 1
+
+    def pending(self):
+        with self._lock:
+            return len(self._buffer)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending': len(self._buffer),
+                'readings_written': self._readings_written,
+                'commits': self._commits,
+                'failed_commits': self._failed_commits,
+                'dropped': self._dropped,
+            }
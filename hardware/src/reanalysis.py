@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Batch re-analysis of recorded sessions.
+
+Re-scores a video file or frame directory after a threshold change or a pose
+model upgrade. The recording is cut into chunks of consecutive frames that
+run across a ProcessPoolExecutor. Each worker builds its CameraModule once,
+then takes chunks until the recording is done; every chunk starts with a
+fresh Pose and ROI tracker, exactly as if it were the start of a recording,
+so results are the same for any --workers value. Workers
+only return keypoints. The posture rules then run once in the parent, with
+posture_engine.evaluate_batch over all frames.
+
+Output is one compressed .npz of per-frame columns: frame, time, person,
+keypoints (N, 17, 3), shoulder_alignment, neck_angle, head_forward,
+shoulder_forward, is_bad, reason (posture_engine.REASONS codes) and score.
+The keypoints are stored, so a threshold change can be checked with
+evaluate_batch on the .npz alone, without running the model again.
+
+Usage:
+  python -m hardware.src.reanalysis <recording> [-o out.npz] [--workers N]
+      [--chunk-size FRAMES] [--stride N] [--model-complexity 0|1|2] [--scaling]
+
+--scaling runs the recording with 1, 2, 4, ... workers up to the core count
+and reports frames/second and speedup for each.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+if __package__ in (None, ""):
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from src import camera_module
+    from src import frame_source
+    from src import posture_engine
+    from src.scoring import score_from_camera_metrics
+else:
+    from . import camera_module
+    from . import frame_source
+    from . import posture_engine
+    from .scoring import score_from_camera_metrics
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+# Long enough to amortise a seek and MediaPipe re-acquiring the subject, short enough to balance cores
+CHUNK_SIZE = 300
+
+_worker_cam = None
+_worker_pose_factory = None
+
+
+def open_source(path):
+    """Recorded source for `path`, played as fast as possible."""
+    source = frame_source.from_spec(path, 'dual', camera_module.PREVIEW_SIZE, camera_module.INFERENCE_SIZE,
+                                    realtime=False)
+    if isinstance(source, frame_source.Picamera2Source):
+        raise ValueError("re-analysis needs a recording, not the live camera")
+    return source
+
+
+def plan_chunks(total, chunk_size=CHUNK_SIZE):
+    """[(start, end), ...] covering frames 0..total."""
+    return [(start, min(start + chunk_size, total)) for start in range(0, total, chunk_size)]
+
+
+def init_worker(model_complexity=camera_module.POSE_MODEL_COMPLEXITY, pose_factory=None):
+    """ProcessPoolExecutor initializer: one CameraModule (and pose model) per worker process."""
+    global _worker_cam, _worker_pose_factory
+    _worker_cam = camera_module.CameraModule(model_complexity=model_complexity)
+    # Every frame is scored: no motion gate, no previews
+    _worker_cam.motion_gate = None
+    _worker_pose_factory = pose_factory
+    _new_pose(_worker_cam)
+
+
+def _new_pose(cam):
+    """A pose model with no tracking history (the model files stay cached in the process)."""
+    cam.close_pose()
+    if _worker_pose_factory is not None:
+        cam.pose = _worker_pose_factory()
+    elif camera_module.MP_AVAILABLE:
+        cam.get_pose()
+
+
+def analyze_chunk(path, start, end, stride=1):
+    """Keypoints for frames start, start + stride, ... < end of one recording.
+
+    Returns (frame indices, (n, 17, 3) keypoints with NaN rows where no
+    person was found, reference (width, height)).
+    """
+    cam = _worker_cam
+    # MediaPipe's tracking (static_image_mode=False) and the ROI crop must not carry
+    # over from another chunk, or results would depend on how chunks fall to workers
+    _new_pose(cam)
+    if cam.roi is not None:
+        cam.roi.lose()
+    source = open_source(path)
+    if not source.start():
+        raise OSError(f"cannot open {path}")
+    frames, keypoints = [], []
+    reference_size = None
+    try:
+        source.seek(start)
+        for index in range(start, end):
+            try:
+                _, inference = source.read()
+            except frame_source.EndOfStream:
+                break
+            if (index - start) % stride:
+                continue
+            reference_size = source.reference_size
+            if cam.pose is None and not camera_module.MP_AVAILABLE:
+                landmarks = None
+            else:
+                landmarks = cam.detect_landmarks(cam.inference_rgb(inference))
+            frames.append(index)
+            keypoints.append(posture_engine.from_mediapipe(landmarks) if landmarks is not None
+                             else np.full((posture_engine.NUM_KEYPOINTS, 3), np.nan))
+    finally:
+        source.close()
+    keypoints = np.array(keypoints, dtype=np.float32).reshape(-1, posture_engine.NUM_KEYPOINTS, 3)
+    return np.array(frames, dtype=np.int32), keypoints, reference_size
+
+
+def reanalyze(path, workers=None, chunk_size=CHUNK_SIZE, stride=1,
+              model_complexity=camera_module.POSE_MODEL_COMPLEXITY, pose_factory=None):
+    """Per-frame columns for a whole recording, plus run statistics."""
+    source = open_source(path)
+    if not source.start():
+        raise OSError(f"cannot open {path}")
+    total, fps = source.frame_count(), source.fps
+    source.close()
+    chunks = plan_chunks(total, chunk_size)
+    workers = workers or os.cpu_count() or 1
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(model_complexity, pose_factory)) as pool:
+        futures = [pool.submit(analyze_chunk, path, start, end, stride) for start, end in chunks]
+        results = [future.result() for future in futures]
+    elapsed = time.perf_counter() - started
+
+    frames = np.concatenate([result[0] for result in results]) if results else np.zeros(0, dtype=np.int32)
+    keypoints = (np.concatenate([result[1] for result in results]) if results
+                 else np.zeros((0, posture_engine.NUM_KEYPOINTS, 3), dtype=np.float32))
+    width, height = next((result[2] for result in results if result[2]), (0, 0))
+
+    columns = score_columns(keypoints, width, height)
+    columns.update(frame=frames, time=(frames / fps).astype(np.float32), keypoints=keypoints)
+    stats = {
+        'frames': int(len(frames)),
+        'chunks': len(chunks),
+        'workers': workers,
+        'seconds': round(elapsed, 3),
+        'fps': round(len(frames) / elapsed, 1) if elapsed else 0.0,
+        'source_fps': fps,
+        'width': width,
+        'height': height,
+    }
+    return columns, stats
+
+
+def score_columns(keypoints, width, height):
+    """Posture metrics and frame scores for (N, 17, 3) keypoints, as columns."""
+    person = ~np.isnan(keypoints[:, :, 2]).all(axis=1)
+    batch = posture_engine.evaluate_batch(np.nan_to_num(keypoints, nan=0.0), width, height)
+    for name in ('shoulder_alignment', 'neck_angle'):
+        batch[name] = np.where(person, batch[name], np.nan)
+    # Scores come from the live scoring function, so offline and live sessions agree
+    scores = np.array([score_from_camera_metrics({'is_bad': bool(bad), 'reason': posture_engine.REASONS[reason]})
+                       for bad, reason in zip(batch['is_bad'], batch['reason'])], dtype=np.uint8)
+    return {
+        'person': person,
+        'shoulder_alignment': batch['shoulder_alignment'].astype(np.float32),
+        'neck_angle': batch['neck_angle'].astype(np.float32),
+        'head_forward': batch['head_forward'].astype(np.float32),
+        'shoulder_forward': batch['shoulder_forward'].astype(np.float32),
+        'is_bad': batch['is_bad'],
+        'reason': batch['reason'],
+        'score': scores,
+    }
+
+
+def save(out_path, columns, stats, source_path):
+    np.savez_compressed(out_path, source=np.array(source_path), fps=np.float32(stats['source_fps']),
+                        width=np.int32(stats['width']), height=np.int32(stats['height']), **columns)
+
+
+def _worker_counts():
+    cores = os.cpu_count() or 1
+    counts = []
+    count = 1
+    while count < cores:
+        counts.append(count)
+        count *= 2
+    return counts + [cores]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score a recorded session across a process pool.")
+    parser.add_argument('recording', help="video file or directory of frames")
+    parser.add_argument('-o', '--output', help="columnar .npz output (default: <recording>.posture.npz)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="consecutive frames per task")
+    parser.add_argument('--stride', type=int, default=1, help="analyse every Nth frame")
+    parser.add_argument('--model-complexity', type=int, default=camera_module.POSE_MODEL_COMPLEXITY)
+    parser.add_argument('--scaling', action='store_true', help="report frames/second for 1..N workers")
+    args = parser.parse_args(argv)
+
+    if not camera_module.MP_AVAILABLE:
+        print("mediapipe is not installed; every frame will be recorded as 'no person'")
+
+    if args.scaling:
+        baseline = None
+        print(f"Scaling on {args.recording} ({os.cpu_count()} cores)")
+        for workers in _worker_counts():
+            _, stats = reanalyze(args.recording, workers, args.chunk_size, args.stride, args.model_complexity)
+            baseline = baseline or stats['fps']
+            speedup = stats['fps'] / baseline if baseline else 0.0
+            print(f"  {workers:>3} workers: {stats['frames']} frames in {stats['seconds']:7.2f} s   "
+                  f"{stats['fps']:8.1f} fps   speedup {speedup:4.1f}x   efficiency {speedup / workers:4.0%}")
+        return 0
+
+    columns, stats = reanalyze(args.recording, args.workers, args.chunk_size, args.stride, args.model_complexity)
+    output = args.output or os.path.normpath(args.recording) + '.posture.npz'
+    save(output, columns, stats, args.recording)
+    bad = float(columns['is_bad'].mean()) if len(columns['is_bad']) else 0.0
+    mean_score = float(columns['score'].mean()) if len(columns['score']) else 0.0
+    print(f"{stats['frames']} frames in {stats['seconds']} s ({stats['fps']} fps, {stats['workers']} workers, "
+          f"{stats['chunks']} chunks)")
+    print(f"  person in {int(columns['person'].sum())} frames, bad posture {bad:.0%}, mean score {mean_score:.1f}")
+    print(f"  wrote {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
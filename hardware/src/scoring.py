@@ -0,0 +1,38 @@
+"""
+Posture score for one analysed frame.
+
+Shared by the service (main.py), offline re-analysis and the benchmarks.
+Kept free of import-time side effects: importing main configures the
+service's logging, which tools and worker processes must not inherit.
+"""
+
+
+def score_from_camera_metrics(camera_metrics):
+    if not camera_metrics:
+        return 100
+
+    # If using Hailo/side-view posture detection (is_bad flag present)
+    if 'is_bad' in camera_metrics:
+        if camera_metrics['is_bad']:
+            # Bad posture detected → lower score based on reason
+            reason = camera_metrics.get('reason', 'Bad posture')
+            if 'slouch' in reason.lower():
+                return 60  # Slouching is moderate issue
+            elif 'head' in reason.lower():
+                return 55  # Head forward is more serious
+            else:
+                return 50  # Generic bad posture
+        else:
+            return 95  # Good posture detected
+    
+    # Fallback: MediaPipe-style metrics (shoulder_alignment + neck_angle)
+    score = 100.0
+    shoulder_alignment = camera_metrics.get('shoulder_alignment')
+    neck_angle = camera_metrics.get('neck_angle')
+
+    if shoulder_alignment is not None:
+        score -= min(abs(shoulder_alignment) * 250.0, 25.0)
+    if neck_angle is not None:
+        score -= min(abs(neck_angle) * 250.0, 40.0)
+
+    return int(max(0, min(100, round(score))))
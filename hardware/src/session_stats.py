@@ -0,0 +1,138 @@
+"""
+Streaming, time-weighted statistics for one monitoring session.
+
+The old session score was a plain mean over frames, so a session scored by
+the Hailo pipeline (every frame) and one scored by Picamera2 (every 2s)
+weighed the same posture differently. `SessionStats` weights each sample
+by how long it was in effect instead (sample-and-hold, with gaps capped at
+`max_gap` so a stalled camera does not stretch one reading over minutes).
+
+Every `add()` is O(1) and memory is constant for any session length: a
+101-bin time histogram of integer scores (0-100) for percentiles, one EWMA,
+per-reason seconds for a bounded set of reasons, and the bad-posture streaks.
+"""
+
+import math
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+EWMA_HALF_LIFE = 30.0
+# Longest interval one sample can be held for before the gap stops counting
+MAX_GAP = 10.0
+# Distinct postureReason values tracked by name; the rest share OTHER_REASON
+MAX_REASONS = 16
+OTHER_REASON = 'Other'
+GOOD_REASON = 'Good posture'
+
+
+def _reason_key(is_bad, reason):
+    if not is_bad:
+        return GOOD_REASON
+    return reason or 'Bad posture'
+
+
+class SessionStats:
+    """Constant-memory, time-weighted accumulator of frame scores."""
+
+    def __init__(self, ewma_half_life=EWMA_HALF_LIFE, max_gap=MAX_GAP, max_reasons=MAX_REASONS):
+        self.ewma_half_life = ewma_half_life
+        self.max_gap = max_gap
+        self.max_reasons = max_reasons
+
+        self.samples = 0
+        self.tracked_seconds = 0.0
+        self.bad_seconds = 0.0
+        self.longest_bad_streak = 0.0
+        self.ewma = None
+
+        self._weighted_total = 0.0
+        self._histogram = [0.0] * 101
+        self._reason_seconds = {}
+        self._bad_streak = 0.0
+
+        # The sample currently in effect (held until the next one arrives)
+        self._last_time = None
+        self._last_score = None
+        self._last_bad = False
+        self._last_reason = None
+
+    def add(self, score, is_bad=False, reason='', timestamp=None):
+        """Account for the previous sample's interval, then hold `score` from `timestamp`."""
+        score = max(0, min(100, int(round(score))))
+        if self._last_time is not None and timestamp is not None:
+            dt = min(max(0.0, timestamp - self._last_time), self.max_gap)
+            if dt > 0:
+                self._accumulate(dt)
+
+        self.samples += 1
+        self._last_time = timestamp
+        self._last_score = score
+        self._last_bad = bool(is_bad)
+        self._last_reason = _reason_key(is_bad, reason)
+        if not is_bad:
+            self._bad_streak = 0.0
+
+    def _accumulate(self, dt):
+        score = self._last_score
+        self.tracked_seconds += dt
+        self._weighted_total += score * dt
+        self._histogram[score] += dt
+
+        # Time-based EWMA so the smoothing does not depend on the sample rate
+        alpha = 1.0 - math.exp(-dt * math.log(2) / self.ewma_half_life)
+        self.ewma = score if self.ewma is None else self.ewma + alpha * (score - self.ewma)
+
+        reason = self._last_reason
+        if reason not in self._reason_seconds and len(self._reason_seconds) >= self.max_reasons:
+            reason = OTHER_REASON
+        self._reason_seconds[reason] = self._reason_seconds.get(reason, 0.0) + dt
+
+        if self._last_bad:
+            self.bad_seconds += dt
+            self._bad_streak += dt
+            self.longest_bad_streak = max(self.longest_bad_streak, self._bad_streak)
+
+    # ------------------------------------------
+    # Queries
+    # ------------------------------------------
+    def mean(self, default=100):
+        """Time-weighted mean score; the latest score until any time has been tracked."""
+        if self.tracked_seconds > 0:
+            return self._weighted_total / self.tracked_seconds
+        return default if self._last_score is None else self._last_score
+
+    def smoothed(self, default=100):
+        if self.ewma is not None:
+            return self.ewma
+        return default if self._last_score is None else self._last_score
+
+    def percentile(self, q):
+        """Score below which `q` percent of the tracked time was spent."""
+        if self.tracked_seconds <= 0:
+            return self._last_score
+        target = self.tracked_seconds * q / 100.0
+        running = 0.0
+        for score, seconds in enumerate(self._histogram):
+            running += seconds
+            if seconds and running >= target:
+                return score
+        return 100
+
+    def reason_seconds(self):
+        return dict(self._reason_seconds)
+
+    def to_dict(self):
+        """Session summary fields (Firestore-friendly: str keys, plain numbers)."""
+        return {
+            'samples': self.samples,
+            'trackedSeconds': round(self.tracked_seconds, 1),
+            'timeWeightedScore': round(self.mean(), 2),
+            'ewmaScore': round(self.smoothed(), 2),
+            'p10Score': self.percentile(10),
+            'p50Score': self.percentile(50),
+            'p90Score': self.percentile(90),
+            'badSeconds': round(self.bad_seconds, 1),
+            'longestBadStreakSeconds': round(self.longest_bad_streak, 1),
+            'reasonSeconds': {reason: round(seconds, 1) for reason, seconds in self._reason_seconds.items()},
+        }
@@ -0,0 +1,329 @@
+"""
+Durable on-device write-ahead spool for outbound records.
+
+Every outbound reading is appended to a SQLite file in WAL mode before it
+goes anywhere near the network. A background `SpoolReplayer` drains the
+spool in batches through per-kind sink functions, backing off exponentially
+while the cloud is unreachable, and deletes records only once the sink has
+accepted them. Each record carries an idempotency key that sinks use as the
+remote document id, so a batch replayed after a partial failure overwrites
+rather than duplicates.
+"""
+
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+SPOOL_DIR = os.environ.get("POSTURE_SPOOL_DIR", "/var/lib/posturehealthtracker")
+FALLBACK_SPOOL_DIR = "/tmp"
+SPOOL_FILENAME = "spool.db"
+MAX_RECORDS = 50000
+MAX_BYTES = 64 * 1024 * 1024
+BACKOFF_INITIAL = 1.0
+BACKOFF_MAX = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id      INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind    TEXT NOT NULL,
+    key     TEXT NOT NULL UNIQUE,
+    body    TEXT NOT NULL,
+    size    INTEGER NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_kind ON outbox (kind, id);
+"""
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {'__datetime__': value.isoformat()}
+    raise TypeError(f"Cannot spool {type(value).__name__}")
+
+
+def _decode(obj):
+    if len(obj) == 1 and '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    return obj
+
+
+def new_key():
+    """Idempotency key: time-ordered and unique across restarts."""
+    return f"{time.time_ns():x}-{uuid.uuid4().hex[:12]}"
+
+
+def default_spool_path():
+    """`SPOOL_DIR/spool.db`, falling back to /tmp (with a warning) when SPOOL_DIR is not writable."""
+    try:
+        os.makedirs(SPOOL_DIR, exist_ok=True)
+        if os.access(SPOOL_DIR, os.W_OK):
+            return os.path.join(SPOOL_DIR, SPOOL_FILENAME)
+    except OSError:
+        pass
+    path = os.path.join(FALLBACK_SPOOL_DIR, "posturehealthtracker_spool.db")
+    # The service unit runs with PrivateTmp=true: this file is gone after a restart or reboot
+    logger.warning(f"Spool directory {SPOOL_DIR} is not writable; spooling to {path}, "
+                   f"which is NOT durable across restarts. Create {SPOOL_DIR} for the service user.")
+    return path
+
+
+class SpoolRecord:
+    __slots__ = ('id', 'kind', 'key', 'payload', 'created')
+
+    def __init__(self, id, kind, key, payload, created):
+        self.id = id
+        self.kind = kind
+        self.key = key
+        self.payload = payload
+        self.created = created
+
+
+class Spool:
+    """Append-only, size-capped SQLite outbox shared by the capture loop and replayer."""
+
+    def __init__(self, path=None, max_records=MAX_RECORDS, max_bytes=MAX_BYTES):
+        self.path = path or default_spool_path()
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL survives process crashes; only a power cut can lose the last commits
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._count, self._bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM outbox").fetchone()
+
+        self._appended = 0
+        self._duplicates = 0
+        self._evicted = 0
+        self._acked = 0
+        if self._count:
+            logger.info(f"Spool {self.path} opened with {self._count} pending records")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def append(self, kind, payload, key=None):
+        """Durably store `payload`. Returns False if `key` was already spooled."""
+        key = key or new_key()
+        body = json.dumps(payload, default=_encode, separators=(',', ':'))
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO outbox (kind, key, body, size, created) VALUES (?, ?, ?, ?, ?)",
+                (kind, key, body, len(body), time.time()),
+            )
+            if cursor.rowcount == 0:
+                self._duplicates += 1
+                return False
+            self._appended += 1
+            self._count += 1
+            self._bytes += len(body)
+            if self._count > self.max_records or self._bytes > self.max_bytes:
+                self._evict_locked()
+        return True
+
+    def _evict_locked(self):
+        # Drop the oldest records until back under both caps (plus 5% headroom)
+        target_count = int(self.max_records * 0.95)
+        target_bytes = int(self.max_bytes * 0.95)
+        rows = self._conn.execute("SELECT id, size FROM outbox ORDER BY id").fetchall()
+        count, total = self._count, self._bytes
+        cutoff = None
+        for row_id, size in rows:
+            if count <= target_count and total <= target_bytes:
+                break
+            cutoff = row_id
+            count -= 1
+            total -= size
+        if cutoff is None:
+            return
+        self._conn.execute("DELETE FROM outbox WHERE id <= ?", (cutoff,))
+        logger.warning(f"Spool over capacity; evicted {self._count - count} oldest records")
+        self._evicted += self._count - count
+        self._count, self._bytes = count, total
+
+    def peek(self, kind, limit):
+        """Oldest `limit` records of `kind`, without removing them."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, key, body, created FROM outbox WHERE kind = ? ORDER BY id LIMIT ?",
+                (kind, limit),
+            ).fetchall()
+        return [SpoolRecord(row_id, row_kind, key, json.loads(body, object_hook=_decode), created)
+                for row_id, row_kind, key, body, created in rows]
+
+    def oldest(self, kind):
+        """Creation time of the oldest pending record of `kind`, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created FROM outbox WHERE kind = ? ORDER BY id LIMIT 1", (kind,)).fetchone()
+        return row[0] if row else None
+
+    def depth(self, kind=None):
+        with self._lock:
+            if kind is None:
+                return self._count
+            return self._conn.execute("SELECT COUNT(*) FROM outbox WHERE kind = ?", (kind,)).fetchone()[0]
+
+    def ack(self, records):
+        """Delete records the sink has accepted."""
+        ids = [record.id for record in records]
+        if not ids:
+            return
+        with self._lock:
+            placeholders = ','.join('?' * len(ids))
+            freed = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM outbox WHERE id IN ({placeholders})", ids).fetchone()
+            self._conn.execute(f"DELETE FROM outbox WHERE id IN ({placeholders})", ids)
+            self._count -= freed[0]
+            self._bytes -= freed[1]
+            self._acked += freed[0]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending': self._count,
+                'pending_bytes': self._bytes,
+                'appended': self._appended,
+                'duplicates': self._duplicates,
+                'evicted': self._evicted,
+                'acked': self._acked,
+            }
+
+
+class SpoolReplayer:
+    """Background thread that drains a Spool through per-kind sinks.
+
+    `sinks` maps kind -> callable(records) that raises on failure. A kind is
+    drained once `batch_size` records are pending, the oldest has waited
+    `max_delay` seconds, or `kick()` is called.
+    """
+
+    def __init__(self, spool, sinks, batch_size=20, max_delay=30.0,
+                 backoff_initial=BACKOFF_INITIAL, backoff_max=BACKOFF_MAX):
+        self.spool = spool
+        self.sinks = dict(sinks)
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+
+        self._wake = threading.Condition()
+        self._kicked = False
+        self._stop = threading.Event()
+        self._thread = None
+        self._backoff = 0.0
+        self._retry_at = 0.0
+
+        self._batches = 0
+        self._failures = 0
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='spool-replayer', daemon=True)
+        self._thread.start()
+
+    def stop(self, drain_timeout=5.0):
+        """Make a final drain attempt, then stop the thread."""
+        self.kick()
+        deadline = time.monotonic() + drain_timeout
+        while self.spool.depth() and time.monotonic() < deadline and self._backoff == 0.0:
+            time.sleep(0.05)
+        self._stop.set()
+        self.notify()
+        if self._thread:
+            self._thread.join(timeout=drain_timeout)
+
+    def notify(self):
+        """Tell the replayer new records may be due (cheap; call after append)."""
+        with self._wake:
+            self._wake.notify_all()
+
+    def kick(self):
+        """Drain everything now, e.g. when a session ends. Skips any backoff wait."""
+        with self._wake:
+            self._kicked = True
+            self._retry_at = 0.0
+            self._wake.notify_all()
+
+    def stats(self):
+        return {
+            'batches': self._batches,
+            'failures': self._failures,
+            'backoff_s': round(self._backoff, 1),
+        }
+
+    # ------------------------------------------
+    # Worker
+    # ------------------------------------------
+    def _due(self, kind, now):
+        depth = self.spool.depth(kind)
+        if depth >= self.batch_size:
+            return True
+        oldest = self.spool.oldest(kind)
+        return oldest is not None and now - oldest >= self.max_delay
+
+    def _drain_kind(self, kind, sink):
+        """Send batches of `kind` until empty. Returns False on sink failure."""
+        while not self._stop.is_set():
+            records = self.spool.peek(kind, self.batch_size)
+            if not records:
+                return True
+            try:
+                sink(records)
+            except Exception as error:
+                self._failures += 1
+                logger.warning(f"Spool replay of {len(records)} {kind} records failed: {error}")
+                return False
+            self.spool.ack(records)
+            self._batches += 1
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self._wake:
+                wait = 1.0
+                if self._retry_at:
+                    wait = max(0.0, min(wait, self._retry_at - time.monotonic()))
+                if not self._kicked:
+                    self._wake.wait(timeout=wait)
+                kicked = self._kicked
+                self._kicked = False
+
+            if self._stop.is_set():
+                break
+            if self._retry_at and time.monotonic() < self._retry_at and not kicked:
+                continue
+
+            now = time.time()
+            ok = True
+            for kind, sink in self.sinks.items():
+                if kicked or self._due(kind, now):
+                    ok = self._drain_kind(kind, sink) and ok
+
+            if ok:
+                if self._backoff:
+                    logger.info("Spool replay recovered; backlog drained")
+                self._backoff = 0.0
+                self._retry_at = 0.0
+            else:
+                self._backoff = min(self._backoff * 2 if self._backoff else self.backoff_initial, self.backoff_max)
+                delay = self._backoff * (0.5 + random.random() / 2)
+                self._retry_at = time.monotonic() + delay
+                logger.info(f"Spool replay backing off for {delay:.1f}s ({self.spool.depth()} pending)")
@@ -0,0 +1,199 @@
+"""
+Posture metrics channel between the Hailo pipeline and the hardware loop.
+
+Replaces the JSON status file. The pipeline sends one fixed-size record per
+posture sample over a Unix domain datagram socket. Datagrams are delivered
+whole or not at all, so the consumer never sees a torn write, and it never
+touches image bytes (frames go to the MJPEG path separately). Records carry
+a per-producer sequence number so gaps are counted.
+
+Linux caps a datagram socket's queue at `net.unix.max_dgram_qlen` (often
+just 10), so the receiver keeps a reader thread that moves records into an
+in-process buffer as they arrive; `drain()` then returns every sample since
+the last call, however rarely the hardware loop ticks.
+"""
+
+import errno
+import logging
+import math
+import os
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+SOCKET_PATH = os.environ.get("POSTURE_STATUS_SOCKET", "/tmp/posturehealthtracker_hailo.sock")
+RECEIVE_BUFFER_BYTES = 256 * 1024
+REASON_BYTES = 32
+# Samples held between drains (~2 minutes at 30 fps)
+MAX_PENDING = 4096
+
+_MAGIC = 0x50485431  # "PHT1"
+# magic, producer pid, seq, timestamp, is_bad, person_found, reason, shoulder_alignment, neck_angle
+_RECORD = struct.Struct(f'<IIQd??2x{REASON_BYTES}sff')
+RECORD_SIZE = _RECORD.size
+
+
+class StatusSample:
+    __slots__ = ('pid', 'seq', 'timestamp', 'is_bad', 'person_found', 'reason',
+                 'shoulder_alignment', 'neck_angle')
+
+    def __init__(self, pid, seq, timestamp, is_bad, person_found, reason,
+                 shoulder_alignment=None, neck_angle=None):
+        self.pid = pid
+        self.seq = seq
+        self.timestamp = timestamp
+        self.is_bad = is_bad
+        self.person_found = person_found
+        self.reason = reason
+        self.shoulder_alignment = shoulder_alignment
+        self.neck_angle = neck_angle
+
+    def camera_metrics(self):
+        """Same shape as the `cameraMetrics` dict the rest of the loop uses."""
+        metrics = {'is_bad': self.is_bad, 'reason': self.reason}
+        if self.shoulder_alignment is not None:
+            metrics['shoulder_alignment'] = self.shoulder_alignment
+        if self.neck_angle is not None:
+            metrics['neck_angle'] = self.neck_angle
+        return metrics
+
+
+def pack_sample(pid, seq, timestamp, is_bad, person_found, reason,
+                shoulder_alignment=None, neck_angle=None):
+    encoded = (reason or '').encode('utf-8')[:REASON_BYTES]
+    return _RECORD.pack(
+        _MAGIC, pid, seq, timestamp, bool(is_bad), bool(person_found), encoded,
+        math.nan if shoulder_alignment is None else shoulder_alignment,
+        math.nan if neck_angle is None else neck_angle,
+    )
+
+
+def unpack_sample(data):
+    if len(data) != RECORD_SIZE:
+        return None
+    magic, pid, seq, timestamp, is_bad, person_found, reason, shoulder, neck = _RECORD.unpack(data)
+    if magic != _MAGIC:
+        return None
+    return StatusSample(
+        pid, seq, timestamp, is_bad, person_found,
+        reason.rstrip(b'\0').decode('utf-8', 'replace'),
+        None if math.isnan(shoulder) else shoulder,
+        None if math.isnan(neck) else neck,
+    )
+
+
+class StatusPublisher:
+    """Producer side (Hailo pipeline). Never blocks and never raises."""
+
+    def __init__(self, path=SOCKET_PATH):
+        self.path = path
+        self.pid = os.getpid()
+        self.seq = 0
+        self.sent = 0
+        self.dropped = 0
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+
+    def publish(self, is_bad, reason, person_found=True, shoulder_alignment=None,
+                neck_angle=None, timestamp=None):
+        self.seq += 1
+        record = pack_sample(self.pid, self.seq, time.time() if timestamp is None else timestamp,
+                             is_bad, person_found, reason, shoulder_alignment, neck_angle)
+        try:
+            self._sock.sendto(record, self.path)
+            self.sent += 1
+            return True
+        except OSError as error:
+            # No consumer bound yet, or its buffer is full: drop this sample
+            self.dropped += 1
+            if error.errno not in (errno.ENOENT, errno.ECONNREFUSED, errno.EAGAIN, errno.ENOBUFS):
+                logger.debug(f"Status publish failed: {error}")
+            return False
+
+    def close(self):
+        self._sock.close()
+
+
+class StatusReceiver:
+    """Consumer side (hardware loop). Buffers samples on a reader thread; `drain()` never blocks."""
+
+    def __init__(self, path=SOCKET_PATH, max_pending=MAX_PENDING):
+        self.path = path
+        self.received = 0
+        self.lost = 0
+        self.invalid = 0
+        self.overflow = 0
+        # Sequence numbers restart with each pipeline process, so track the current producer
+        self._producer = None
+        self._last_seq = 0
+        self._pending = deque()
+        self._max_pending = max_pending
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        try:
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER_BYTES)
+        except OSError:
+            pass
+        self._sock.bind(path)
+        self._sock.settimeout(0.5)
+        self._thread = threading.Thread(target=self._read_loop, name='hailo-status', daemon=True)
+        self._thread.start()
+
+    def _read_loop(self):
+        while not self._closed.is_set():
+            try:
+                data = self._sock.recv(RECORD_SIZE + 1)
+            except socket.timeout:
+                continue
+            except OSError:
+                if self._closed.is_set():
+                    return
+                continue
+            sample = unpack_sample(data)
+            with self._lock:
+                if sample is None:
+                    self.invalid += 1
+                    continue
+                if sample.pid == self._producer and sample.seq > self._last_seq + 1:
+                    self.lost += sample.seq - self._last_seq - 1
+                self._producer = sample.pid
+                self._last_seq = sample.seq
+                self.received += 1
+                if len(self._pending) >= self._max_pending:
+                    self._pending.popleft()
+                    self.overflow += 1
+                self._pending.append(sample)
+
+    def drain(self):
+        """Return every sample received since the last call, oldest first."""
+        with self._lock:
+            samples = list(self._pending)
+            self._pending.clear()
+        return samples
+
+    def stats(self):
+        with self._lock:
+            return {'received': self.received, 'lost': self.lost,
+                    'invalid': self.invalid, 'overflow': self.overflow}
+
+    def close(self):
+        self._closed.set()
+        self._sock.close()
+        self._thread.join(timeout=1)
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
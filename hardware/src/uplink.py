@@ -0,0 +1,251 @@
+"""
+Background uplink to the Firebase RTDB REST API.
+
+The main loop hands payloads to `UplinkWorker.enqueue()`, which never blocks
+on the network. A dedicated thread owns a keep-alive `requests.Session` and
+drains a small latest-wins queue: a newer payload for the same path replaces
+(PUT) or is merged into (PATCH) the pending one, and when the queue is full
+the oldest entry is dropped.
+"""
+
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .control_plane import apply_event
+
+logger = logging.getLogger(__name__)
+
+# ==========================================
+# CONFIGURATION
+# ==========================================
+MAX_QUEUE = 8
+REQUEST_TIMEOUT = (5, 10)  # (connect, read) seconds
+STATS_LOG_INTERVAL = 60.0
+LATENCY_EWMA_ALPHA = 0.2
+
+
+def merge_patch(base, update):
+    """Merge two RTDB multi-path update dicts, later keys winning.
+
+    RTDB rejects an update where one key is an ancestor of another, so
+    overlapping keys are folded into the ancestor's value.
+    """
+    merged = dict(base)
+    for key, value in update.items():
+        norm = '/'.join(part for part in key.split('/') if part)
+        # Pending descendants of the new key are superseded by it
+        for existing in [k for k in merged if k.startswith(norm + '/')]:
+            del merged[existing]
+        ancestor = next((k for k in merged if norm.startswith(k + '/')), None)
+        if ancestor is None:
+            merged[norm] = copy.deepcopy(value)
+        else:
+            merged[ancestor] = apply_event(merged[ancestor], norm[len(ancestor):], value)
+    return merged
+
+
+def apply_patch(document, update):
+    """Apply a multi-path update dict to a full document, as RTDB would."""
+    for key, value in update.items():
+        document = apply_event(document, key, value)
+    return document
+
+
+class _Pending:
+    __slots__ = ('path', 'method', 'body', 'callbacks')
+
+    def __init__(self, path, method, body, callback):
+        self.path = path
+        self.method = method
+        self.body = body
+        self.callbacks = [callback] if callback else []
+
+
+class UplinkWorker:
+    """Single-threaded, connection-pooled RTDB writer fed by a bounded queue."""
+
+    def __init__(self, base_url, max_queue=MAX_QUEUE, timeout=REQUEST_TIMEOUT,
+                 stats_log_interval=STATS_LOG_INTERVAL):
+        self.base_url = base_url.rstrip('/')
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.stats_log_interval = stats_log_interval
+
+        self._queue = OrderedDict()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._busy = False
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+
+        self._enqueued = 0
+        self._sent = 0
+        self._failed = 0
+        self._dropped = 0
+        self._coalesced = 0
+        self._bytes_sent = 0
+        self._last_latency_ms = None
+        self._avg_latency_ms = None
+        self._max_latency_ms = 0.0
+        self._last_stats_log = time.monotonic()
+
+    # ------------------------------------------
+    # Lifecycle
+    # ------------------------------------------
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='uplink', daemon=True)
+        self._thread.start()
+
+    def stop(self, flush_timeout=5.0):
+        """Stop the worker, giving queued payloads up to `flush_timeout` to go out."""
+        self.flush(timeout=flush_timeout)
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=flush_timeout)
+        self._session.close()
+
+    def flush(self, timeout=None):
+        """Wait until the queue is empty and nothing is in flight."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue and not self._busy, timeout=timeout)
+
+    # ------------------------------------------
+    # Producer API
+    # ------------------------------------------
+    def enqueue(self, path, body, method='PUT', callback=None):
+        """Queue a write of `body` to `<base_url>/<path>.json`. Never blocks.
+
+        `callback(ok)` is called from the worker thread once the write (or the
+        newer write that absorbed it) completes. Returns False if an older,
+        unrelated payload had to be dropped to make room.
+        """
+        method = method.upper()
+        accepted = True
+        evicted = None
+        with self._cond:
+            self._enqueued += 1
+            pending = self._queue.get(path)
+            if pending is not None:
+                self._coalesced += 1
+                if method == 'PUT':
+                    pending.method = 'PUT'
+                    pending.body = copy.deepcopy(body)
+                elif pending.method == 'PUT':
+                    pending.body = apply_patch(pending.body, body)
+                else:
+                    pending.body = merge_patch(pending.body, body)
+                if callback:
+                    pending.callbacks.append(callback)
+                self._queue.move_to_end(path)
+            else:
+                if len(self._queue) >= self.max_queue:
+                    _, evicted = self._queue.popitem(last=False)
+                    self._dropped += 1
+                    accepted = False
+                self._queue[path] = _Pending(path, method, copy.deepcopy(body), callback)
+            self._cond.notify_all()
+
+        if evicted is not None:
+            logger.warning(f"Uplink queue full; dropped pending {evicted.method} to {evicted.path}")
+            self._run_callbacks(evicted, False)
+        return accepted
+
+    def stats(self):
+        with self._cond:
+            return {
+                'queue_depth': len(self._queue),
+                'in_flight': self._busy,
+                'enqueued': self._enqueued,
+                'sent': self._sent,
+                'failed': self._failed,
+                'dropped': self._dropped,
+                'coalesced': self._coalesced,
+                'bytes_sent': self._bytes_sent,
+                'last_latency_ms': self._last_latency_ms,
+                'avg_latency_ms': self._avg_latency_ms,
+                'max_latency_ms': self._max_latency_ms,
+            }
+
+    # ------------------------------------------
+    # Worker
+    # ------------------------------------------
+    def _run_callbacks(self, pending, ok):
+        for callback in pending.callbacks:
+            try:
+                callback(ok)
+            except Exception as error:
+                logger.debug(f"Uplink callback failed: {error}")
+
+    def _send(self, pending):
+        url = f"{self.base_url}/{pending.path}.json"
+        started = time.monotonic()
+        ok = False
+        size = 0
+        try:
+            response = self._session.request(pending.method, url, json=pending.body, timeout=self.timeout)
+            ok = response.ok
+            size = len(response.request.body or b'')
+            if not ok:
+                logger.warning(f"Uplink {pending.method} {pending.path} returned {response.status_code}")
+        except Exception as error:
+            logger.warning(f"Failed to push {pending.path}: {error}")
+        latency_ms = (time.monotonic() - started) * 1000.0
+
+        with self._cond:
+            if ok:
+                self._sent += 1
+                self._bytes_sent += size
+            else:
+                self._failed += 1
+            self._last_latency_ms = round(latency_ms, 1)
+            if self._avg_latency_ms is None:
+                self._avg_latency_ms = round(latency_ms, 1)
+            else:
+                self._avg_latency_ms = round(
+                    (1 - LATENCY_EWMA_ALPHA) * self._avg_latency_ms + LATENCY_EWMA_ALPHA * latency_ms, 1)
+            self._max_latency_ms = max(self._max_latency_ms, round(latency_ms, 1))
+
+        logger.debug(f"Uplink {pending.method} {pending.path}: ok={ok}, latency={latency_ms:.0f}ms")
+        self._run_callbacks(pending, ok)
+
+    def _maybe_log_stats(self):
+        now = time.monotonic()
+        if self.stats_log_interval and now - self._last_stats_log >= self.stats_log_interval:
+            self._last_stats_log = now
+            logger.info(f"Uplink stats: {self.stats()}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._stop.is_set(), timeout=1.0)
+                if not self._queue:
+                    if self._stop.is_set():
+                        return
+                    pending = None
+                else:
+                    _, pending = self._queue.popitem(last=False)
+                    self._busy = True
+
+            if pending is not None:
+                try:
+                    self._send(pending)
+                finally:
+                    with self._cond:
+                        self._busy = False
+                        self._cond.notify_all()
+            self._maybe_log_stats()
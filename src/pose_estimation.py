@@ -1,6 +1,11 @@
+# The hardware loop pauses/resumes this process with SIGUSR1/SIGUSR2. Their default action
+# kills the process, so ignore them until the GLib handlers below take over; the loop only
+# signals once the ready file (see signal_ready) says they are installed.
+import signal
+signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+signal.signal(signal.SIGUSR2, signal.SIG_IGN)
+
 from pathlib import Path
-import base64
-import json
 import gi
 gi.require_version('Gst', '1.0')
 from gi.repository import Gst, GLib
@@ -12,15 +17,53 @@ from hailo_apps.hailo_app_python.core.common.buffer_utils import get_caps_from_p
 from hailo_apps.hailo_app_python.core.gstreamer.gstreamer_app import app_callback_class
 from hailo_apps.hailo_app_python.apps.pose_estimation.pose_estimation_pipeline import GStreamerPoseEstimationApp
 
-STATUS_FILE = Path('/tmp/posturehealthtracker_hailo.json')
+# This script runs from the hailo-rpi5-examples checkout and imports the shared
+# modules from the PostureHealthTracker repo (the `hardware.src` package).
+# The repo root is POSTUREHEALTHTRACKER_ROOT (set by the hardware loop), or the
+# checkout this file lives in when basic_pipelines/pose_estimation.py is a symlink.
+def find_project_root():
+    here = Path(__file__)
+    candidates = [os.environ.get('POSTUREHEALTHTRACKER_ROOT'), here.resolve().parent.parent, here.absolute().parent.parent]
+    for candidate in candidates:
+        if candidate and (Path(candidate) / 'hardware' / 'src' / '__init__.py').is_file():
+            return Path(candidate)
+    sys.exit(
+        "pose_estimation: cannot find the PostureHealthTracker repo (no hardware/src package under "
+        f"{', '.join(dict.fromkeys(str(c) for c in candidates if c))}). Set POSTUREHEALTHTRACKER_ROOT to the repo root, "
+        "or symlink src/pose_estimation.py into basic_pipelines/ instead of copying it."
+    )
+
+PROJECT_ROOT = find_project_root()
+sys.path.insert(0, str(PROJECT_ROOT))
+from hardware.src.status_channel import StatusPublisher
+from hardware.src import cadence
+from hardware.src import metrics
+from hardware.src import posture_engine
+from hardware.src import preview_demand
+
+status_publisher = StatusPublisher()
+# The preview JPEG is only extracted, drawn and encoded while an MJPEG viewer or snapshot wants it
+preview_wanted = preview_demand.PreviewDemand()
 
-# ── Side view thresholds ────────────────────────
-HEAD_FORWARD_THRESHOLD     = 12 # pixels — how far ear is in front of shoulder
-SHOULDER_FORWARD_THRESHOLD = 18  # pixels — how far shoulder is in front of hip
+# Side-view thresholds live in posture_engine, shared with the Picamera2 path
 BAD_POSTURE_SECONDS        = 2
 
 bad_start = None
 alerting  = False
+# (person found, is_bad, reason) from the last analysed frame; drawn on preview frames in between
+last_posture = (False, False, 'No person detected')
+# Warm standby: the hardware loop keeps this process resident between sessions and
+# toggles it with SIGUSR1 (pause) / SIGUSR2 (resume). Pausing sets the GStreamer
+# pipeline to PAUSED, so no frames flow and the NPU runs no inference; the flag only
+# guards the callback against buffers already in flight.
+standby = os.environ.get('POSTURE_HAILO_START_PAUSED') == '1'
+# The running GStreamerPoseEstimationApp, whose pipeline the pause/resume handlers drive
+app = None
+# Frames between posture checks adapt to posture changes, CPU load and SoC temperature;
+# Hailo inference still runs on every frame; the Python side skips the posture work in between
+# (preview frames keep their own fixed rate)
+analysis_cadence = (cadence.CadenceController(cadence.HAILO_MIN_INTERVAL, cadence.HAILO_MAX_INTERVAL, name='hailo')
+                    if cadence.ENABLED else None)
 
 def quit_handler(signum=None, frame=None):
     print("\nClosing...")
@@ -28,39 +71,59 @@ def quit_handler(signum=None, frame=None):
 
 signal.signal(signal.SIGINT, quit_handler)
 
-def check_posture_side(kps, w, h):
-    def pt(n):
-        p = kps.get(n)
-        if p is None: return None
-        return (int(p[0]*w), int(p[1]*h))
+def set_pipeline_state(state):
+    if app is None or getattr(app, 'pipeline', None) is None:
+        return False
+    result = app.pipeline.set_state(state)
+    if result == Gst.StateChangeReturn.FAILURE:
+        print(f"Pipeline state change to {state.value_nick} failed", flush=True)
+        return False
+    return True
 
-    # Use whichever side is more visible (use both, prefer the visible one)
-    l_ear = pt('left_ear');     r_ear = pt('right_ear')
-    l_sh  = pt('left_shoulder'); r_sh = pt('right_shoulder')
-    l_hip = pt('left_hip');     r_hip = pt('right_hip')
+def pause_handler():
+    global standby
+    standby = True
+    set_pipeline_state(Gst.State.PAUSED)
+    print("Paused (warm standby)", flush=True)
+    return GLib.SOURCE_CONTINUE
 
-    ear      = l_ear or r_ear
-    shoulder = l_sh  or r_sh
-    hip      = l_hip or r_hip
+def resume_handler():
+    global standby, bad_start, alerting, last_posture
+    bad_start = None
+    alerting  = False
+    last_posture = (False, False, 'No person detected')
+    if analysis_cadence is not None:
+        analysis_cadence.reset()
+    set_pipeline_state(Gst.State.PLAYING)
+    standby = False
+    print("Resumed", flush=True)
+    return GLib.SOURCE_CONTINUE
 
-    bad = False
-    reason = ""
+def signal_ready():
+    # Our pid in the ready file tells the hardware loop it may send pause/resume signals
+    path = os.environ.get('POSTURE_HAILO_READY_FILE')
+    if not path:
+        return
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(str(os.getpid()))
+    os.replace(tmp_path, path)
 
-    # Check 1: Head forward (ear forward of shoulder horizontally)
-    if ear and shoulder:
-        head_forward = abs(ear[0] - shoulder[0])
-        if head_forward > HEAD_FORWARD_THRESHOLD:
-            bad = True
-            reason = "Head forward"
+def on_pipeline_started():
+    # Runs once the app's main loop is up, after run() has set the pipeline to PLAYING
+    if standby:
+        pause_handler()
+    signal_ready()
+    return GLib.SOURCE_REMOVE
 
-    # Check 2: Shoulder forward / slouching (shoulder forward of hip)
-    if shoulder and hip:
-        shoulder_forward = abs(shoulder[0] - hip[0])
-        if shoulder_forward > SHOULDER_FORWARD_THRESHOLD:
-            bad = True
-            reason = "Slouching"
+# Dispatched from the GLib main loop, which Python-level signal handlers would not interrupt
+GLib.unix_signal_add(GLib.PRIORITY_HIGH, signal.SIGUSR1, pause_handler)
+GLib.unix_signal_add(GLib.PRIORITY_HIGH, signal.SIGUSR2, resume_handler)
 
-    return bad, reason
+def check_posture_side(keypoints, w, h):
+    # Every keypoint the network returns counts (confidence 1.0); slouching wins when both rules fire
+    result = posture_engine.evaluate(keypoints, w, h, slouch_overrides=True)
+    return result['is_bad'], result['reason']
 
 def draw_ui(frame, is_bad, alert, reason, w, h):
     color = (0, 0, 220) if is_bad else (50, 205, 50)
@@ -85,7 +148,20 @@ def draw_ui(frame, is_bad, alert, reason, w, h):
         cv2.putText(frame, msg, ((w-mw)//2, h-50),
                     cv2.FONT_HERSHEY_DUPLEX, 1.4, (255,255,255), 2)
 
-def publish_status(frame, is_bad, reason, w, h):
+def publish_sample(is_bad, reason, person_found=True):
+    # One fixed-size record per posture sample; never blocks the pipeline
+    with metrics.timer('publish_status'):
+        status_publisher.publish(is_bad, reason, person_found=person_found)
+
+def observe_sample(is_bad, reason):
+    if analysis_cadence is not None:
+        analysis_cadence.observe({'is_bad': is_bad, 'reason': reason})
+
+def publish_frame(frame):
+    with metrics.timer('publish_frame'):
+        write_frame(frame)
+
+def write_frame(frame):
     preview = frame
     if preview is not None and len(preview.shape) == 3:
         height, width = preview.shape[:2]
@@ -102,72 +178,53 @@ def publish_status(frame, is_bad, reason, w, h):
     if not ok:
         return
 
-    payload = {
-        'score': 95 if not is_bad else 55,
-        'frameScore': 95 if not is_bad else 55,
-        'sessionScore': 95 if not is_bad else 55,
-        'cameraActive': True,
-        'cameraFrame': 'data:image/jpeg;base64,' + base64.b64encode(buffer).decode('ascii'),
-        'cameraMetrics': {
-            'is_bad': is_bad,
-            'reason': reason,
-        },
-        'postureStatus': 'Good' if not is_bad else 'Bad',
-        'postureReason': reason,
-        'updatedAt': int(time.time())
-    }
+    # Compact binary JPEG for the local MJPEG server
+    if preview_demand.write_frame(buffer.tobytes()):
+        metrics.inc('posture_previews_published_total', source='hailo')
 
-    try:
-        STATUS_FILE.write_text(json.dumps(payload))
-    except Exception:
-        pass
-
-    # Also write a compact binary JPEG for local serving (faster than base64 over RTDB)
-    try:
-        with open('/tmp/posturehealthtracker_frame.jpg', 'wb') as f:
-            f.write(buffer.tobytes())
-    except Exception:
-        pass
-
-def get_keypoints():
-    return {
-        'nose': 0,
-        'left_eye': 1, 'right_eye': 2,
-        'left_ear': 3, 'right_ear': 4,
-        'left_shoulder': 5, 'right_shoulder': 6,
-        'left_elbow': 7, 'right_elbow': 8,
-        'left_wrist': 9, 'right_wrist': 10,
-        'left_hip': 11, 'right_hip': 12,
-        'left_knee': 13, 'right_knee': 14,
-        'left_ankle': 15, 'right_ankle': 16,
-    }
+def keypoints_from_landmarks(points, bbox):
+    # (17, 3) COCO keypoints normalised to the frame; keypoints the network did not return get confidence 0
+    keypoints = np.zeros((posture_engine.NUM_KEYPOINTS, 3))
+    for idx, p in enumerate(points[:posture_engine.NUM_KEYPOINTS]):
+        keypoints[idx] = (p.x() * bbox.width() + bbox.xmin(), p.y() * bbox.height() + bbox.ymin(), 1.0)
+    return keypoints
 
 class user_app_callback_class(app_callback_class):
     def __init__(self):
         super().__init__()
         self.use_frame = True
         self.frame_count = 0
-        # Publish status every 2 frames to improve perceived responsiveness
+        # The preview JPEG every N frames while a viewer wants it, whatever the analysis cadence
         self.publish_interval = 2
 
 def app_callback(pad, info, user_data):
-    global bad_start, alerting
-    buffer = info.get_buffer()
-    if buffer is None:
+    if standby:
         return Gst.PadProbeReturn.OK
+    user_data.frame_count += 1
+    # The live view keeps its own fixed rate; the cadence only thins out posture analysis
+    preview = preview_wanted.active() and user_data.frame_count % user_data.publish_interval == 0
+    analyze = analysis_cadence is None or analysis_cadence.due()
+    if analyze:
+        metrics.inc('posture_frames_total', source='hailo')
+    else:
+        metrics.inc('posture_frames_skipped_total', source='hailo')
+        if not preview:
+            return Gst.PadProbeReturn.OK
+    with metrics.timer('app_callback'):
+        return process_frame(pad, info, user_data, analyze, preview)
 
-    user_data.increment()
-    format, width, height = get_caps_from_pad(pad)
-    frame = None
-    if user_data.use_frame and format and width and height:
-        frame = get_numpy_from_buffer(buffer, format, width, height)
-        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+def status_counters():
+    return [
+        ('posture_status_samples_sent_total', 'counter', 'Posture samples sent to the hardware loop', status_publisher.sent),
+        ('posture_status_samples_dropped_total', 'counter', 'Posture samples dropped (no reader or buffer full)', status_publisher.dropped),
+    ]
 
+def analyze_detections(buffer, width, height):
+    # Posture of the first person with landmarks; publishes one sample either way
+    global bad_start, alerting
     roi        = hailo.get_roi_from_buffer(buffer)
     detections = roi.get_objects_typed(hailo.HAILO_DETECTION)
-    kp_map     = get_keypoints()
     now        = time.time()
-    found      = False
 
     for detection in detections:
         if detection.get_label() != "person":
@@ -176,18 +233,11 @@ def app_callback(pad, info, user_data):
         landmarks = detection.get_objects_typed(hailo.HAILO_LANDMARKS)
         if not landmarks:
             continue
-        found  = True
-        points = landmarks[0].get_points()
-        kps    = {}
-        for name, idx in kp_map.items():
-            if idx < len(points):
-                p = points[idx]
-                kps[name] = (
-                    p.x() * bbox.width()  + bbox.xmin(),
-                    p.y() * bbox.height() + bbox.ymin()
-                )
-
-        is_bad, reason = check_posture_side(kps, width, height)
+        keypoints = keypoints_from_landmarks(landmarks[0].get_points(), bbox)
+
+        is_bad, reason = check_posture_side(keypoints, width, height)
+        publish_sample(is_bad, reason)
+        observe_sample(is_bad, reason)
         if is_bad:
             if bad_start is None:
                 bad_start = now
@@ -195,23 +245,38 @@ def app_callback(pad, info, user_data):
         else:
             bad_start = None
             alerting  = False
+        return True, is_bad, reason
 
-        if frame is not None:
-            draw_ui(frame, is_bad, alerting, reason, width, height)
-            # Only publish status every N frames to reduce I/O and lag
-            user_data.frame_count += 1
-            if user_data.frame_count % user_data.publish_interval == 0:
-                publish_status(frame, is_bad, reason, width, height)
-        break
-
-    if not found and frame is not None:
-        bad_start = None
-        alerting  = False
-        cv2.putText(frame, "No person detected", (20, 50),
-                    cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0,165,255), 2)
-        publish_status(frame, False, 'No person detected', width, height)
+    publish_sample(False, 'No person detected', person_found=False)
+    observe_sample(False, 'No person detected')
+    bad_start = None
+    alerting  = False
+    return False, False, 'No person detected'
+
+def process_frame(pad, info, user_data, analyze=True, preview=True):
+    global last_posture
+    buffer = info.get_buffer()
+    if buffer is None:
+        return Gst.PadProbeReturn.OK
+
+    user_data.increment()
+    format, width, height = get_caps_from_pad(pad)
+    frame = None
+    if preview and user_data.use_frame and format and width and height:
+        frame = get_numpy_from_buffer(buffer, format, width, height)
+        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+
+    if analyze:
+        last_posture = analyze_detections(buffer, width, height)
 
     if frame is not None:
+        found, is_bad, reason = last_posture
+        if found:
+            draw_ui(frame, is_bad, alerting, reason, width, height)
+        else:
+            cv2.putText(frame, "No person detected", (20, 50),
+                        cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0,165,255), 2)
+        publish_frame(frame)
         user_data.set_frame(frame)
 
     return Gst.PadProbeReturn.OK
@@ -221,7 +286,15 @@ if __name__ == "__main__":
     env_file     = project_root / ".env"
     os.environ["HAILO_ENV_FILE"] = str(env_file)
     user_data = user_app_callback_class()
+    metrics.describe('posture_frames_total', 'Frames processed, by capture path')
+    metrics.describe('posture_frames_skipped_total', 'Frames left unprocessed by the adaptive cadence')
+    metrics.add_collector(status_counters)
+    if analysis_cadence is not None:
+        metrics.add_collector(analysis_cadence.collector)
+    metrics.Exporter('hailo').start()
     app = GStreamerPoseEstimationApp(app_callback, user_data)
+    # Started for warm standby: pause as soon as the pipeline is built
+    GLib.idle_add(on_pipeline_started)
     try:
         app.run()
     except KeyboardInterrupt:
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Adaptive cadence tests.
+Tests: stable posture backs off to the max interval, a change or turning bad
+drops to the min interval and holds it, load/temperature pressure, thermal
+zone parsing, CameraModule integration
+"""
+
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hardware.src import camera_module
+from hardware.src.cadence import CadenceController, SystemPressure, read_temperature
+
+GOOD = {'shoulder_alignment': 0.01, 'neck_angle': -0.2, 'is_bad': False, 'reason': ''}
+SLOUCH = {'shoulder_alignment': 0.01, 'neck_angle': -0.2, 'is_bad': True, 'reason': 'Slouching'}
+
+
+def _controller(pressure=0.0, **kwargs):
+    return CadenceController(min_interval=0.5, max_interval=6.0, pressure=lambda now: pressure, **kwargs)
+
+
+def _run(controller, posture, start, seconds):
+    """Analyse `posture` whenever the controller is due; returns (analyses, end time)."""
+    now, count = start, 0
+    while now < start + seconds:
+        controller.observe(posture, now)
+        count += 1
+        now += controller.interval(now)
+    return count, now
+
+
+def test_stable_posture_backs_off_to_max():
+    cadence = _controller()
+    assert cadence.interval(0.0) == 0.5
+    count, now = _run(cadence, GOOD, 0.0, 120.0)
+    assert cadence.interval(now) == 6.0
+    # The old fixed 2s interval would have analysed 60 frames
+    assert count < 40
+
+
+def test_turning_bad_drops_to_min_and_holds():
+    cadence = _controller(bad_hold=5.0, change_hold=2.0)
+    _, now = _run(cadence, GOOD, 0.0, 60.0)
+    assert cadence.interval(now) == 6.0
+
+    assert cadence.observe(SLOUCH, now) == 0.5
+    assert cadence.interval(now + 4.9) == 0.5
+    # Still slouching after the hold: back off again
+    cadence.observe(SLOUCH, now + 5.0)
+    assert cadence.interval(now + 5.0) > 0.5
+
+    # A metric jump without a verdict change also counts, with the shorter hold
+    moved = dict(SLOUCH, neck_angle=-0.1)
+    cadence.observe(moved, now + 6.0)
+    assert cadence.interval(now + 7.9) == 0.5
+    assert cadence.changes == 2
+
+
+def test_pressure_pushes_towards_max():
+    assert _controller(pressure=1.0).interval(0.0) == 6.0
+    assert _controller(pressure=0.5).interval(0.0) == 3.25
+
+    loads = iter([0.5, 1.2, 0.5])
+    pressure = SystemPressure(sample_interval=5.0, read_load=lambda: next(loads), read_temperature=lambda: 50.0)
+    assert pressure(0.0) == 0.0
+    assert pressure(4.0) == 0.0  # cached between samples
+    assert pressure(5.0) == 1.0
+    assert SystemPressure(read_load=lambda: None, read_temperature=lambda: 72.5)(0.0) == 0.5
+
+
+def test_read_temperature_takes_hottest_zone():
+    with tempfile.TemporaryDirectory() as directory:
+        for zone, value in (('thermal_zone0', '48312\n'), ('thermal_zone1', '61000\n'), ('thermal_zone2', 'bogus')):
+            os.makedirs(os.path.join(directory, zone))
+            with open(os.path.join(directory, zone, 'temp'), 'w') as f:
+                f.write(value)
+        assert read_temperature(os.path.join(directory, 'thermal_zone*', 'temp')) == 61.0
+        assert read_temperature(os.path.join(directory, 'missing*', 'temp')) is None
+
+
+def test_camera_module_uses_cadence():
+    cam = camera_module.CameraModule(analysis_interval=2.0)
+    assert cam.next_interval(0.0) == 2.0
+
+    cadence = _controller()
+    cam = camera_module.CameraModule(cadence=cadence)
+    for step in range(20):
+        cam.observe_result(GOOD, float(step))
+    assert cam.next_interval(20.0) > 2.0
+    assert cam.stats()['cadence']['analyses'] == 20
+
+    cam.stop()
+    assert cam.next_interval(20.0) == 0.5
+
+
+if __name__ == "__main__":
+    test_stable_posture_backs_off_to_max()
+    test_turning_bad_drops_to_min_and_holds()
+    test_pressure_pushes_towards_max()
+    test_read_temperature_takes_hottest_zone()
+    test_camera_module_uses_cadence()
+    print("✓ cadence tests passed")
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+CameraModule pose estimator lifecycle tests.
+Tests: one streaming-mode Pose per camera session, closed on stop,
+dual-stream capture path, threaded producer with a seqlock double buffer,
+landmark-guided ROI crop, lazy preview encoding driven by viewer demand
+"""
+
+import sys
+import os
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hardware.src import camera_module
+from hardware.src import frame_ring
+from hardware.src import preview_demand
+
+
+def test_pose_is_persistent_and_closed_on_stop():
+    if not camera_module.MP_AVAILABLE:
+        print("  mediapipe not installed; skipping")
+        return
+    import numpy as np
+
+    cam = camera_module.CameraModule()
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    assert cam.analyze_posture(frame) == camera_module.NO_POSE
+    pose = cam.pose
+    assert pose is not None
+    cam.analyze_posture(frame)
+    assert cam.pose is pose
+
+    cam.stop()
+    assert cam.pose is None
+    # The next camera session gets a fresh estimator
+    cam.analyze_posture(frame)
+    assert cam.pose is not None and cam.pose is not pose
+    cam.close_pose()
+
+
+class _DualStreamCamera:
+    """Stands in for a configured Picamera2: main RGB888 + lores YUV420 with row padding."""
+
+    def __init__(self, preview_size, inference_size):
+        import cv2
+        import numpy as np
+        width, height = inference_size
+        self.main = np.full((preview_size[1], preview_size[0], 3), 80, dtype=np.uint8)
+        # A coloured scene, laid out as libcamera does with a 64-byte row padding
+        self.scene = np.zeros((height, width, 3), dtype=np.uint8)
+        self.scene[:, :width // 2] = (40, 60, 200)
+        self.scene[:, width // 2:] = (180, 120, 30)
+        planes = cv2.cvtColor(self.scene, cv2.COLOR_BGR2YUV_I420).reshape(-1)
+        stride = width + 64
+        self.lores = np.zeros((height * 3 // 2, stride), dtype=np.uint8)
+        self.lores[:height, :width] = planes[:width * height].reshape(height, width)
+        flat = self.lores.reshape(-1)
+        for plane in range(2):
+            source = planes[width * height * (4 + plane) // 4:width * height * (5 + plane) // 4]
+            start = height * stride + plane * (height // 2) * (stride // 2)
+            padded = flat[start:start + (height // 2) * (stride // 2)].reshape(height // 2, stride // 2)
+            padded[:, :width // 2] = source.reshape(height // 2, width // 2)
+        self.requests = 0
+
+    def capture_arrays(self, names):
+        assert names == ['main', 'lores']
+        self.requests += 1
+        time.sleep(0.005)  # the camera paces requests at its frame rate
+        return [self.main.copy(), self.lores.copy()], {}
+
+    def stop(self):
+        pass
+
+
+def test_dual_stream_capture_touches_only_small_frames():
+    try:
+        import cv2
+    except ImportError:
+        print("  opencv not installed; skipping")
+        return
+    cam = camera_module.CameraModule(mode='dual', preview_size=(384, 288), inference_size=(320, 240))
+    cam.picam2 = _DualStreamCamera(cam.preview_size, cam.inference_size)
+    cam.available = True
+    cam.reference_size = (4608, 2592)
+
+    preview, inference = cam.capture_frames()
+    assert preview.shape == (288, 384, 3)
+    # Packed I420 without the padding; the pose model still gets the scene in colour
+    assert inference.shape == (360, 320)
+    rgb = cam.inference_rgb(inference)
+    assert rgb.shape == (240, 320, 3)
+    expected = cv2.cvtColor(cam.picam2.scene, cv2.COLOR_BGR2RGB).astype(int)
+    assert abs(rgb.astype(int) - expected).max() <= 4
+    assert (cam.inference_luma(inference) == inference[:240]).all()
+
+    data_url, _ = cam.capture_preview_and_metrics(["Posture Tracking Live"])
+    assert data_url.startswith("data:image/jpeg;base64,")
+    assert cam.picam2.requests == 2
+    stats = cam.stats()
+    assert stats['frames'] == 1
+    assert stats['pixels_per_frame'] == 384 * 288 + 320 * 240
+    assert {'capture_ms', 'convert_ms', 'resize_ms'} <= set(stats)
+    cam.close_pose()
+
+
+def test_frame_buffer_readers_never_see_torn_frames():
+    import numpy as np
+
+    buffer = camera_module.FrameBuffer()
+    assert buffer.latest() is None
+    stop = threading.Event()
+
+    def writer():
+        frame = np.zeros((120, 160, 3), dtype=np.uint8)
+        n = 0
+        while not stop.is_set():
+            n += 1
+            frame[:] = n % 256
+            buffer.publish(float(n), frame)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        reads = 0
+        deadline = time.monotonic() + 1.0
+        while time.monotonic() < deadline:
+            latest = buffer.latest()
+            if latest is None:
+                continue
+            number, timestamp, (array,) = latest
+            # Every pixel must belong to the frame the sequence number says it is
+            assert timestamp == float(number)
+            assert array.min() == array.max() == number % 256
+            reads += 1
+        assert reads > 100
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_threaded_mode_serves_latest_result_without_blocking():
+    try:
+        import cv2  # noqa: F401
+    except ImportError:
+        print("  opencv not installed; skipping")
+        return
+    cam = camera_module.CameraModule(mode='dual', preview_size=(384, 288), inference_size=(320, 240),
+                                     threaded=True, analysis_interval=0.05)
+    cam.picam2 = _DualStreamCamera(cam.preview_size, cam.inference_size)
+    cam.available = True
+    cam.reference_size = (4608, 2592)
+    cam.start_producer()
+    try:
+        deadline = time.monotonic() + 5
+        while cam.latest_result() is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        first = cam.latest_result()
+        assert first is not None and first.preview_data_url.startswith("data:image/jpeg;base64,")
+
+        started = time.perf_counter()
+        data_url, _ = cam.capture_preview_and_metrics(["Posture Tracking Live"])
+        assert time.perf_counter() - started < 0.005
+        assert data_url.startswith("data:image/jpeg;base64,")
+
+        number, _, (preview, inference) = cam.latest_frame()
+        assert number >= first.seq
+        assert preview.shape == (288, 384, 3) and inference.shape == (360, 320)
+    finally:
+        cam.stop()
+    assert cam._producer is None and not cam.available
+    requests = cam.picam2.requests
+    time.sleep(0.05)
+    assert cam.picam2.requests == requests
+
+
+class _FakePose:
+    """Finds a 'person' wherever the frame has bright pixels; records each input shape."""
+
+    def __init__(self):
+        self.shapes = []
+
+    def process(self, rgb):
+        import numpy as np
+        from types import SimpleNamespace
+        self.shapes.append(rgb.shape[:2])
+        ys, xs = np.nonzero(rgb[:, :, 0] > 128)
+        if not len(xs):
+            return SimpleNamespace(pose_landmarks=None)
+        height, width = rgb.shape[:2]
+        x0, x1 = xs.min() / width, (xs.max() + 1) / width
+        y0, y1 = ys.min() / height, (ys.max() + 1) / height
+        landmarks = [camera_module.Landmark(x0, y0, 0.1) for _ in range(33)]
+        for index, (x, y) in zip(camera_module.ROI_LANDMARKS,
+                                 [((x0 + x1) / 2, y0), (x0, y0), (x1, y0), (x0, (y0 + y1) / 2),
+                                  (x1, (y0 + y1) / 2), (x0, y1), (x1, y1)]):
+            landmarks[index] = camera_module.Landmark(x, y, 0.9)
+        return SimpleNamespace(pose_landmarks=SimpleNamespace(landmark=landmarks))
+
+    def close(self):
+        pass
+
+
+def test_roi_crop_maps_landmarks_back_exactly():
+    import numpy as np
+
+    tracker = camera_module.RoiTracker()
+    tracker.box = (0.1013, 0.2, 0.6, 0.7777)
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    crop, box = tracker.crop(frame)
+    assert crop.flags['C_CONTIGUOUS']
+    # Box snapped to the pixel grid the crop was actually cut on
+    assert round(box[0] * 320) == 32 and crop.shape[:2] == (round((box[3] - box[1]) * 240), round((box[2] - box[0]) * 320))
+
+    corner = tracker.to_frame([camera_module.Landmark(1.0, 1.0, 0.9)], box)[0]
+    assert abs(corner.x - box[2]) < 1e-9 and abs(corner.y - box[3]) < 1e-9
+
+    full, none_box = camera_module.RoiTracker().crop(frame)
+    assert full is frame and none_box is None
+
+
+def test_roi_tracks_subject_and_falls_back_to_full_frame():
+    import numpy as np
+
+    cam = camera_module.CameraModule(roi=True)
+    cam.pose = _FakePose()
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    frame[80:160, 120:200] = 255
+
+    first = cam.detect_landmarks(frame)
+    assert cam.pose.shapes[-1] == (240, 320) and cam.roi.box is not None
+    box = cam.roi.box
+
+    second = cam.detect_landmarks(frame)
+    assert cam.pose.shapes[-1][0] < 240 and cam.pose.shapes[-1][1] < 320
+    # Full-frame coordinates come out the same whether or not the pass was cropped
+    for a, b in zip(first, second):
+        assert abs(a.x - b.x) < 1e-6 and abs(a.y - b.y) < 1e-6
+    # A small shift inside the crop keeps the box (no churn)
+    shifted = np.zeros_like(frame)
+    shifted[82:162, 122:202] = 255
+    cam.detect_landmarks(shifted)
+    assert cam.roi.box == box
+
+    # Subject jumps outside the crop: the same frame is re-run on the full frame
+    moved = np.zeros_like(frame)
+    moved[0:40, 0:40] = 255
+    calls = len(cam.pose.shapes)
+    landmarks = cam.detect_landmarks(moved)
+    assert landmarks is not None and cam.pose.shapes[calls:][-1] == (240, 320)
+    assert len(cam.pose.shapes) == calls + 2 and cam.roi.lost == 1
+
+    # Nobody in view: no landmarks and no crop for the next pass
+    assert cam.detect_landmarks(np.zeros_like(frame)) is None and cam.roi.box is None
+    assert cam.stats()['roi']['cropped'] >= 2
+    cam.stop()
+    assert cam.roi.box is None
+
+
+class _CountingCv2:
+    """Counts JPEG encodes while delegating to the real cv2."""
+
+    def __init__(self, cv2):
+        self._cv2 = cv2
+        self.encodes = 0
+
+    def __getattr__(self, name):
+        return getattr(self._cv2, name)
+
+    def imencode(self, *args):
+        self.encodes += 1
+        return self._cv2.imencode(*args)
+
+
+def test_preview_is_encoded_once_and_only_on_demand():
+    try:
+        import cv2
+    except ImportError:
+        print("  opencv not installed; skipping")
+        return
+    import numpy as np
+
+    directory = tempfile.mkdtemp()
+    original = preview_demand.FRAME_FILE, preview_demand.DEMAND_FILE, frame_ring.RING_PATH
+    preview_demand.FRAME_FILE = os.path.join(directory, 'frame.jpg')
+    preview_demand.DEMAND_FILE = os.path.join(directory, 'demand')
+    # File transport, so the published frame can be read back directly
+    frame_ring.RING_PATH = ''
+    counting = _CountingCv2(cv2)
+    sys.modules['cv2'] = counting
+    try:
+        cam = camera_module.CameraModule(mode='dual', preview_size=(384, 288), inference_size=(320, 240))
+        cam.picam2 = _DualStreamCamera(cam.preview_size, cam.inference_size)
+        cam.available = True
+        cam.reference_size = (4608, 2592)
+
+        # Analysis only, nobody watching: no resize, no JPEG, no base64, no frame file
+        preview, _ = cam.capture_and_analyze(["Posture Tracking Live"])
+        assert counting.encodes == 0 and 'encode_ms' not in cam.stats()
+        assert not os.path.exists(preview_demand.FRAME_FILE)
+
+        # Every consumer of one frame shares a single encode
+        jpeg = preview.jpeg()
+        assert jpeg[:2] == b'\xff\xd8'
+        data_url = preview.data_url()
+        assert preview.data_url() is data_url and preview.jpeg() is jpeg
+        assert counting.encodes == 1
+
+        # A viewer marks demand: the analysed frame is encoded once and written for the MJPEG server
+        preview_demand.request_preview()
+        cam.demand = preview_demand.PreviewDemand()
+        preview, _ = cam.capture_and_analyze()
+        assert counting.encodes == 2 and cam.previews_published == 1
+        with open(preview_demand.FRAME_FILE, 'rb') as f:
+            assert f.read() == preview.jpeg()
+        assert counting.encodes == 2
+
+        # Demand expires once the viewer stops refreshing it
+        stale = time.time() - preview_demand.DEMAND_TTL - 1
+        os.utime(preview_demand.DEMAND_FILE, (stale, stale))
+        assert not preview_demand.PreviewDemand().active()
+        frame = np.zeros((288, 384, 3), dtype=np.uint8)
+        camera_module.Preview(frame, ["overlay"]).jpeg()
+        assert frame.max() == 0  # the caller's frame is never drawn on
+        cam.close_pose()
+    finally:
+        sys.modules['cv2'] = cv2
+        preview_demand.FRAME_FILE, preview_demand.DEMAND_FILE, frame_ring.RING_PATH = original
+
+
+if __name__ == "__main__":
+    test_pose_is_persistent_and_closed_on_stop()
+    test_dual_stream_capture_touches_only_small_frames()
+    test_frame_buffer_readers_never_see_torn_frames()
+    test_threaded_mode_serves_latest_result_without_blocking()
+    test_roi_crop_maps_landmarks_back_exactly()
+    test_roi_tracks_subject_and_falls_back_to_full_frame()
+    test_preview_is_encoded_once_and_only_on_demand()
+    print("✓ camera module tests passed")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Control-plane subscriber tests against the local RTDB stand-in (fake_rtdb.py).
+Tests: event application, initial snapshot, wake-up latency, reconnect,
+subscriber copy matching the server through put/patch/delete sequences
+"""
+
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_rtdb import FakeRTDB
+from hardware.src.control_plane import ControlPlaneSubscriber, apply_event, iter_sse_events
+
+
+def test_apply_event():
+    state = {'camera_command': 'OFF'}
+    state = apply_event(state, '/', {'camera_command': 'ON', 'activeSessionId': 'a'}, merge=True)
+    assert state == {'camera_command': 'ON', 'activeSessionId': 'a'}
+
+    state = apply_event(state, '/activeSessionId', 'b')
+    assert state['activeSessionId'] == 'b'
+
+    state = apply_event(state, '/activeSessionId', None)
+    assert 'activeSessionId' not in state
+
+    state = apply_event(state, '/', None)
+    assert state == {}
+
+
+def test_iter_sse_events():
+    lines = ['event: put', 'data: {"path": "/", "data": 1}', '', ': comment', 'event: keep-alive', 'data: null', '']
+    assert list(iter_sse_events(lines)) == [('put', '{"path": "/", "data": 1}'), ('keep-alive', 'null')]
+
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_subscriber_wakes_on_command_change():
+    server = FakeRTDB({'system_state': {'camera_command': 'OFF'}}).start()
+    subscriber = ControlPlaneSubscriber(server.url)
+    subscriber.start()
+    try:
+        assert _wait_until(lambda: subscriber.snapshot().get('camera_command') == 'OFF')
+
+        version = subscriber.version
+        started = time.monotonic()
+        server.write('/system_state', {'camera_command': 'ON', 'activeSessionId': 's1'}, merge=True)
+        assert subscriber.wait_for_change(timeout=5, since=version)
+        elapsed = time.monotonic() - started
+
+        print(f"  wake-up latency: {elapsed * 1000:.1f} ms")
+        assert elapsed < 1.0
+        assert subscriber.snapshot() == {'camera_command': 'ON', 'activeSessionId': 's1'}
+
+        # Changes to unwatched keys update the copy but do not wake the loop
+        version = subscriber.version
+        server.write('/system_state/note', 'hello')
+        assert _wait_until(lambda: subscriber.snapshot().get('note') == 'hello')
+        assert subscriber.version == version
+    finally:
+        subscriber.stop()
+        server.stop()
+
+
+def test_subscriber_reconnects_after_drop():
+    server = FakeRTDB({'system_state': {'camera_command': 'OFF'}}).start()
+    subscriber = ControlPlaneSubscriber(server.url, backoff_initial=0.05, backoff_max=0.2)
+    subscriber.start()
+    try:
+        assert _wait_until(lambda: subscriber.connected)
+        server.drop_streams()
+        assert _wait_until(lambda: subscriber.stats()['reconnects'] >= 1)
+
+        server.write('/system_state/camera_command', 'ON')
+        assert _wait_until(lambda: subscriber.snapshot().get('camera_command') == 'ON')
+    finally:
+        subscriber.stop()
+        server.stop()
+
+
+def test_subscriber_copy_matches_server():
+    server = FakeRTDB({'system_state': {'camera_command': 'OFF'}}).start()
+    subscriber = ControlPlaneSubscriber(server.url)
+    subscriber.start()
+    writes = [
+        ('/system_state', {'camera_command': 'ON', 'activeSessionId': 's1', 'settings/fps': 5}, True),
+        ('/system_state', {'activeSessionId': None}, True),
+        ('/system_state/settings', {'fps': 10, 'roi': True}, False),
+        ('/system_state/settings/roi', None, False),
+        ('/', {'system_state/camera_command': 'OFF'}, True),
+    ]
+    try:
+        assert _wait_until(lambda: subscriber.connected)
+        for path, value, merge in writes:
+            server.write(path, value, merge=merge)
+            expected = server.get('/system_state')
+            assert _wait_until(lambda: subscriber.snapshot() == expected), (path, subscriber.snapshot(), expected)
+        assert server.get('/system_state') == {'camera_command': 'OFF', 'settings': {'fps': 10}}
+    finally:
+        subscriber.stop()
+        server.stop()
+
+
+if __name__ == "__main__":
+    test_apply_event()
+    test_iter_sse_events()
+    test_subscriber_wakes_on_command_change()
+    test_subscriber_reconnects_after_drop()
+    test_subscriber_copy_matches_server()
+    print("✓ control plane tests passed")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Frame ring tests.
+Tests: write/read round trip and wrap-around, torn slots rejected, ring
+growth for oversized frames with readers remapping, frame file fallback,
+write_frame transport selection
+"""
+
+import sys
+import os
+import struct
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hardware.src import frame_ring
+from hardware.src import preview_demand
+
+
+def _jpeg(tag, size=0):
+    return b'\xff\xd8' + tag.encode() + b'\x00' * size + b'\xff\xd9'
+
+
+def test_round_trip_and_wrap_around():
+    path = os.path.join(tempfile.mkdtemp(), 'frames.ring')
+    writer = frame_ring.FrameRingWriter(path, slots=3, slot_size=1024)
+    reader = frame_ring.FrameRingReader(path)
+    assert reader.sequence() is None and reader.read() is None
+
+    for i in range(7):
+        assert writer.write(_jpeg(f'frame {i}'), timestamp=100.0 + i)
+        signature, timestamp, frame = reader.read()
+        assert signature[1] == i + 1 and timestamp == 100.0 + i and frame == _jpeg(f'frame {i}')
+    assert reader.torn == 0
+    writer.close()
+    reader.close()
+
+
+def test_torn_slot_is_rejected():
+    path = os.path.join(tempfile.mkdtemp(), 'frames.ring')
+    writer = frame_ring.FrameRingWriter(path, slots=2, slot_size=1024)
+    writer.write(_jpeg('first'))
+    writer.write(_jpeg('second'))
+    reader = frame_ring.FrameRingReader(path)
+
+    # Writer caught mid-frame: odd seqlock word on the newest slot
+    offset = frame_ring._slot_offset(2 % 2, 1024)
+    struct.pack_into('<Q', writer._map, offset, 5)
+    assert reader.read() is None and reader.torn == 2
+    struct.pack_into('<Q', writer._map, offset, 4)
+    assert reader.read()[2] == _jpeg('second')
+
+    # Bytes that are not a whole JPEG are never handed out
+    writer._map[offset + frame_ring._SLOT_HEADER_SIZE] = 0
+    assert reader.read() is None
+    writer.close()
+    reader.close()
+
+
+def test_oversized_frame_grows_ring():
+    original = frame_ring.REOPEN_CHECK
+    frame_ring.REOPEN_CHECK = 0
+    path = os.path.join(tempfile.mkdtemp(), 'frames.ring')
+    try:
+        writer = frame_ring.FrameRingWriter(path, slots=2, slot_size=64)
+        reader = frame_ring.FrameRingReader(path)
+        writer.write(_jpeg('small'))
+        small = reader.read()
+        big = _jpeg('big', 5000)
+        assert writer.write(big) and writer.slot_size == 8192
+        signature, _, frame = reader.read()
+        assert frame == big and signature[0] != small[0][0] and reader.slot_size == 8192
+        writer.close()
+        reader.close()
+    finally:
+        frame_ring.REOPEN_CHECK = original
+
+
+def test_reader_falls_back_to_frame_file():
+    directory = tempfile.mkdtemp()
+    frame_file = os.path.join(directory, 'frame.jpg')
+    reader = frame_ring.FrameReader(frame_file, ring_path=os.path.join(directory, 'frames.ring'))
+    assert reader.signature() is None and reader.read() is None
+    preview_demand.write_frame(_jpeg('file'), frame_file)
+    signature = reader.signature()
+    assert signature is not None and reader.read()[0] == signature and reader.read()[2] == _jpeg('file')
+    reader.close()
+
+
+def test_write_frame_prefers_ring():
+    directory = tempfile.mkdtemp()
+    original = preview_demand.FRAME_FILE, frame_ring.RING_PATH
+    preview_demand.FRAME_FILE = os.path.join(directory, 'frame.jpg')
+    frame_ring.RING_PATH = os.path.join(directory, 'frames.ring')
+    try:
+        assert preview_demand.write_frame(_jpeg('ring'))
+        assert not os.path.exists(preview_demand.FRAME_FILE)
+        reader = frame_ring.FrameReader(preview_demand.FRAME_FILE)
+        assert reader.read()[2] == _jpeg('ring')
+        reader.close()
+
+        frame_ring.RING_PATH = 'off'
+        assert preview_demand.write_frame(_jpeg('file'))
+        with open(preview_demand.FRAME_FILE, 'rb') as f:
+            assert f.read() == _jpeg('file')
+    finally:
+        preview_demand.FRAME_FILE, frame_ring.RING_PATH = original
+
+
+if __name__ == "__main__":
+    test_round_trip_and_wrap_around()
+    test_torn_slot_is_rejected()
+    test_oversized_frame_grows_ring()
+    test_reader_falls_back_to_frame_file()
+    test_write_frame_prefers_ring()
+    print("✓ frame ring tests passed")
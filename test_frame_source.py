@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Frame source tests.
+Tests: directory and video playback (as fast as possible, real time, loop,
+end of stream), CameraModule driven by recorded footage through to scoring
+"""
+
+import sys
+import os
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from hardware.src import camera_module
+from hardware.src import frame_source
+
+
+def _frames(count, size=(640, 480)):
+    width, height = size
+    frames = []
+    for i in range(count):
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        frame[:, i * 8:i * 8 + 40] = 255
+        frames.append(frame)
+    return frames
+
+
+def _frame_directory(count):
+    import cv2
+    directory = tempfile.mkdtemp()
+    for i, frame in enumerate(_frames(count)):
+        cv2.imwrite(os.path.join(directory, f"frame_{i:04d}.jpg"), frame)
+    with open(os.path.join(directory, "notes.txt"), "w") as f:
+        f.write("not a frame")
+    return directory
+
+
+def _has_cv2():
+    try:
+        import cv2  # noqa: F401
+        return True
+    except ImportError:
+        print("  opencv not installed; skipping")
+        return False
+
+
+def test_directory_source_plays_in_order_and_ends():
+    if not _has_cv2():
+        return
+    source = frame_source.DirectorySource(_frame_directory(5), realtime=False, inference_size=(320, 240))
+    assert source.start()
+    positions = []
+    for _ in range(5):
+        preview, inference = source.read()
+        assert preview.shape == (480, 640, 3) and inference.shape == (240, 320, 3)
+        positions.append(int(np.argmax(preview[0, :, 0] > 128)))
+    assert positions == sorted(positions) and source.reference_size == (640, 480)
+    try:
+        source.read()
+        assert False, "expected EndOfStream"
+    except frame_source.EndOfStream:
+        pass
+
+    looping = frame_source.DirectorySource(source.path, realtime=False, loop=True)
+    looping.start()
+    assert len([looping.read() for _ in range(12)]) == 12
+    assert not frame_source.DirectorySource(tempfile.mkdtemp()).start()
+
+
+def test_realtime_playback_is_paced():
+    if not _has_cv2():
+        return
+    directory = _frame_directory(6)
+    fast = frame_source.DirectorySource(directory, realtime=False)
+    fast.start()
+    started = time.monotonic()
+    for _ in range(6):
+        fast.read()
+    assert time.monotonic() - started < 0.25
+
+    paced = frame_source.DirectorySource(directory, realtime=True, fps=20)
+    paced.start()
+    started = time.monotonic()
+    for _ in range(6):
+        paced.read()
+    # Frames 1..5 are due 50 ms apart after the first
+    assert time.monotonic() - started >= 0.24
+
+
+def test_video_file_source():
+    if not _has_cv2():
+        return
+    import cv2
+    path = os.path.join(tempfile.mkdtemp(), "session.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 15.0, (640, 480))
+    if not writer.isOpened():
+        print("  no video encoder available; skipping")
+        return
+    for frame in _frames(8):
+        writer.write(frame)
+    writer.release()
+
+    source = frame_source.from_spec(path, 'dual', (384, 288), (320, 240), realtime=False)
+    assert isinstance(source, frame_source.VideoFileSource)
+    assert source.start() and source.fps == 15.0
+    count = 0
+    try:
+        while True:
+            preview, inference = source.read()
+            count += 1
+    except frame_source.EndOfStream:
+        pass
+    assert count == 8 and inference.shape == (240, 320, 3)
+    source.close()
+    assert not frame_source.VideoFileSource(path + ".missing").start()
+
+
+def test_camera_module_scores_recorded_footage():
+    if not _has_cv2():
+        return
+    from hardware.src.scoring import score_from_camera_metrics
+
+    source = frame_source.DirectorySource(_frame_directory(4), realtime=False)
+    cam = camera_module.CameraModule(source=source, roi=False)
+    cam.motion_gate = None
+    seen = []
+
+    def analyze_rgb(rgb, reference_size=None):
+        seen.append((rgb.shape, reference_size))
+        return {'is_bad': len(seen) % 2 == 0, 'reason': 'Slouching'}
+
+    cam.analyze_rgb = analyze_rgb
+    assert cam.recorded and cam.picam2 is None
+    scores = []
+    while True:
+        _, posture = cam.capture_and_analyze()
+        if not posture:
+            break
+        scores.append(score_from_camera_metrics(posture))
+    assert scores == [95, 60, 95, 60]
+    assert seen[0] == ((240, 320, 3), (640, 480))
+    assert cam.ended and not cam.start() and cam.stats()['source'] == 'directory'
+
+    # The next session replays the recording
+    cam.stop()
+    assert cam.start() and cam.capture_and_analyze()[1]
+
+
+if __name__ == "__main__":
+    test_directory_source_plays_in_order_and_ends()
+    test_realtime_playback_is_paced()
+    test_video_file_source()
+    test_camera_module_scores_recorded_footage()
+    print("✓ frame source tests passed")
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+asyncio hardware service tests against the local RTDB stand-in.
+Tests: session scoring, control-plane driven start, Hailo samples, graceful stop,
+warm-standby pause/resume, no signals before the pipeline is ready, no
+pipeline pre-warm before the first session
+"""
+
+import sys
+import os
+import time
+import asyncio
+import signal
+import subprocess
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("POSTURE_STATUS_SOCKET", os.path.join(tempfile.mkdtemp(), "hailo.sock"))
+
+from fake_rtdb import FakeRTDB
+from hardware.src import main as hw_main
+from hardware.src.status_channel import StatusPublisher
+
+
+def test_session_state_scoring():
+    state = hw_main.SessionState()
+    first = state.generation
+    assert state.session_score() == 100
+    state.record({'is_bad': True, 'reason': 'Slouching'}, timestamp=0)
+    state.record({'is_bad': False, 'reason': ''}, timestamp=2)
+    state.record({'is_bad': False, 'reason': ''}, timestamp=8)
+    assert state.frame_count == 3
+    assert state.first_frame_latency is not None
+    # 2s at 60 and 6s at 95, regardless of how many frames each produced
+    assert state.session_score() == 86
+    assert state.live_payload(True)['postureStatus'] == 'Good'
+    state.reset('s2')
+    assert state.generation == first + 1
+    assert state.frame_count == 0 and state.active_session_id == 's2'
+    assert state.first_frame_latency is None
+
+
+def test_service_follows_control_plane_and_stops():
+    server = FakeRTDB({'system_state': {'camera_command': 'OFF'}}).start()
+    hw_main.FIREBASE_URL = server.url
+    service = hw_main.HardwareService()
+
+    async def scenario():
+        runner = asyncio.create_task(service.run())
+        await asyncio.sleep(0.5)
+        server.write('system_state', {'camera_command': 'ON', 'activeSessionId': 's1'}, False)
+        for _ in range(50):
+            await asyncio.sleep(0.1)
+            if service.state.camera_started:
+                break
+        assert service.state.using_hailo
+        # Stand in for the Hailo pipeline's posture samples
+        publisher = StatusPublisher(hw_main.status_channel.SOCKET_PATH)
+        for _ in range(4):
+            publisher.publish(True, 'Head forward')
+            await asyncio.sleep(0.05)
+        publisher.close()
+        for _ in range(50):
+            await asyncio.sleep(0.1)
+            live = server.get('live_data') or {}
+            if live.get('frameScore') == 55:
+                break
+        service.stopping.set()
+        await runner
+        return live
+
+    original_start = hw_main.start_hailo_process
+    # Pretend the Hailo pipeline launched
+    hw_main.start_hailo_process = lambda paused=False: True
+    try:
+        started = time.monotonic()
+        live = asyncio.run(scenario())
+        assert live.get('activeSessionId') == 's1'
+        assert live.get('frameScore') == 55
+        assert service.state.frame_count == 4
+        assert time.monotonic() - started < 15
+        assert service.device_executor._shutdown
+    finally:
+        hw_main.start_hailo_process = original_start
+        server.stop()
+
+
+def test_warm_standby_pause_and_resume():
+    # Stand-in pipeline that reports the pause/resume signals it receives
+    ready_file = os.path.join(tempfile.mkdtemp(), "hailo.ready")
+    child = subprocess.Popen(
+        [sys.executable, "-c",
+         "import os, signal, sys, time\n"
+         "signal.signal(signal.SIGUSR1, lambda *a: print('pause', flush=True))\n"
+         "signal.signal(signal.SIGUSR2, lambda *a: print('resume', flush=True))\n"
+         f"open({ready_file!r}, 'w').write(str(os.getpid()))\n"
+         "print('ready', flush=True)\n"
+         "time.sleep(30)\n"],
+        stdout=subprocess.PIPE, text=True,
+    )
+    assert child.stdout.readline().strip() == 'ready'
+    original_ready_file = hw_main.HAILO_READY_FILE
+    hw_main.HAILO_READY_FILE = ready_file
+    hw_main.hailo_process = child
+    try:
+        assert hw_main.hailo_running()
+        assert hw_main.pause_hailo_process()
+        assert hw_main.hailo_paused
+        assert child.stdout.readline().strip() == 'pause'
+
+        # A new session resumes the resident pipeline instead of respawning it
+        started = time.monotonic()
+        assert hw_main.start_hailo_process()
+        assert time.monotonic() - started < 0.1
+        assert not hw_main.hailo_paused
+        assert child.stdout.readline().strip() == 'resume'
+        assert hw_main.hailo_process is child
+    finally:
+        child.send_signal(signal.SIGKILL)
+        child.wait()
+        hw_main.hailo_process = None
+        hw_main.hailo_paused = False
+        hw_main.HAILO_READY_FILE = original_ready_file
+
+
+def test_starting_pipeline_is_never_signalled():
+    # Still in its startup window: a pause/resume signal would kill it, so none is sent
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"], start_new_session=True)
+    original = hw_main.HAILO_READY_FILE, hw_main.stop_hailo_process, hw_main.HAILO_EXAMPLES_DIR
+    hw_main.HAILO_READY_FILE = os.path.join(tempfile.mkdtemp(), "hailo.ready")
+    hw_main.HAILO_EXAMPLES_DIR = tempfile.mkdtemp()
+    stopped = []
+    hw_main.stop_hailo_process = lambda: stopped.append(True)
+    hw_main.hailo_process = child
+    try:
+        assert hw_main.hailo_running() and not hw_main.hailo_ready()
+        assert not hw_main.pause_hailo_process() and not hw_main.hailo_paused
+
+        # Started paused for standby but not ready: treated as cold and restarted
+        hw_main.hailo_paused = True
+        hw_main.start_hailo_process()
+        assert stopped == [True]
+        assert child.poll() is None
+    finally:
+        child.kill()
+        child.wait()
+        hw_main.HAILO_READY_FILE, hw_main.stop_hailo_process, hw_main.HAILO_EXAMPLES_DIR = original
+        hw_main.hailo_process = None
+        hw_main.hailo_paused = False
+
+
+def test_pipeline_is_only_prewarmed_after_a_session():
+    server = FakeRTDB({'system_state': {'camera_command': 'OFF'}}).start()
+    hw_main.FIREBASE_URL = server.url
+    service = hw_main.HardwareService()
+    starts = []
+
+    async def scenario():
+        runner = asyncio.create_task(service.run())
+        # Idle since boot: the camera stays off
+        await asyncio.sleep(1.5)
+        assert starts == []
+        server.write('system_state', {'camera_command': 'ON', 'activeSessionId': 's1'}, False)
+        for _ in range(50):
+            await asyncio.sleep(0.1)
+            if service.state.camera_started:
+                break
+        server.write('system_state', {'camera_command': 'OFF'}, False)
+        for _ in range(50):
+            await asyncio.sleep(0.1)
+            if True in starts:
+                break
+        service.stopping.set()
+        await runner
+
+    original = hw_main.start_hailo_process, hw_main.stop_hailo_process, hw_main.HAILO_WARM_STANDBY
+    hw_main.start_hailo_process = lambda paused=False: starts.append(paused) or True
+    hw_main.stop_hailo_process = lambda: None
+    hw_main.HAILO_WARM_STANDBY = True
+    try:
+        asyncio.run(scenario())
+        # Cold start for the session, then a paused warm-up once it ended
+        assert starts == [False, True]
+    finally:
+        hw_main.start_hailo_process, hw_main.stop_hailo_process, hw_main.HAILO_WARM_STANDBY = original
+        server.stop()
+
+
+if __name__ == "__main__":
+    test_session_state_scoring()
+    test_service_follows_control_plane_and_stops()
+    test_warm_standby_pause_and_resume()
+    test_starting_pipeline_is_never_signalled()
+    test_pipeline_is_only_prewarmed_after_a_session()
+    print("✓ hardware service tests passed")
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Delta/deadband live_data publisher tests against the local RTDB stand-in.
+Tests: first full PUT, field-level PATCHes, deadband, heartbeat, session
+score always exact, resync, write savings
+"""
+
+import sys
+import os
+import json
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_rtdb import FakeRTDB
+from hardware.src.live_publisher import LivePublisher
+from hardware.src.uplink import UplinkWorker
+
+
+def _payload(score, neck=0.10, is_bad=False, now=0, frame_score=None):
+    return {
+        "score": score,
+        "frameScore": score if frame_score is None else frame_score,
+        "sessionScore": score,
+        "activeSessionId": "s1",
+        "cameraActive": True,
+        "cameraMetrics": {"shoulder_alignment": 0.02, "neck_angle": neck, "is_bad": is_bad, "reason": ""},
+        "postureStatus": "Bad" if is_bad else "Good",
+        "postureReason": "",
+        "updatedAt": int(now),
+    }
+
+
+def test_delta_deadband_and_heartbeat():
+    server = FakeRTDB().start()
+    worker = UplinkWorker(server.url)
+    worker.start()
+    publisher = LivePublisher(worker, heartbeat_interval=10)
+    try:
+        assert publisher.publish(_payload(90, now=0), now=0) == 'full'
+        assert worker.flush(timeout=5)
+        # Sub-deadband wobble is suppressed
+        assert publisher.publish(_payload(90, neck=0.105, now=1, frame_score=92), now=1) == 'skipped'
+        # A real change only sends the changed fields
+        assert publisher.publish(_payload(90, is_bad=True, now=2, frame_score=92), now=2) == 'delta'
+        assert worker.flush(timeout=5)
+        method, path, body = server.requests[-1]
+        assert method == 'PATCH'
+        assert set(body) == {'cameraMetrics/is_bad', 'postureStatus', 'updatedAt'}
+
+        assert publisher.publish(_payload(90, is_bad=True, now=5, frame_score=92), now=5) == 'skipped'
+        assert publisher.publish(_payload(90, is_bad=True, now=12, frame_score=92), now=12) == 'heartbeat'
+        assert worker.flush(timeout=5)
+        assert server.requests[-1][2] == {'updatedAt': 12}
+
+        live = server.get('/live_data')
+        assert live['cameraMetrics']['is_bad'] is True
+        assert live['score'] == 90 and live['updatedAt'] == 12
+    finally:
+        worker.stop()
+        server.stop()
+
+
+def test_score_changes_are_published_exactly():
+    """The dashboard stores the last live score as the session result, so no deadband applies to it."""
+    server = FakeRTDB().start()
+    worker = UplinkWorker(server.url)
+    worker.start()
+    publisher = LivePublisher(worker, heartbeat_interval=10)
+    try:
+        assert publisher.publish(_payload(90, now=0), now=0) == 'full'
+        assert worker.flush(timeout=5)
+        # A one-point change would be under the old deadband of 3
+        assert publisher.publish(_payload(91, now=1), now=1) == 'delta'
+        assert worker.flush(timeout=5)
+        assert set(server.requests[-1][2]) == {'score', 'sessionScore', 'updatedAt'}
+        # The final score before a stop reaches the server as is
+        assert publisher.publish(_payload(89, now=2, frame_score=91), now=2) == 'delta'
+        assert worker.flush(timeout=5)
+        live = server.get('/live_data')
+        assert live['score'] == 89 and live['sessionScore'] == 89
+        # The per-frame score keeps its deadband
+        assert live['frameScore'] == 90
+    finally:
+        worker.stop()
+        server.stop()
+
+
+def test_failed_write_forces_full_resync():
+    server = FakeRTDB().start()
+    worker = UplinkWorker(server.url)
+    worker.start()
+    publisher = LivePublisher(worker)
+    try:
+        publisher.publish(_payload(90), now=0)
+        assert worker.flush(timeout=5)
+        server.fail_writes = True
+        assert publisher.publish(_payload(70), now=1) == 'delta'
+        assert worker.flush(timeout=5)
+        server.fail_writes = False
+        assert publisher.publish(_payload(70), now=2) == 'full'
+        assert worker.flush(timeout=5)
+        assert server.get('/live_data')['score'] == 70
+    finally:
+        worker.stop()
+        server.stop()
+
+
+def test_stable_session_write_reduction():
+    """One hour of a mostly stable session: ~1 push per second before, far fewer now."""
+    server = FakeRTDB().start()
+    worker = UplinkWorker(server.url)
+    worker.start()
+    publisher = LivePublisher(worker, heartbeat_interval=30)
+    rng = random.Random(7)
+    ticks = 3600
+    baseline_bytes = 0
+    try:
+        is_bad = False
+        total = 0
+        for now in range(ticks):
+            if rng.random() < 0.005:
+                is_bad = not is_bad
+            frame_score = 90 + rng.choice((-1, 0, 1)) - (35 if is_bad else 0)
+            # The session score is the running mean of frame scores, as in the service
+            total += frame_score
+            payload = _payload(round(total / (now + 1)), neck=0.10 + rng.uniform(-0.004, 0.004),
+                               is_bad=is_bad, now=now, frame_score=frame_score)
+            baseline_bytes += len(json.dumps(payload))
+            publisher.publish(payload, now=now)
+        assert worker.flush(timeout=10)
+        stats = publisher.stats()
+        pushes = stats['full'] + stats['delta'] + stats['heartbeat']
+        print(f"  writes: {ticks} -> {pushes}, bytes: {baseline_bytes} -> {stats['bytes']}")
+        assert pushes * 10 <= ticks
+        assert stats['bytes'] * 10 <= baseline_bytes
+    finally:
+        worker.stop()
+        server.stop()
+
+
+if __name__ == "__main__":
+    test_delta_deadband_and_heartbeat()
+    test_score_changes_are_published_exactly()
+    test_failed_write_forces_full_resync()
+    test_stable_session_write_reduction()
+    print("✓ live publisher tests passed")
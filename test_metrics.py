@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Pipeline metrics tests.
+Tests: fixed-bucket histograms, no-op when disabled, snapshot export, Prometheus /metrics endpoint
+"""
+
+import sys
+import os
+import tempfile
+import threading
+import urllib.request
+from http.server import HTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hardware.src import metrics
+
+
+def test_histogram_buckets_and_prometheus_text():
+    registry = metrics.Registry()
+    histogram = registry.histogram(metrics.STAGE_METRIC, {'stage': 'capture'}, buckets=(0.01, 0.1, 1.0))
+    for value in (0.005, 0.05, 0.05, 0.5, 5.0):
+        histogram.observe(value)
+    registry.inc('posture_frames_total', 3, {'source': 'hailo'})
+    registry.add_collector(lambda: [('posture_uplink_failed_total', 'counter', 'Push failures', 2)])
+
+    snapshot = dict(registry.snapshot(), process='hardware')
+    text = metrics.render_prometheus([snapshot])
+    assert '# TYPE posture_stage_seconds histogram' in text
+    assert 'posture_stage_seconds_bucket{process="hardware",stage="capture",le="0.01"} 1' in text
+    assert 'posture_stage_seconds_bucket{process="hardware",stage="capture",le="0.1"} 3' in text
+    assert 'posture_stage_seconds_bucket{process="hardware",stage="capture",le="+Inf"} 5' in text
+    assert 'posture_stage_seconds_count{process="hardware",stage="capture"} 5' in text
+    assert 'posture_frames_total{process="hardware",source="hailo"} 3' in text
+    assert '# HELP posture_uplink_failed_total Push failures' in text
+    assert 'posture_uplink_failed_total{process="hardware"} 2' in text
+
+
+def test_disabled_metrics_are_noops():
+    enabled = metrics.ENABLED
+    metrics.ENABLED = False
+    try:
+        assert metrics.timer('capture') is metrics.timer('encode')
+        with metrics.timer('capture'):
+            pass
+        metrics.inc('posture_disabled_total')
+        names = [metric['name'] for metric in metrics.REGISTRY.snapshot()['metrics']]
+        assert 'posture_disabled_total' not in names
+    finally:
+        metrics.ENABLED = enabled
+
+
+def test_metrics_endpoint_merges_process_snapshots():
+    from hardware.src import mjpeg_server
+
+    directory = tempfile.mkdtemp()
+    original_dir = metrics.METRICS_DIR
+    metrics.METRICS_DIR = directory
+    hailo = metrics.Registry()
+    hailo.histogram(metrics.STAGE_METRIC, {'stage': 'app_callback'}).observe(0.02)
+    metrics.write_snapshot('hailo', hailo)
+    with metrics.timer('save_reading'):
+        pass
+
+    server = HTTPServer(('127.0.0.1', 0), mjpeg_server.MJPEGHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            text = response.read().decode()
+        assert 'posture_stage_seconds_count{process="hailo",stage="app_callback"} 1' in text
+        assert 'posture_stage_seconds_count{process="mjpeg",stage="save_reading"} 1' in text
+    finally:
+        server.shutdown()
+        server.server_close()
+        metrics.METRICS_DIR = original_dir
+
+
+if __name__ == "__main__":
+    test_histogram_buckets_and_prometheus_text()
+    test_disabled_metrics_are_noops()
+    test_metrics_endpoint_merges_process_snapshots()
+    print("✓ metrics tests passed")
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+MJPEG server tests.
+Tests: health checks answered while viewers stream, viewer and connection
+caps (503), idle connections closed, shutdown ending open streams, one
+frame file read per new frame shared by every viewer, frames sent only when
+new plus keep-alives, frames taken from the shared-memory ring once the
+pipeline publishes one, slow viewers skipping to the newest frame without
+delaying others, per-viewer /status
+"""
+
+import sys
+import os
+import json
+import socket
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hardware.src import frame_ring
+from hardware.src import mjpeg_server
+from hardware.src import preview_demand
+
+
+class _Server:
+    """MJPEGServer on an ephemeral port, serving a temporary frame file."""
+
+    def __init__(self, **kwargs):
+        directory = tempfile.mkdtemp()
+        self.frame_file = os.path.join(directory, 'frame.jpg')
+        with open(self.frame_file, 'wb') as f:
+            f.write(b'\xff\xd8 frame \xff\xd9')
+        self.ring_path = os.path.join(directory, 'frames.ring')
+        self._original = (mjpeg_server.FRAME_FILE, preview_demand.DEMAND_FILE, frame_ring.RING_PATH)
+        mjpeg_server.FRAME_FILE = mjpeg_server.Path(self.frame_file)
+        preview_demand.DEMAND_FILE = os.path.join(directory, 'demand')
+        frame_ring.RING_PATH = self.ring_path
+        self.server = mjpeg_server.MJPEGServer(('127.0.0.1', 0), **kwargs)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.port}{path}"
+
+    def open_stream(self):
+        """A raw viewer socket, returned once the first frame has arrived."""
+        sock = socket.create_connection(('127.0.0.1', self.port), timeout=5)
+        sock.sendall(b'GET /stream HTTP/1.0\r\n\r\n')
+        received = b''
+        while b'\xff\xd9' not in received:
+            chunk = sock.recv(4096)
+            assert chunk, received
+            received += chunk
+        assert received.startswith(b'HTTP/1.0 200')
+        return sock
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        mjpeg_server.FRAME_FILE, preview_demand.DEMAND_FILE, frame_ring.RING_PATH = self._original
+
+
+def _wait_for(condition, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_health_answers_while_viewers_stream():
+    server = _Server()
+    viewers = []
+    try:
+        viewers = [server.open_stream() for _ in range(3)]
+        assert _wait_for(lambda: server.server.stream_clients == 3)
+        started = time.monotonic()
+        with urllib.request.urlopen(server.url('/health'), timeout=2) as response:
+            assert response.status == 200
+        with urllib.request.urlopen(server.url('/'), timeout=2) as response:
+            assert b'Live Stream' in response.read()
+        assert time.monotonic() - started < 1.0
+    finally:
+        for viewer in viewers:
+            viewer.close()
+        server.close()
+
+
+def test_viewer_and_connection_caps():
+    server = _Server(max_stream_clients=2, max_connections=3)
+    viewers = []
+    try:
+        viewers = [server.open_stream() for _ in range(2)]
+        try:
+            urllib.request.urlopen(server.url('/stream'), timeout=2)
+            assert False, "expected 503 for the third viewer"
+        except urllib.error.HTTPError as error:
+            assert error.code == 503
+
+        # A viewer that leaves frees its slot
+        viewers.pop().close()
+        assert _wait_for(lambda: server.server.stream_clients == 1)
+        viewers.append(server.open_stream())
+
+        # Two viewers plus an idle connection fill the connection cap
+        idle = socket.create_connection(('127.0.0.1', server.port), timeout=5)
+        viewers.append(idle)
+        assert _wait_for(lambda: server.server.connections == 3)
+        try:
+            urllib.request.urlopen(server.url('/health'), timeout=2)
+            assert False, "expected 503 over the connection cap"
+        except urllib.error.HTTPError as error:
+            assert error.code == 503 and error.headers['Retry-After'] == '5'
+    finally:
+        for viewer in viewers:
+            viewer.close()
+        server.close()
+
+
+def test_idle_connection_is_closed():
+    original = mjpeg_server.MJPEGHandler.timeout
+    mjpeg_server.MJPEGHandler.timeout = 0.3
+    server = _Server()
+    try:
+        idle = socket.create_connection(('127.0.0.1', server.port), timeout=5)
+        assert _wait_for(lambda: server.server.connections == 1)
+        # Never sends a request: the server gives up and closes the socket
+        assert idle.recv(1024) == b''
+        assert _wait_for(lambda: server.server.connections == 0)
+        idle.close()
+    finally:
+        server.close()
+        mjpeg_server.MJPEGHandler.timeout = original
+
+
+def _read_frame(sock, buffer=b''):
+    """(frame bytes, leftover) for the next multipart frame on a viewer socket."""
+    while True:
+        start = buffer.find(b'\xff\xd8')
+        end = buffer.find(b'\xff\xd9', start + 2) if start >= 0 else -1
+        if end >= 0:
+            return buffer[start:end + 2], buffer[end + 2:]
+        chunk = sock.recv(4096)
+        assert chunk
+        buffer += chunk
+
+
+def test_one_read_per_new_frame_for_all_viewers():
+    server = _Server()
+    viewers = []
+    try:
+        viewers = [server.open_stream() for _ in range(4)]
+        frames = server.server.frames
+        assert _wait_for(lambda: frames.stats()['subscribers'] == 4)
+        reads = frames.stats()['reads']
+        for i in range(3):
+            preview_demand.write_frame(b'\xff\xd8 frame %d \xff\xd9' % i, server.frame_file)
+            assert _wait_for(lambda: frames.stats()['reads'] == reads + i + 1)
+            time.sleep(0.1)
+        assert frames.stats()['reads'] == reads + 3
+
+        # Every viewer ends up on the newest frame
+        for viewer in viewers:
+            buffer, frame = b'', None
+            while frame != b'\xff\xd8 frame 2 \xff\xd9':
+                frame, buffer = _read_frame(viewer, buffer)
+    finally:
+        for viewer in viewers:
+            viewer.close()
+        server.close()
+
+    # The reader stops once nobody is watching
+    assert _wait_for(lambda: frames._thread is None)
+
+
+def test_frames_sent_only_when_new():
+    original = mjpeg_server.KEEPALIVE_INTERVAL
+    mjpeg_server.KEEPALIVE_INTERVAL = 0.6
+    server = _Server()
+    try:
+        viewer = server.open_stream()
+        viewer.settimeout(0.3)
+        # Unchanged picture: nothing more (beyond the first frame's trailer) until the keep-alive
+        received = b''
+        try:
+            while True:
+                received += viewer.recv(4096)
+        except socket.timeout:
+            pass
+        assert b'\xff\xd8' not in received, "unchanged frame was resent"
+        viewer.settimeout(2)
+        started = time.monotonic()
+        frame, buffer = _read_frame(viewer)
+        assert frame == b'\xff\xd8 frame \xff\xd9' and time.monotonic() - started < 0.6
+
+        started = time.monotonic()
+        preview_demand.write_frame(b'\xff\xd8 new \xff\xd9', server.frame_file)
+        frame, buffer = _read_frame(viewer, buffer)
+        assert frame == b'\xff\xd8 new \xff\xd9' and time.monotonic() - started < 0.3
+        assert server.server.frames.unique_fps() > 0
+        viewer.close()
+    finally:
+        server.close()
+        mjpeg_server.KEEPALIVE_INTERVAL = original
+
+
+def test_stream_and_snapshot_from_frame_ring():
+    original = frame_ring.REOPEN_CHECK
+    frame_ring.REOPEN_CHECK = 0
+    server = _Server()
+    try:
+        viewer = server.open_stream()
+        writer = frame_ring.FrameRingWriter(server.ring_path)
+        writer.write(b'\xff\xd8 ring 1 \xff\xd9')
+        frame, buffer = _read_frame(viewer)
+        assert frame == b'\xff\xd8 ring 1 \xff\xd9'
+
+        def publish_soon():
+            time.sleep(0.2)
+            writer.write(b'\xff\xd8 ring 2 \xff\xd9')
+
+        threading.Thread(target=publish_soon, daemon=True).start()
+        # The snapshot waits for a frame newer than the request
+        with urllib.request.urlopen(server.url('/snapshot.jpg'), timeout=5) as response:
+            assert response.read() == b'\xff\xd8 ring 2 \xff\xd9'
+        frame, buffer = _read_frame(viewer, buffer)
+        assert frame == b'\xff\xd8 ring 2 \xff\xd9'
+        viewer.close()
+        writer.close()
+    finally:
+        server.close()
+        frame_ring.REOPEN_CHECK = original
+
+
+def test_slow_viewer_skips_frames_without_delaying_others():
+    server = _Server()
+    try:
+        fast = server.open_stream()
+        slow = socket.socket()
+        slow.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        slow.connect(('127.0.0.1', server.port))
+        slow.sendall(b'GET /stream HTTP/1.0\r\n\r\n')
+        assert _wait_for(lambda: server.server.stream_clients == 2)
+
+        # Frames far bigger than both socket buffers: the slow viewer's first send blocks
+        buffer = b''
+        for i in range(8):
+            frame = b'\xff\xd8' + bytes([i]) * 400000 + b'\xff\xd9'
+            published = time.monotonic()
+            preview_demand.write_frame(frame, server.frame_file)
+            received = None
+            while received != frame:
+                received, buffer = _read_frame(fast, buffer)
+            assert time.monotonic() - published < 1.0
+            time.sleep(0.05)
+
+        # Once the slow viewer reads again it gets the newest frame, not the backlog
+        slow.settimeout(5)
+        last = b'\xff\xd8' + bytes([7]) * 400000 + b'\xff\xd9'
+        received, leftover = None, b''
+        while received != last:
+            received, leftover = _read_frame(slow, leftover)
+        with urllib.request.urlopen(server.url('/status'), timeout=2) as response:
+            status = json.loads(response.read())
+        viewers = {viewer['frames_sent']: viewer for viewer in status['viewers']}
+        assert status['stream_clients'] == 2 and len(viewers) == 2
+        fast_stats, slow_stats = viewers[max(viewers)], viewers[min(viewers)]
+        assert fast_stats['frames_dropped'] == 0 and slow_stats['frames_dropped'] >= 5
+        assert slow_stats['max_send_ms'] > fast_stats['max_send_ms']
+        assert fast_stats['delivered_fps'] > 0 and fast_stats['send_ms'] is not None
+        fast.close()
+        slow.close()
+    finally:
+        server.close()
+
+
+def test_shutdown_ends_open_streams():
+    server = _Server()
+    viewer = server.open_stream()
+    try:
+        server.close()
+        assert _wait_for(lambda: server.server.stream_clients == 0)
+    finally:
+        viewer.close()
+
+
+if __name__ == "__main__":
+    test_health_answers_while_viewers_stream()
+    test_viewer_and_connection_caps()
+    test_idle_connection_is_closed()
+    test_one_read_per_new_frame_for_all_viewers()
+    test_frames_sent_only_when_new()
+    test_stream_and_snapshot_from_frame_ring()
+    test_slow_viewer_skips_frames_without_delaying_others()
+    test_shutdown_ends_open_streams()
+    print("✓ mjpeg server tests passed")
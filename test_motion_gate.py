@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Motion gate tests.
+Tests: still scene reuses metrics, motion and staleness force a pose pass,
+drift is measured against the last analysed frame, CameraModule integration
+(gate consulted only when there are metrics to reuse)
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from hardware.src import camera_module
+from hardware.src.motion_gate import MotionGate
+
+
+def _scene(shift=0, noise=0, seed=0):
+    rng = np.random.default_rng(seed)
+    base = np.zeros((240, 320), dtype=np.uint8)
+    base[60:200, 100 + shift:180 + shift] = 180  # a seated figure
+    if noise:
+        base = np.clip(base.astype(np.int16) + rng.integers(-noise, noise + 1, base.shape), 0, 255).astype(np.uint8)
+    return base
+
+
+def _lores(scene):
+    """The scene as the dual-stream lores frame: packed I420 with neutral chroma."""
+    height, width = scene.shape
+    return np.vstack((scene, np.full((height // 2, width), 128, dtype=np.uint8)))
+
+
+def test_still_scene_hits_and_motion_misses():
+    gate = MotionGate(threshold=3.0, max_staleness=10.0)
+    assert gate.should_analyze(_scene(), now=0.0)
+    # Sensor noise alone stays under the threshold
+    for i in range(1, 9):
+        assert not gate.should_analyze(_scene(noise=6, seed=i), now=float(i))
+    assert gate.should_analyze(_scene(shift=40), now=9.0)
+    assert gate.stats()['hits'] == 8 and gate.stats()['misses'] == 2
+
+
+def test_staleness_forces_refresh_and_drift_accumulates():
+    gate = MotionGate(threshold=3.0, max_staleness=5.0)
+    assert gate.should_analyze(_scene(), now=0.0)
+    assert not gate.should_analyze(_scene(), now=4.9)
+    assert gate.should_analyze(_scene(), now=5.0)
+    assert gate.forced == 1
+
+    # Small per-frame steps are each under the threshold but add up against the reference
+    gate = MotionGate(threshold=3.0, max_staleness=100.0)
+    gate.should_analyze(_scene(), now=0.0)
+    results = [gate.should_analyze(_scene(shift=step), now=float(step)) for step in range(1, 30)]
+    assert any(results)
+
+
+def test_camera_module_reuses_metrics_while_gated():
+    try:
+        import cv2  # noqa: F401
+    except ImportError:
+        print("  opencv not installed; skipping")
+        return
+    cam = camera_module.CameraModule(mode='dual', gate=MotionGate(threshold=3.0, max_staleness=100.0))
+    calls = []
+    cam.analyze_rgb = lambda rgb, reference_size=None: calls.append(1) or {'is_bad': True, 'reason': 'Slouching'}
+    preview = np.zeros((288, 384, 3), dtype=np.uint8)
+
+    for _ in range(5):
+        _, posture = cam.process_frames(preview, _lores(_scene()))
+        assert posture == {'is_bad': True, 'reason': 'Slouching'}
+    assert len(calls) == 1
+    cam.process_frames(preview, _lores(_scene(shift=60)))
+    assert len(calls) == 2
+    assert cam.stats()['motion_gate']['hits'] == 4
+
+    cam.stop()
+    cam.process_frames(preview, _lores(_scene(shift=60)))
+    assert len(calls) == 3
+
+
+def test_gate_is_only_consulted_when_metrics_can_be_reused():
+    try:
+        import cv2  # noqa: F401
+    except ImportError:
+        print("  opencv not installed; skipping")
+        return
+    gate = MotionGate(threshold=3.0, max_staleness=100.0)
+    cam = camera_module.CameraModule(mode='dual', gate=gate)
+    results = [None, None, {'is_bad': False, 'reason': ''}]
+    cam.analyze_rgb = lambda rgb, reference_size=None: results.pop(0) if results else {'is_bad': False}
+    preview = np.zeros((288, 384, 3), dtype=np.uint8)
+
+    # No person yet: every frame is analysed and the gate counts none of them
+    for _ in range(3):
+        cam.process_frames(preview, _lores(_scene()))
+    assert gate.stats()['hits'] == gate.stats()['misses'] == 0
+    # The last analysed frame is the reference, so the still scene is a hit straight away
+    cam.process_frames(preview, _lores(_scene()))
+    assert gate.stats() == {'hits': 1, 'misses': 0, 'forced': 0, 'hit_rate': 1.0}
+
+
+if __name__ == "__main__":
+    test_still_scene_hits_and_motion_misses()
+    test_staleness_forces_refresh_and_drift_accumulates()
+    test_camera_module_reuses_metrics_while_gated()
+    test_gate_is_only_consulted_when_metrics_can_be_reused()
+    print("✓ motion gate tests passed")
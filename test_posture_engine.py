@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Posture engine tests.
+Tests: parity with the previous MediaPipe (metrics_from_landmarks) and Hailo
+(check_posture_side) rule implementations on random poses, batch matches
+single-frame evaluation, MediaPipe-to-COCO mapping
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from hardware.src import camera_module
+from hardware.src import posture_engine
+
+
+def _legacy_mediapipe(lm, img_width, img_height):
+    """metrics_from_landmarks as it was before the engine, with MediaPipe's indices inlined."""
+    left_sh, right_sh, nose = lm[11], lm[12], lm[0]
+    shoulder_alignment = abs(left_sh.y - right_sh.y)
+    neck_angle = nose.y - (left_sh.y + right_sh.y) / 2
+    left_ear, right_ear, left_hip, right_hip = lm[7], lm[8], lm[23], lm[24]
+
+    def pt_px(lm_point):
+        return (int(lm_point.x * img_width), int(lm_point.y * img_height))
+
+    ear = pt_px(left_ear) if left_ear.visibility > 0.5 else (pt_px(right_ear) if right_ear.visibility > 0.5 else None)
+    shoulder = pt_px(left_sh) if left_sh.visibility > 0.5 else (pt_px(right_sh) if right_sh.visibility > 0.5 else None)
+    hip = pt_px(left_hip) if left_hip.visibility > 0.5 else (pt_px(right_hip) if right_hip.visibility > 0.5 else None)
+
+    is_bad = False
+    reason = ""
+    if ear and shoulder:
+        if abs(ear[0] - shoulder[0]) > 12:
+            is_bad = True
+            reason = "Head forward"
+    if shoulder and hip and not is_bad:
+        if abs(shoulder[0] - hip[0]) > 18:
+            is_bad = True
+            reason = "Slouching"
+    return {'shoulder_alignment': shoulder_alignment, 'neck_angle': neck_angle, 'is_bad': is_bad, 'reason': reason}
+
+
+def _legacy_hailo(kps, w, h):
+    """src/pose_estimation.py:check_posture_side as it was before the engine."""
+    def pt(n):
+        p = kps.get(n)
+        if p is None:
+            return None
+        return (int(p[0] * w), int(p[1] * h))
+
+    ear = pt('left_ear') or pt('right_ear')
+    shoulder = pt('left_shoulder') or pt('right_shoulder')
+    hip = pt('left_hip') or pt('right_hip')
+    bad = False
+    reason = ""
+    if ear and shoulder and abs(ear[0] - shoulder[0]) > 12:
+        bad = True
+        reason = "Head forward"
+    if shoulder and hip and abs(shoulder[0] - hip[0]) > 18:
+        bad = True
+        reason = "Slouching"
+    return bad, reason
+
+
+def _random_landmarks(rng):
+    # Seated side view: ear/shoulder/hip roughly stacked with a random lean, random visibilities
+    lean = rng.normal(0, 0.02, 3)
+    landmarks = []
+    for index in range(33):
+        x = 0.5 + lean[min(index // 11, 2)] + rng.normal(0, 0.004)
+        landmarks.append(camera_module.Landmark(x, rng.random(), rng.choice([0.1, 0.9, rng.random()])))
+    return landmarks
+
+
+def test_parity_with_mediapipe_rules():
+    rng = np.random.default_rng(1)
+    reasons = set()
+    for _ in range(2000):
+        landmarks = _random_landmarks(rng)
+        width, height = [(640, 480), (4608, 2592), (320, 240)][rng.integers(3)]
+        expected = _legacy_mediapipe(landmarks, width, height)
+        assert camera_module.CameraModule.metrics_from_landmarks(landmarks, width, height) == expected
+        reasons.add(expected['reason'])
+    assert reasons == {'', 'Head forward', 'Slouching'}
+
+
+def test_parity_with_hailo_rules():
+    rng = np.random.default_rng(2)
+    reasons = set()
+    for _ in range(2000):
+        points = 0.5 + rng.normal(0, 0.03, (posture_engine.NUM_KEYPOINTS, 2))
+        # Some detections come back with fewer points than the full skeleton
+        count = posture_engine.NUM_KEYPOINTS if rng.random() < 0.9 else int(rng.integers(4, 13))
+        kps = {name: tuple(points[idx]) for idx, name in enumerate(posture_engine.COCO_KEYPOINTS) if idx < count}
+        keypoints = np.zeros((posture_engine.NUM_KEYPOINTS, 3))
+        keypoints[:count, :2] = points[:count]
+        keypoints[:count, 2] = 1.0
+
+        expected = _legacy_hailo(kps, 640, 640)
+        result = posture_engine.evaluate(keypoints, 640, 640, slouch_overrides=True)
+        assert (result['is_bad'], result['reason']) == expected
+        reasons.add(expected[1])
+    assert reasons == {'', 'Head forward', 'Slouching'}
+
+
+def test_batch_matches_single_frame():
+    rng = np.random.default_rng(3)
+    keypoints = np.stack([posture_engine.from_mediapipe(_random_landmarks(rng)) for _ in range(500)])
+    batch = posture_engine.evaluate_batch(keypoints, 640, 480)
+    assert batch['is_bad'].shape == (500,)
+    for i in range(len(keypoints)):
+        single = posture_engine.evaluate(keypoints[i], 640, 480)
+        assert single['is_bad'] == bool(batch['is_bad'][i])
+        assert single['reason'] == posture_engine.REASONS[batch['reason'][i]]
+        assert single['neck_angle'] == batch['neck_angle'][i]
+
+    # No confident side: the checks are skipped rather than failing
+    empty = posture_engine.evaluate_batch(np.zeros((2, 17, 3)), 640, 480)
+    assert not empty['is_bad'].any() and np.isnan(empty['head_forward']).all()
+
+
+def test_from_mediapipe_picks_coco_keypoints():
+    landmarks = [camera_module.Landmark(index / 100, index / 50, 0.9) for index in range(33)]
+    keypoints = posture_engine.from_mediapipe(landmarks)
+    assert keypoints.shape == (17, 3)
+    assert keypoints[posture_engine.LEFT_HIP, 0] == 0.23 and keypoints[posture_engine.RIGHT_EAR, 0] == 0.08
+
+
+if __name__ == "__main__":
+    test_parity_with_mediapipe_rules()
+    test_parity_with_hailo_rules()
+    test_batch_matches_single_frame()
+    test_from_mediapipe_picks_coco_keypoints()
+    print("✓ posture engine tests passed")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Batched Firestore reading writer tests against fake_firestore.py.
+Tests: batch/interval flushing, one session merge per flush, retry on failure
+(including no Firestore client), and Firestore round trips before vs after batching
+"""
+
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_firestore import FakeFirestore
+from hardware.src.reading_writer import ReadingWriter
+
+
+def _reading(i):
+    return {"timestamp": datetime(2026, 1, 1, 12, 0, i % 60), "frameScore": 90, "sessionScore": 90.0,
+            "cameraMetrics": {}, "postureStatus": "Good", "postureReason": ""}
+
+
+def _legacy_save_reading(client, session_id, payload):
+    # The pre-batching save_reading: two round trips per reading
+    session_ref = client.collection('sessions').document(session_id)
+    session_ref.collection('readings').add(payload)
+    session_ref.set({
+        'lastReadingAt': payload.get('timestamp'),
+        'lastLiveScore': payload.get('score'),
+        'status': 'active'
+    }, merge=True)
+
+
+def test_flushes_by_count_and_interval():
+    db = FakeFirestore()
+    writer = ReadingWriter(lambda: db, batch_size=5, flush_interval=10)
+
+    for i in range(4):
+        writer.add('s1', _reading(i), now=0)
+    assert db.round_trips == 0
+
+    writer.add('s1', _reading(4), now=1)
+    assert db.round_trips == 1
+    assert len(db.readings('s1')) == 5
+    assert db.documents['sessions/s1']['lastReadingAt'] == _reading(4)['timestamp']
+
+    writer.add('s1', _reading(5), now=2)
+    writer.maybe_flush(now=5)
+    assert db.round_trips == 1
+    writer.maybe_flush(now=12)
+    assert db.round_trips == 2
+    assert writer.stats()['readings_written'] == 6
+
+
+def test_failed_commit_is_retried():
+    db = FakeFirestore()
+    writer = ReadingWriter(lambda: db, batch_size=100)
+    writer.add('s1', _reading(0))
+    writer.add('s2', _reading(1))
+    db.fail = True
+    assert writer.flush() == 0
+    assert writer.pending() == 2
+
+    # No client at all (not yet initialised or offline) takes the same retry path
+    client = [None]
+    offline = ReadingWriter(lambda: client[0], batch_size=100)
+    offline.add('s1', _reading(2))
+    assert offline.flush() == 0
+    assert offline.pending() == 1 and offline.stats()['failed_commits'] == 1
+    client[0] = db
+
+    db.fail = False
+    assert writer.flush() == 2
+    assert offline.flush() == 1 and len(db.readings('s1')) == 2
+    assert len(db.readings('s2')) == 1
+    assert db.documents['sessions/s2']['status'] == 'active'
+
+
+def test_write_cost_before_and_after():
+    readings = 600  # 20 minutes at the Picamera2 path's 2s cadence
+
+    before = FakeFirestore()
+    for i in range(readings):
+        _legacy_save_reading(before, 's1', _reading(i))
+
+    after = FakeFirestore()
+    writer = ReadingWriter(lambda: after)
+    for i in range(readings):
+        writer.add('s1', _reading(i), now=i * 2.0)
+    writer.flush()
+
+    print(f"  round trips: {before.round_trips} -> {after.round_trips}, "
+          f"document writes: {before.writes} -> {after.writes}")
+    assert len(after.readings('s1')) == readings
+    assert after.round_trips * 20 <= before.round_trips
+    assert after.writes < before.writes
+
+
+if __name__ == "__main__":
+    test_flushes_by_count_and_interval()
+    test_failed_commit_is_retried()
+    test_write_cost_before_and_after()
+    print("✓ reading writer tests passed")
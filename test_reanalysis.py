@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Batch re-analysis tests.
+Tests: chunk planning, frame-accurate seeking (directories and inter-frame
+video), process-pool results in frame order and identical for 1 and 2
+workers with a tracking pose model, columnar .npz output, no import of
+the service module (and its logging)
+"""
+
+import sys
+import os
+import subprocess
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from hardware.src import frame_source
+from hardware.src import posture_engine
+from hardware.src import reanalysis
+
+
+class _FakePose:
+    """Finds a 'person' wherever the frame has bright pixels. Top-level so worker processes can build it.
+
+    Like MediaPipe with static_image_mode=False, it tracks: each result is
+    smoothed towards the previous one, so leftover state shows up in the output.
+    """
+
+    def __init__(self):
+        self.previous = None
+
+    def process(self, rgb):
+        from types import SimpleNamespace
+        ys, xs = np.nonzero(rgb[:, :, 0] > 128)
+        if not len(xs):
+            return SimpleNamespace(pose_landmarks=None)
+        height, width = rgb.shape[:2]
+        x0, x1 = xs.min() / width, (xs.max() + 1) / width
+        if self.previous is not None:
+            x0 = (x0 + self.previous) / 2
+        self.previous = x0
+        y0, y1 = ys.min() / height, (ys.max() + 1) / height
+        landmarks = [SimpleNamespace(x=x0 + (x1 - x0) * (i % 3) / 2, y=y0 + (y1 - y0) * (i % 11) / 10, visibility=0.9)
+                     for i in range(33)]
+        return SimpleNamespace(pose_landmarks=SimpleNamespace(landmark=landmarks))
+
+    def close(self):
+        pass
+
+
+def _frame_directory(count):
+    import cv2
+    directory = tempfile.mkdtemp()
+    for i in range(count):
+        frame = np.zeros((240, 320, 3), dtype=np.uint8)
+        # Every fifth frame is empty: no person
+        if i % 5:
+            frame[60:200, 40 + i * 4:120 + i * 4] = 255
+        cv2.imwrite(os.path.join(directory, f"frame_{i:04d}.png"), frame)
+    return directory
+
+
+def _has_cv2():
+    try:
+        import cv2  # noqa: F401
+        return True
+    except ImportError:
+        print("  opencv not installed; skipping")
+        return False
+
+
+def test_plan_chunks():
+    assert reanalysis.plan_chunks(10, 4) == [(0, 4), (4, 8), (8, 10)]
+    assert reanalysis.plan_chunks(8, 4) == [(0, 4), (4, 8)]
+    assert reanalysis.plan_chunks(0, 4) == []
+
+
+def test_directory_seek():
+    if not _has_cv2():
+        return
+    source = frame_source.DirectorySource(_frame_directory(6), realtime=False)
+    assert source.start() and source.frame_count() == 6
+    first = [source.read()[0] for _ in range(6)]
+    source.seek(3)
+    assert np.array_equal(source.read()[0], first[3])
+
+
+class _KeyframeCapture:
+    """cv2.VideoCapture stand-in whose seeks land on the keyframe before the target (every 4th frame)."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.position = 0
+
+    def set(self, prop, value):
+        self.position = int(value) // 4 * 4
+        return True
+
+    def get(self, prop):
+        import cv2
+        return float(self.position) if prop == cv2.CAP_PROP_POS_FRAMES else 0.0
+
+    def grab(self):
+        self.position += 1
+        return self.position <= self.frames
+
+    def read(self):
+        if self.position >= self.frames:
+            return False, None
+        frame = np.full((4, 4, 3), self.position, dtype=np.uint8)
+        self.position += 1
+        return True, frame
+
+    def release(self):
+        pass
+
+
+def test_video_seek_is_frame_accurate():
+    if not _has_cv2():
+        return
+    source = frame_source.VideoFileSource('session.mp4', realtime=False)
+    source._capture = _KeyframeCapture(20)
+    source.fps = 30.0
+    for index in (0, 4, 7, 13, 3):
+        source.seek(index)
+        assert source.read()[0][0, 0, 0] == index
+
+
+def test_reanalyze_matches_across_workers():
+    if not _has_cv2():
+        return
+    directory = _frame_directory(23)
+    # Chunks land on workers differently; a tracking model must not carry state between them
+    single, stats = reanalysis.reanalyze(directory, workers=1, chunk_size=5, pose_factory=_FakePose)
+    pooled, pooled_stats = reanalysis.reanalyze(directory, workers=2, chunk_size=5, pose_factory=_FakePose)
+
+    assert stats['frames'] == pooled_stats['frames'] == 23 and pooled_stats['chunks'] == 5
+    assert list(pooled['frame']) == list(range(23))
+    assert pooled['keypoints'].shape == (23, posture_engine.NUM_KEYPOINTS, 3)
+    assert list(pooled['person']) == [bool(i % 5) for i in range(23)]
+    for name, column in single.items():
+        assert np.array_equal(column, pooled[name], equal_nan=column.dtype.kind == 'f'), name
+    assert set(pooled['score'][~pooled['person']]) <= {95}
+
+    strided, _ = reanalysis.reanalyze(directory, workers=2, chunk_size=10, stride=3, pose_factory=_FakePose)
+    assert list(strided['frame']) == [0, 3, 6, 9, 10, 13, 16, 19, 20]
+
+
+def test_columnar_output():
+    if not _has_cv2():
+        return
+    directory = _frame_directory(6)
+    columns, stats = reanalysis.reanalyze(directory, workers=1, pose_factory=_FakePose)
+    path = os.path.join(tempfile.mkdtemp(), "session.npz")
+    reanalysis.save(path, columns, stats, directory)
+    with np.load(path) as saved:
+        assert saved['score'].dtype == np.uint8 and saved['keypoints'].dtype == np.float32
+        assert (int(saved['width']), int(saved['height'])) == (320, 240) and float(saved['fps']) == 30.0
+        assert str(saved['source']) == directory
+        # Thresholds can be re-checked from the stored keypoints alone
+        again = posture_engine.evaluate_batch(np.nan_to_num(saved['keypoints']), 320, 240)
+        assert np.array_equal(again['is_bad'], saved['is_bad'])
+
+
+def test_does_not_import_service():
+    root = os.path.dirname(os.path.abspath(__file__))
+    code = ("import sys, hardware.src.reanalysis; "
+            "sys.exit('hardware.src.main' in sys.modules or 'hardware.src.reanalysis' not in sys.modules)")
+    assert subprocess.run([sys.executable, '-c', code], cwd=root).returncode == 0
+
+
+if __name__ == "__main__":
+    test_plan_chunks()
+    test_directory_seek()
+    test_video_seek_is_frame_accurate()
+    test_reanalyze_matches_across_workers()
+    test_columnar_output()
+    test_does_not_import_service()
+    print("✓ reanalysis tests passed")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Time-weighted session statistics tests.
+Tests: rate-independent mean, percentiles, reason time, bad streaks, bounded memory,
+session summary write
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_firestore import FakeFirestore
+from hardware.src.session_stats import SessionStats, OTHER_REASON
+from hardware.src.reading_writer import ReadingWriter
+from hardware.src.spool import SpoolRecord
+
+
+def _feed(stats, interval, pattern):
+    """pattern: list of (seconds, score, is_bad, reason) segments sampled every `interval`."""
+    now = 0.0
+    for seconds, score, is_bad, reason in pattern:
+        end = now + seconds
+        while now < end - 1e-9:
+            stats.add(score, is_bad, reason, now)
+            now += interval
+    stats.add(100, False, '', now)
+    return stats
+
+
+def test_mean_is_independent_of_sample_rate():
+    pattern = [(60, 95, False, ''), (30, 60, True, 'Slouching'), (30, 55, True, 'Head forward')]
+    hailo = _feed(SessionStats(), 1 / 30, pattern)
+    picamera = _feed(SessionStats(), 2.0, pattern)
+    for stats in (hailo, picamera):
+        assert abs(stats.mean() - (95 * 60 + 60 * 30 + 55 * 30) / 120) < 0.5
+        assert abs(stats.tracked_seconds - 120) < 0.5
+        assert stats.percentile(10) == 55
+        assert stats.percentile(40) == 60
+        assert stats.percentile(90) == 95
+        assert abs(stats.longest_bad_streak - 60) < 0.5
+        reasons = stats.reason_seconds()
+        assert abs(reasons['Slouching'] - 30) < 0.5 and abs(reasons['Head forward'] - 30) < 0.5
+    assert hailo.samples > 100 * picamera.samples // 10
+
+
+def test_gaps_are_capped_and_streaks_reset():
+    stats = SessionStats(max_gap=5)
+    stats.add(50, True, 'Slouching', 0)
+    stats.add(50, True, 'Slouching', 3)
+    stats.add(95, False, '', 300)       # camera stalled: only 5s of the gap counts
+    stats.add(50, True, 'Slouching', 304)
+    stats.add(95, False, '', 306)
+    assert stats.tracked_seconds == 3 + 5 + 4 + 2
+    assert stats.longest_bad_streak == 8
+    assert stats.to_dict()['badSeconds'] == 10
+
+
+def test_memory_is_bounded_for_long_sessions():
+    stats = SessionStats(max_reasons=4)
+    for i in range(200000):
+        # Eight hours at ~7 samples/s with many distinct reasons
+        stats.add(i % 101, True, f'reason {i % 50}', i * 0.15)
+    assert len(stats.reason_seconds()) == 5
+    assert OTHER_REASON in stats.reason_seconds()
+    assert len(stats._histogram) == 101
+    summary = stats.to_dict()
+    assert summary['samples'] == 200000
+    assert 0 <= summary['p50Score'] <= 100
+
+
+def test_summary_is_merged_into_session_document():
+    db = FakeFirestore()
+    writer = ReadingWriter(lambda: db)
+    stats = _feed(SessionStats(), 2.0, [(20, 60, True, 'Slouching')])
+    record = SpoolRecord(1, 'session_summary', 'k1', {'sessionId': 's1', 'summary': stats.to_dict()}, 0)
+    db.collection('sessions').document('s1').set({'status': 'active'})
+    writer.commit_summaries([record])
+    document = db.documents['sessions/s1']
+    assert document['status'] == 'active'
+    assert document['hardwareStats']['timeWeightedScore'] == 60
+    assert document['hardwareStats']['longestBadStreakSeconds'] == 20
+
+
+if __name__ == "__main__":
+    test_mean_is_independent_of_sample_rate()
+    test_gaps_are_capped_and_streaks_reset()
+    test_memory_is_bounded_for_long_sessions()
+    test_summary_is_merged_into_session_document()
+    print("✓ session stats tests passed")
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Durable reading spool tests against fake_firestore.py.
+Tests: persistence across restarts, idempotency keys, size-capped eviction,
+replay with backoff through an outage, warning on the non-durable /tmp
+fallback
+"""
+
+import sys
+import os
+import logging
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_firestore import FakeFirestore
+from hardware.src.reading_writer import ReadingWriter
+from hardware.src import spool as spool_module
+from hardware.src.spool import Spool, SpoolReplayer
+
+
+def _reading(i):
+    return {'sessionId': 's1', 'reading': {'timestamp': datetime(2026, 1, 1, 12, 0, i % 60), 'frameScore': i}}
+
+
+def _wait_until(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_spool_persists_and_dedupes(tmp_path):
+    path = str(tmp_path / 'spool.db')
+    spool = Spool(path)
+    assert spool.append('reading', _reading(1), key='k1')
+    assert not spool.append('reading', _reading(1), key='k1')
+    spool.append('reading', _reading(2))
+    spool.close()
+
+    reopened = Spool(path)
+    records = reopened.peek('reading', 10)
+    assert [r.payload['reading']['frameScore'] for r in records] == [1, 2]
+    assert records[0].key == 'k1'
+    assert records[0].payload['reading']['timestamp'] == datetime(2026, 1, 1, 12, 0, 1)
+
+    reopened.ack(records[:1])
+    assert reopened.depth() == 1
+    reopened.close()
+
+
+def test_spool_evicts_oldest_over_cap(tmp_path):
+    spool = Spool(str(tmp_path / 'spool.db'), max_records=100)
+    for i in range(150):
+        spool.append('reading', _reading(i))
+    assert spool.depth() <= 100
+    assert spool.stats()['evicted'] >= 50
+    assert spool.peek('reading', 1)[0].payload['reading']['frameScore'] >= 50
+    spool.close()
+
+
+def test_replayer_survives_outage(tmp_path):
+    db = FakeFirestore()
+    writer = ReadingWriter(lambda: db)
+    spool = Spool(str(tmp_path / 'spool.db'))
+    replayer = SpoolReplayer(spool, {'reading': writer.commit_spooled}, batch_size=10,
+                             max_delay=60, backoff_initial=0.05, backoff_max=0.2)
+    replayer.start()
+    try:
+        db.fail = True
+        started = time.perf_counter()
+        for i in range(95):
+            spool.append('reading', _reading(i))
+        append_ms = (time.perf_counter() - started) * 1000 / 95
+        print(f"  spool append: {append_ms:.3f} ms/reading")
+
+        assert _wait_until(lambda: replayer.stats()['failures'] >= 2)
+        assert spool.depth() == 95
+
+        db.fail = False
+        # The last partial batch goes out on kick(), as at session end
+        assert _wait_until(lambda: spool.depth() < 10)
+        replayer.kick()
+        assert _wait_until(lambda: spool.depth() == 0)
+
+        scores = sorted(doc['frameScore'] for doc in db.readings('s1'))
+        assert scores == list(range(95))
+        assert db.round_trips == 10
+    finally:
+        replayer.stop()
+        spool.close()
+
+
+def test_replay_is_idempotent(tmp_path):
+    db = FakeFirestore()
+    writer = ReadingWriter(lambda: db)
+    spool = Spool(str(tmp_path / 'spool.db'))
+    for i in range(5):
+        spool.append('reading', _reading(i))
+    records = spool.peek('reading', 5)
+    # A batch that committed but whose ack was lost gets replayed
+    writer.commit_spooled(records)
+    writer.commit_spooled(records)
+    assert len(db.readings('s1')) == 5
+    spool.close()
+
+
+def test_fallback_spool_path_warns(tmp_path):
+    blocked = tmp_path / 'not-a-directory'
+    blocked.write_text('')
+    records = []
+    handler = logging.Handler()
+    handler.emit = records.append
+    original = spool_module.SPOOL_DIR, spool_module.FALLBACK_SPOOL_DIR
+    spool_module.SPOOL_DIR, spool_module.FALLBACK_SPOOL_DIR = str(blocked), str(tmp_path)
+    spool_module.logger.addHandler(handler)
+    try:
+        path = spool_module.default_spool_path()
+        assert path == str(tmp_path / 'posturehealthtracker_spool.db')
+        warnings = [r.getMessage() for r in records if r.levelno == logging.WARNING]
+        assert len(warnings) == 1 and path in warnings[0] and 'NOT durable' in warnings[0]
+
+        # A writable spool directory is used silently
+        spool_module.SPOOL_DIR = str(tmp_path / 'spool')
+        records.clear()
+        assert spool_module.default_spool_path() == str(tmp_path / 'spool' / 'spool.db')
+        assert not records
+    finally:
+        spool_module.logger.removeHandler(handler)
+        spool_module.SPOOL_DIR, spool_module.FALLBACK_SPOOL_DIR = original
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+    for test in (test_spool_persists_and_dedupes, test_spool_evicts_oldest_over_cap,
+                 test_replayer_survives_outage, test_replay_is_idempotent,
+                 test_fallback_spool_path_warns):
+        with tempfile.TemporaryDirectory() as tmp:
+            test(Path(tmp))
+    print("✓ spool tests passed")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Hailo status channel tests.
+Tests: every sample delivered in order, sequence gap accounting, producer with no consumer
+"""
+
+import sys
+import os
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from hardware.src.status_channel import StatusPublisher, StatusReceiver, pack_sample, unpack_sample
+
+
+def test_round_trip_and_gaps():
+    path = os.path.join(tempfile.mkdtemp(), 'status.sock')
+    receiver = StatusReceiver(path)
+    publisher = StatusPublisher(path)
+    try:
+        for i in range(50):
+            publisher.publish(i % 3 == 0, 'Head forward' if i % 3 == 0 else '', neck_angle=0.1)
+            # Stay under the kernel's datagram queue limit, as a 30 fps producer would
+            time.sleep(0.001)
+        time.sleep(0.05)
+        samples = receiver.drain()
+        assert [s.seq for s in samples] == list(range(1, 51))
+        assert samples[0].camera_metrics() == {'is_bad': True, 'reason': 'Head forward', 'neck_angle': samples[0].neck_angle}
+        assert samples[1].shoulder_alignment is None
+
+        publisher.seq += 5  # as if five datagrams were dropped
+        publisher.publish(False, '')
+        time.sleep(0.05)
+        receiver.drain()
+        assert receiver.stats()['lost'] == 5
+        assert receiver.drain() == []
+    finally:
+        publisher.close()
+        receiver.close()
+
+
+def test_publisher_without_consumer_does_not_raise():
+    publisher = StatusPublisher(os.path.join(tempfile.mkdtemp(), 'missing.sock'))
+    assert publisher.publish(False, '') is False
+    assert publisher.dropped == 1
+    publisher.close()
+
+
+def test_reason_is_truncated_not_torn():
+    sample = unpack_sample(pack_sample(1, 2, 3.0, True, True, 'x' * 100))
+    assert sample.reason == 'x' * 32
+    assert unpack_sample(b'garbage') is None
+
+
+if __name__ == "__main__":
+    test_round_trip_and_gaps()
+    test_publisher_without_consumer_does_not_raise()
+    test_reason_is_truncated_not_torn()
+    print("✓ status channel tests passed")
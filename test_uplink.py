@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Uplink worker tests against the local RTDB stand-in (fake_rtdb.py).
+Tests: non-blocking enqueue, latest-wins coalescing, patch merging, stats
+"""
+
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_rtdb import FakeRTDB
+from hardware.src.uplink import UplinkWorker, merge_patch, apply_patch
+
+
+def test_merge_patch_folds_overlapping_paths():
+    merged = merge_patch({'score': 90, 'cameraMetrics': {'is_bad': False}}, {'cameraMetrics/is_bad': True, 'score': 91})
+    assert merged == {'score': 91, 'cameraMetrics': {'is_bad': True}}
+
+    merged = merge_patch({'cameraMetrics/reason': 'x'}, {'cameraMetrics': {'is_bad': False}})
+    assert merged == {'cameraMetrics': {'is_bad': False}}
+
+    assert apply_patch({'a': 1, 'b': {'c': 2}}, {'b/c': None, 'd': 4}) == {'a': 1, 'b': {}, 'd': 4}
+
+
+def test_enqueue_never_waits_on_network():
+    server = FakeRTDB().start()
+    server.write_delay = 0.3
+    worker = UplinkWorker(server.url, max_queue=2)
+    worker.start()
+    try:
+        started = time.monotonic()
+        for score in range(20):
+            worker.enqueue('live_data', {'score': score})
+        enqueue_time = time.monotonic() - started
+        print(f"  20 enqueues took {enqueue_time * 1000:.2f} ms")
+        assert enqueue_time < 0.1
+
+        assert worker.flush(timeout=5)
+        stats = worker.stats()
+        # Slow round trips collapse onto the newest payload
+        assert stats['sent'] <= 3
+        assert stats['coalesced'] >= 17
+        assert stats['last_latency_ms'] >= 250
+        assert server.get('/live_data') == {'score': 19}
+    finally:
+        worker.stop()
+        server.stop()
+
+
+def test_queue_bound_drops_oldest_and_reports_failures():
+    server = FakeRTDB().start()
+    server.write_delay = 0.2
+    worker = UplinkWorker(server.url, max_queue=2)
+    worker.start()
+    results = []
+    try:
+        worker.enqueue('warmup', {'x': 0})
+        time.sleep(0.05)  # let the worker pick it up so the queue starts empty
+        worker.enqueue('a', {'x': 1}, callback=lambda ok: results.append(('a', ok)))
+        worker.enqueue('b', {'x': 2})
+        assert worker.enqueue('c', {'x': 3}) is False
+        assert worker.flush(timeout=5)
+        assert ('a', False) in results
+        assert worker.stats()['dropped'] == 1
+
+        server.fail_writes = True
+        server.write_delay = 0
+        worker.enqueue('live_data', {'score': 1}, method='PATCH')
+        assert worker.flush(timeout=5)
+        assert worker.stats()['failed'] == 1
+    finally:
+        worker.stop()
+        server.stop()
+
+
+if __name__ == "__main__":
+    test_merge_patch_folds_overlapping_paths()
+    test_enqueue_never_waits_on_network()
+    test_queue_bound_drops_oldest_and_reports_failures()
+    print("✓ uplink tests passed")